@@ -0,0 +1,87 @@
+"""Time feedback queue appends, counts and removals as the queue grows.
+
+Usage (from the radiostation-manager directory):
+
+    uv run python -m benchmarks.bench_feedback_queue --entries 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from gui.core.prompts import FeedbackEntry, FeedbackQueue
+
+
+def make_entry(i: int) -> FeedbackEntry:
+    return FeedbackEntry(
+        rating=1 + i % 5,
+        output=f"Soft rain and a slow piano follow the tide home, take {i}.",
+        prompt_template="song_statement",
+        song_title=f"Song {i}",
+        song_context="channel: lofi, theme: rain",
+        note="too generic" if i % 3 else "",
+    )
+
+
+def _report(label: str, timings: list[float]):
+    timings.sort()
+    print(
+        f"{label}: median {timings[len(timings) // 2]:.3f} ms, "
+        f"max {timings[-1]:.3f} ms over {len(timings)} runs"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=20_000)
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "feedback_queue.json"
+        queue = FeedbackQueue(path)
+        start = time.perf_counter()
+        for i in range(args.entries):
+            queue.append(make_entry(i))
+        elapsed = time.perf_counter() - start
+        print(
+            f"appended {args.entries} entries in {elapsed:.2f}s "
+            f"({path.stat().st_size / 1e6:.1f} MB)"
+        )
+
+        # A fresh instance, as the comment editor creates for each rating.
+        timings = []
+        for i in range(args.samples):
+            start = time.perf_counter()
+            FeedbackQueue(path).append(make_entry(i))
+            timings.append((time.perf_counter() - start) * 1000)
+        _report("append (new instance)", timings)
+
+        timings = []
+        for _ in range(args.samples):
+            start = time.perf_counter()
+            queue.count
+            timings.append((time.perf_counter() - start) * 1000)
+        _report("count", timings)
+
+        timings = []
+        for i in range(args.samples):
+            start = time.perf_counter()
+            queue.get(i)
+            timings.append((time.perf_counter() - start) * 1000)
+        _report("get", timings)
+
+        timings = []
+        for _ in range(args.samples):
+            start = time.perf_counter()
+            queue.remove(0)
+            timings.append((time.perf_counter() - start) * 1000)
+        _report("remove", timings)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+"""Compare the single-pass library walker against the old double rglob scan.
+
+Usage (from the radiostation-manager directory):
+
+    uv run python -m benchmarks.bench_library_walk --files 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from gui.core.metadata import walk_library
+
+
+def legacy_scan_library(music_root: Path, exclude_blocked: bool = False) -> list[Path]:
+    """The pre-walker implementation, kept here as the baseline."""
+    paths: list[Path] = []
+    for mp3 in sorted(music_root.rglob("*.mp3")):
+        if exclude_blocked and (mp3.parent / ".blocked").exists():
+            continue
+        paths.append(mp3)
+    for mp3 in sorted(music_root.rglob("*.MP3")):
+        if exclude_blocked and (mp3.parent / ".blocked").exists():
+            continue
+        paths.append(mp3)
+    paths = list(dict.fromkeys(paths))
+    # Callers then stat every file again for size/mtime.
+    for p in paths:
+        p.stat()
+    return paths
+
+
+def build_tree(root: Path, files: int, channels: int) -> None:
+    for c in range(channels):
+        channel = root / f"channel-{c:03d}"
+        (channel / "archive").mkdir(parents=True)
+        if c % 10 == 0:
+            (channel / ".blocked").touch()
+    for i in range(files):
+        channel = root / f"channel-{i % channels:03d}"
+        target = channel / "archive" if i % 7 == 0 else channel
+        suffix = ".MP3" if i % 13 == 0 else ".mp3"
+        (target / f"track-{i:06d}{suffix}").touch()
+        if i % 50 == 0:
+            (target / f"cover-{i:06d}.jpg").touch()
+
+
+def _measure(label: str, fn, root: Path) -> float:
+    start = time.perf_counter()
+    found = fn(root, exclude_blocked=True)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>8}: {len(found)} songs in {elapsed:.3f}s")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--channels", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="luna-bench-walk-") as tmp:
+        root = Path(tmp)
+        start = time.perf_counter()
+        build_tree(root, args.files, args.channels)
+        print(f"built {args.files} files in {time.perf_counter() - start:.1f}s")
+        legacy = _measure("rglob", legacy_scan_library, root)
+        walker = _measure("scandir", walk_library, root)
+        print(f" speedup: {legacy / walker:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
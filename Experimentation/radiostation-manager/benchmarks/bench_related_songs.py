@@ -0,0 +1,81 @@
+"""Time related-song index builds and lookups on a synthetic library.
+
+Usage (from the radiostation-manager directory):
+
+    uv run python -m benchmarks.bench_related_songs --songs 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from gui.core.related_songs import RelatedSongIndex
+from gui.core.song import Song
+from gui.core.vibes import VibeAnalysis
+
+CHANNELS = ("lofi", "chill", "indie", "vibes", "lunar-mix", "bits-tech")
+VOCABULARY = [f"word{i}" for i in range(30_000)]
+# Zipf-like word frequencies, roughly what real lyrics look like.
+FREQUENCIES = [1 / (i + 1) for i in range(len(VOCABULARY))]
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, FREQUENCIES, k=count))
+
+
+def build_songs(count: int, root: Path, lyrics_share: float) -> list[Song]:
+    rng = random.Random(7)
+    songs = []
+    for i in range(count):
+        vibe = VibeAnalysis(
+            tempo=rng.uniform(60, 180),
+            rms_mean=rng.uniform(0.01, 0.2),
+            centroid_mean_hz=rng.uniform(800, 4000),
+            onset_rate=rng.uniform(0.5, 6),
+        )
+        songs.append(
+            Song(
+                path=root / CHANNELS[i % len(CHANNELS)] / f"song-{i:05d}.mp3",
+                title=_words(rng, 3),
+                comment=_words(rng, 20),
+                music_theme=_words(rng, 4),
+                lyrics=_words(rng, 200) if rng.random() < lyrics_share else "",
+                vibe_analysis=vibe.to_json() if rng.random() < 0.8 else "",
+            )
+        )
+    return songs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--songs", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument("--lyrics-share", type=float, default=0.5)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    root = Path("/music")
+    songs = build_songs(args.songs, root, args.lyrics_share)
+    start = time.perf_counter()
+    index = RelatedSongIndex(songs, root)
+    print(f"built index of {len(index)} songs in {time.perf_counter() - start:.2f}s")
+
+    sample = random.Random(3).sample(songs, min(args.queries, len(songs)))
+    timings = []
+    for song in sample:
+        start = time.perf_counter()
+        index.related(song, args.limit)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(
+        f"related({args.limit}): median {timings[len(timings) // 2]:.2f} ms, "
+        f"max {timings[-1]:.2f} ms over {len(timings)} songs"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
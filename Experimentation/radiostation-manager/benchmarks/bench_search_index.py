@@ -0,0 +1,76 @@
+"""Time index builds and search-as-you-type queries on a synthetic library.
+
+Usage (from the radiostation-manager directory):
+
+    uv run python -m benchmarks.bench_search_index --songs 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from gui.core.search_index import SearchIndex
+from gui.core.song import Song
+
+WORDS = (
+    "rain night city lofi chill piano warm tape hiss moon lunar drift neon "
+    "quiet morning coffee study focus ambient synth bass drum soft glow ocean "
+    "tide summer winter memory home road train window cloud star dream slow "
+    "golden hour pixel retro arcade cartridge chiptune lullaby echo velvet"
+).split()
+CHANNELS = ("lofi", "chill", "indie", "vibes", "lunar-mix", "bits-tech")
+QUERIES = ("r", "ra", "rai", "rain", "rain n", "rain ni", "rain night",
+           "channel:lofi", "channel:lofi piano", "theme:memory home", "zzz")
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def build_songs(count: int, root: Path) -> list[Song]:
+    rng = random.Random(7)
+    songs = []
+    for i in range(count):
+        channel = CHANNELS[i % len(CHANNELS)]
+        songs.append(
+            Song(
+                path=root / channel / f"{rng.choice(WORDS)}-{i:05d}.mp3",
+                title=_sentence(rng, 3)[:-1],
+                comment=_sentence(rng, 14),
+                why_made=_sentence(rng, 20),
+                backstory=_sentence(rng, 30),
+                radio_reason=_sentence(rng, 12),
+                music_theme=_sentence(rng, 4),
+                listener_takeaway=_sentence(rng, 10),
+                vibe_summary=_sentence(rng, 12),
+            )
+        )
+    return songs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--songs", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=500)
+    args = parser.parse_args()
+
+    root = Path("/music")
+    songs = build_songs(args.songs, root)
+    index = SearchIndex(root)
+    start = time.perf_counter()
+    index.build(songs)
+    print(f"built index of {len(index)} songs in {time.perf_counter() - start:.2f}s")
+
+    for query in QUERIES:
+        start = time.perf_counter()
+        _, total = index.search(query, limit=args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{query!r:>22}: {total:6d} hits in {elapsed:7.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+"""Compare tags/second for the in-process ID3 reader against ffprobe.
+
+Usage (from the radiostation-manager directory):
+
+    uv run python -m benchmarks.bench_tag_reader --count 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from gui.core.id3 import read_id3_tags, write_id3_tags
+from gui.core.metadata import _ffprobe_tags
+
+MPEG_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+FIXTURE_TXXX_KEYS = (
+    "midori_ai_why_made",
+    "midori_ai_backstory",
+    "midori_ai_radio_reason",
+    "midori_ai_music_theme",
+    "midori_ai_listener_takeaway",
+    "midori_ai_vibe_summary",
+)
+
+
+def build_fixture_library(root: Path, count: int) -> list[Path]:
+    paths = []
+    for i in range(count):
+        channel = root / f"channel-{i % 8}"
+        channel.mkdir(parents=True, exist_ok=True)
+        p = channel / f"fixture-{i:05d}.mp3"
+        p.write_bytes(MPEG_FRAME * 40)
+        tags = {
+            "title": f"Fixture Song {i}",
+            "comment": f"A generated comment for song {i}.",
+        }
+        tags.update({key: f"{key} value for {i}" for key in FIXTURE_TXXX_KEYS})
+        write_id3_tags(p, tags)
+        paths.append(p)
+    return paths
+
+
+def _measure(label: str, reader, paths: list[Path]) -> float:
+    start = time.perf_counter()
+    for p in paths:
+        reader(p)
+    elapsed = time.perf_counter() - start
+    rate = len(paths) / elapsed if elapsed > 0 else float("inf")
+    print(f"{label:>10}: {len(paths)} files in {elapsed:.3f}s ({rate:,.0f} files/s)")
+    return rate
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--ffprobe-count", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="luna-bench-tags-") as tmp:
+        paths = build_fixture_library(Path(tmp), args.count)
+        native = _measure("id3", read_id3_tags, paths)
+        if shutil.which("ffprobe") is None:
+            print("   ffprobe: not found on PATH, skipping baseline")
+            return 0
+        baseline = _measure("ffprobe", _ffprobe_tags, paths[: args.ffprobe_count])
+        print(f"   speedup: {native / baseline:,.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
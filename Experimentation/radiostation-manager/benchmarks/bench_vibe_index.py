@@ -0,0 +1,93 @@
+"""Time vibe index builds, lookups and incremental adds on a synthetic library.
+
+Usage (from the radiostation-manager directory):
+
+    uv run python -m benchmarks.bench_vibe_index --songs 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from gui.core.song import Song
+from gui.core.vibe_index import VibeIndex
+from gui.core.vibes import VibeAnalysis
+
+CHANNELS = ("lofi", "chill", "indie", "vibes", "lunar-mix", "bits-tech")
+KEYS = ("C", "C#", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B")
+
+
+def random_vibe(rng: random.Random) -> VibeAnalysis:
+    return VibeAnalysis(
+        tempo=rng.uniform(60, 180),
+        rms_mean=rng.uniform(0.01, 0.2),
+        centroid_mean_hz=rng.uniform(800, 4000),
+        onset_rate=rng.uniform(0.5, 6),
+        key=rng.choice(KEYS),
+        scale=rng.choice(("major", "minor")),
+    )
+
+
+def build_songs(count: int, root: Path) -> list[Song]:
+    rng = random.Random(7)
+    return [
+        Song(
+            path=root / CHANNELS[i % len(CHANNELS)] / f"song-{i:05d}.mp3",
+            title=f"Song {i}",
+            vibe_analysis=random_vibe(rng).to_json(),
+        )
+        for i in range(count)
+    ]
+
+
+def _report(label: str, timings: list[float]):
+    timings.sort()
+    print(
+        f"{label}: median {timings[len(timings) // 2]:.2f} ms, "
+        f"max {timings[-1]:.2f} ms over {len(timings)} runs"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--songs", type=int, default=50_000)
+    parser.add_argument("--k", type=int, default=25)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    root = Path("/music")
+    songs = build_songs(args.songs, root)
+    start = time.perf_counter()
+    index = VibeIndex()
+    index.build(songs)
+    print(f"built index of {len(index)} songs in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(3)
+    sample = rng.sample(songs, min(args.queries, len(songs)))
+    timings = []
+    for song in sample:
+        start = time.perf_counter()
+        index.similar(song, args.k)
+        timings.append((time.perf_counter() - start) * 1000)
+    _report(f"similar({args.k})", timings)
+
+    # A freshly cached vibe followed by a lookup, as while vibes are caching.
+    timings = []
+    for i in range(args.queries):
+        song = Song(
+            path=root / "new" / f"new-{i}.mp3",
+            vibe_analysis=random_vibe(rng).to_json(),
+        )
+        start = time.perf_counter()
+        index.add(song)
+        index.similar(song, args.k)
+        timings.append((time.perf_counter() - start) * 1000)
+    _report("add + similar", timings)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
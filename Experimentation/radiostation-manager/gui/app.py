@@ -17,16 +17,21 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from gui.core.channel_recommender import invalidate_channel_recommenders
 from gui.core.config import get_config
+from gui.core.library_watcher import LibraryWatcher
 from gui.core.library_worker import LibraryScanWorker, DownloadScanWorker
 from gui.core.metadata import (
     read_song,
     get_channel_dirs,
     is_channel_blocked,
 )
+from gui.core.opencode_client import shutdown_opencode_runner
 from gui.core.song import Song
+from gui.core.tag_writer import stop_tag_writer
 from gui.widgets.components import ToastWidget, LoadingPage
 from gui.widgets.main_menu import MainMenu
+from gui.widgets.batch_comments import BatchCommentsFlow
 from gui.widgets.comment_editor import CommentEditor
 from gui.widgets.import_flow import ImportFlow
 from gui.widgets.library_browser import LibraryBrowser
@@ -98,11 +103,14 @@ class MainWindow(QMainWindow):
         self._library_browser = LibraryBrowser()
         self._library_browser.back.connect(lambda: self._go_to("menu"))
         self._library_browser.song_selected.connect(self._open_comment_editor_from_path)
+        self._library_browser.similar_requested.connect(self._show_similar)
+        self._library_browser.batch_requested.connect(self._open_batch)
         self._widgets["update"] = self._library_browser
 
         self._stale_flow = StaleCommentsFlow()
         self._stale_flow.back.connect(lambda: self._go_to("menu"))
         self._stale_flow.song_selected.connect(self._open_comment_editor)
+        self._stale_flow.batch_requested.connect(self._open_batch)
         self._widgets["stale"] = self._stale_flow
 
         self._search_flow = SearchManageFlow()
@@ -127,6 +135,11 @@ class MainWindow(QMainWindow):
         self._prompt_mgr.back.connect(lambda: self._go_to("menu"))
         self._widgets["prompts"] = self._prompt_mgr
 
+        self._batch_flow = BatchCommentsFlow()
+        self._batch_flow.back.connect(lambda: self._on_navigate(self._previous_page))
+        self._batch_flow.song_selected.connect(self._open_comment_editor)
+        self._widgets["batch"] = self._batch_flow
+
         self._comment_editor = CommentEditor()
         self._comment_editor.finished.connect(self._on_comment_saved)
         self._comment_editor.cancelled.connect(self._on_editor_cancel)
@@ -138,6 +151,32 @@ class MainWindow(QMainWindow):
         self._stack.setCurrentWidget(self._main_menu)
         self._sidebar.hide()
 
+        self._library = LibraryWatcher(
+            self._config.music_root,
+            self._config.downloads_dir,
+            poll_seconds=self._config.library_poll_seconds,
+            scan_workers=self._config.scan_worker_count,
+            parent=self,
+        )
+        self._library.library_changed.connect(self._on_library_changed)
+        self._library.start()
+
+    def closeEvent(self, event):
+        self._cancel_scan()
+        self._library.stop()
+        self._vibes_flow.shutdown()
+        self._batch_flow.shutdown()
+        stop_tag_writer()
+        shutdown_opencode_runner()
+        super().closeEvent(event)
+
+    def _on_library_changed(self):
+        self._search_flow.invalidate_index()
+        self._comment_editor.invalidate_related_index()
+        invalidate_channel_recommenders()
+        if self._stack.currentWidget() is self._library_browser:
+            self._show_library_songs(self._library.songs())
+
     def _create_sidebar(self) -> QFrame:
         sidebar = QFrame()
         sidebar.setObjectName("sidebar")
@@ -220,6 +259,7 @@ class MainWindow(QMainWindow):
         elif key == "stale":
             self._load_stale_page()
         elif key == "search":
+            self._search_flow.refresh_index()
             self._stack.setCurrentWidget(self._search_flow)
         elif key == "rate":
             self._load_rate_page()
@@ -273,7 +313,9 @@ class MainWindow(QMainWindow):
         self._cancel_scan()
         self._show_loading(message)
         self._scan_worker = LibraryScanWorker(
-            self._config.music_root, exclude_blocked=exclude_blocked
+            self._config.music_root,
+            exclude_blocked=exclude_blocked,
+            workers=self._config.scan_worker_count,
         )
         self._scan_worker.progress.connect(self._on_scan_progress)
         self._scan_worker.finished.connect(self._scan_worker.deleteLater)
@@ -286,19 +328,38 @@ class MainWindow(QMainWindow):
     def _load_library_page(self):
         self._stack.setCurrentWidget(self._library_browser)
         self._previous_page = "update"
+        if self._library.ready:
+            self._show_library_songs(self._library.songs())
+            return
         worker = self._start_scan(message="Loading your music library...")
+        self._library_browser.begin(self._config.music_root)
+        worker.songs_batch.connect(self._on_library_batch)
         worker.songs_ready.connect(self._on_library_data)
         worker.error_occurred.connect(lambda e: self.show_toast(f"Error: {e}", "error"))
         worker.start()
 
+    def _show_library_songs(self, songs: list[dict]):
+        self._library_browser.begin(self._config.music_root)
+        self._library_browser.append(songs)
+        self._library_browser.finish()
+
+    def _on_library_batch(self, songs: list[dict]):
+        self._hide_loading()
+        self._library_browser.append(songs)
+
     def _on_library_data(self, songs: list[dict]):
         self._hide_loading()
-        self._library_browser.load(self._config.music_root, songs)
+        self._library_browser.finish()
         self._stack.setCurrentWidget(self._library_browser)
 
     def _load_import_page(self):
         self._stack.setCurrentWidget(self._import_flow)
         self._previous_page = "import"
+        if self._library.ready:
+            self._on_downloads_data(
+                self._library.downloads(), self._library.non_imported_downloads()
+            )
+            return
         self._show_loading("Checking Downloads folder...")
         self._download_worker = DownloadScanWorker(
             self._config.downloads_dir, self._config.music_root
@@ -317,6 +378,9 @@ class MainWindow(QMainWindow):
     def _load_stale_page(self):
         self._stack.setCurrentWidget(self._stale_flow)
         self._previous_page = "stale"
+        if self._library.ready:
+            self._on_stale_data(self._library.songs())
+            return
         worker = self._start_scan(message="Checking for stale comments...")
         worker.songs_ready.connect(self._on_stale_data)
         worker.error_occurred.connect(lambda e: self.show_toast(f"Error: {e}", "error"))
@@ -330,6 +394,9 @@ class MainWindow(QMainWindow):
     def _load_rate_page(self):
         self._stack.setCurrentWidget(self._rate_flow)
         self._previous_page = "rate"
+        if self._library.ready:
+            self._on_rate_data(self._library.songs())
+            return
         worker = self._start_scan(message="Loading songs for rating...")
         worker.songs_ready.connect(self._on_rate_data)
         worker.error_occurred.connect(lambda e: self.show_toast(f"Error: {e}", "error"))
@@ -346,6 +413,18 @@ class MainWindow(QMainWindow):
         self._comment_editor.load_song(song)
         self._stack.setCurrentWidget(self._comment_editor)
 
+    def _open_batch(self, paths: list[Path]):
+        self._sidebar.show()
+        self._set_sidebar_active(None)
+        self._batch_flow.start(paths)
+        self._stack.setCurrentWidget(self._batch_flow)
+
+    def _show_similar(self, path: Path):
+        self._set_sidebar_active("search")
+        self._previous_page = "search"
+        self._search_flow.show_similar(path)
+        self._stack.setCurrentWidget(self._search_flow)
+
     def _open_comment_editor_from_path(self, path: Path):
         song = read_song(path)
         self._open_comment_editor(song)
@@ -0,0 +1,345 @@
+"""Headless entry point for the heavy library jobs (no Qt event loop).
+
+Every command prints one JSON object per line on stdout, e.g.
+``{"event": "song", "path": "...", "status": "ok", "done": 3, "total": 40}``,
+and exits 0 on success, 1 if any song failed (or, with ``stale --check``,
+if anything is stale) and 2 if the run could not start at all.
+
+Usage:
+    luna-studio-cli scan [--songs] [--exclude-blocked]
+    luna-studio-cli stale [--check] [--exclude-blocked]
+    luna-studio-cli cache-vibes [--all] [--preview] [--workers N] [--resume]
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from gui.core.config import get_config
+from gui.core.metadata import (
+    is_outdated_comment,
+    read_song,
+    walk_library,
+    write_vibe_cache,
+)
+from gui.core.tag_index import get_tag_index, scan_worker_count
+from gui.core.vibe_journal import VibeJobJournal
+from gui.core.vibe_scheduler import (
+    AdaptiveConcurrency,
+    plan_vibe_run,
+    stale_vibe_songs,
+)
+from gui.core.vibes import (
+    STALE_EXPIRED,
+    STALE_FILE_CHANGED,
+    STALE_MISSING,
+    STALE_PREVIEW,
+    STALE_SCHEMA,
+    VIBE_CACHE_SCHEMA,
+)
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_FATAL = 2
+
+STALE_REASONS = {
+    STALE_MISSING: "missing",
+    STALE_FILE_CHANGED: "file changed",
+    STALE_SCHEMA: "old schema",
+    STALE_PREVIEW: "preview only",
+    STALE_EXPIRED: "expired",
+}
+
+# Throttle for scan progress lines.
+PROGRESS_INTERVAL = 0.5
+
+
+def emit(event: str, **fields):
+    print(json.dumps({"event": event, **fields}, default=str), flush=True)
+
+
+def scan(music_root: Path, exclude_blocked: bool) -> list[dict]:
+    entries = walk_library(music_root, exclude_blocked=exclude_blocked)
+    emit("scan_start", music_root=music_root, total=len(entries))
+    last = 0.0
+
+    def on_progress(i: int, n: int, path: Path):
+        nonlocal last
+        now = time.monotonic()
+        if now - last >= PROGRESS_INTERVAL or i == n:
+            last = now
+            emit("scan_progress", done=i, total=n, path=path)
+
+    songs = get_tag_index().sync(
+        entries,
+        on_progress=on_progress,
+        workers=scan_worker_count(get_config().scan_worker_count),
+    )
+    emit("scan_done", songs=len(songs or []))
+    return [e.song_dict(s) for s, e in zip(songs or [], entries)]
+
+
+def cmd_scan(args) -> int:
+    songs = scan(args.music_root, args.exclude_blocked)
+    if args.songs:
+        for song in songs:
+            emit("song", **song)
+    return EXIT_OK
+
+
+def cmd_stale(args) -> int:
+    config = get_config()
+    songs = scan(args.music_root, args.exclude_blocked)
+    vibes = dict(
+        stale_vibe_songs(
+            songs, config.vibe_cache_max_age_seconds, preview_ok=args.preview_ok
+        )
+    )
+    count = comments = 0
+    for song in songs:
+        path = Path(song["path"])
+        comment = is_outdated_comment(song.get("comment", ""))
+        reason = vibes.get(path)
+        comments += comment
+        if comment or reason is not None:
+            count += 1
+            emit(
+                "stale",
+                path=path,
+                comment=comment,
+                vibe=None if reason is None else STALE_REASONS[reason],
+            )
+    emit(
+        "stale_done",
+        songs=len(songs),
+        stale=count,
+        stale_comments=comments,
+        stale_vibes=len(vibes),
+    )
+    return EXIT_FAILED if args.check and count else EXIT_OK
+
+
+def write_vibe(song_path: Path, analysis) -> tuple[bool, str]:
+    song = read_song(song_path)
+    song.vibe_analysis = analysis.to_json()
+    song.vibe_summary = analysis.summary()
+    song.vibe_cached_at_epoch = str(int(time.time()))
+    song.vibe_cache_schema = VIBE_CACHE_SCHEMA
+    return write_vibe_cache(song)
+
+
+def write_fingerprint(song_path: Path, fingerprint: str) -> tuple[bool, str]:
+    """Record that the audio was re-confirmed unchanged (see ``plan_vibe_run``)."""
+    song = read_song(song_path)
+    song.vibe_audio_hash = fingerprint
+    return write_vibe_cache(song)
+
+
+def run_vibe_jobs(
+    jobs: list[tuple[Path, float]],
+    journal: VibeJobJournal,
+    preview: bool,
+    workers: int,
+    already_done: int = 0,
+) -> tuple[int, int]:
+    """Analyze and tag every job; returns (ok, failed) counts for this run.
+
+    Writes happen on the calling thread as results arrive, one at a time.
+    Failures are retried after the journal's backoff.
+    """
+    from gui.core.essentia_client import EssentiaWorker, get_essentia_pool
+
+    config = get_config()
+    total = journal.total
+    ok = failed = 0
+    # (not_before, sequence, path): ties keep the queue's size order.
+    waiting = [(t, i, str(p)) for i, (p, t) in enumerate(jobs)]
+    heapq.heapify(waiting)
+    sequence = len(waiting)
+    running: dict[Future, Path] = {}
+    get_essentia_pool(
+        config.essentia_uv_workdir, config.essentia_uv_package_spec
+    ).resize(workers)
+
+    def analyze(song_path: Path):
+        worker = EssentiaWorker(
+            song_path=song_path,
+            uv_workdir=config.essentia_uv_workdir,
+            uv_package_spec=config.essentia_uv_package_spec,
+            preview=preview,
+        )
+        return worker.analyze()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while waiting or running:
+            now = time.time()
+            while waiting and waiting[0][0] <= now and len(running) < workers:
+                _, _, key = heapq.heappop(waiting)
+                running[pool.submit(analyze, Path(key))] = Path(key)
+            timeout = None
+            if waiting and len(running) < workers:
+                timeout = max(0.0, waiting[0][0] - now)
+            if not running:
+                time.sleep(timeout or 0)
+                continue
+            finished, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in finished:
+                song_path = running.pop(future)
+                try:
+                    analysis, timings = future.result()
+                    written, error = write_vibe(song_path, analysis)
+                    if not written:
+                        raise RuntimeError(f"tag write failed: {error}")
+                except Exception as e:
+                    error = str(e)
+                    delay = journal.mark_failed(song_path, error)
+                    if delay is not None:
+                        emit(
+                            "song",
+                            path=song_path,
+                            status="retry",
+                            error=error,
+                            retry_in=delay,
+                        )
+                        retry = (time.time() + delay, sequence, str(song_path))
+                        heapq.heappush(waiting, retry)
+                        sequence += 1
+                        continue
+                    failed += 1
+                    emit(
+                        "song",
+                        path=song_path,
+                        status="failed",
+                        error=error,
+                        done=already_done + ok + failed,
+                        total=total,
+                    )
+                    continue
+                journal.mark_done(song_path)
+                ok += 1
+                emit(
+                    "song",
+                    path=song_path,
+                    status="ok",
+                    summary=analysis.summary(),
+                    timings=timings,
+                    done=already_done + ok + failed,
+                    total=total,
+                )
+    return ok, failed
+
+
+def cmd_cache_vibes(args) -> int:
+    config = get_config()
+    journal = VibeJobJournal(
+        Path(config.vibe_job_journal_path).expanduser(),
+        max_retries=config.vibe_job_max_retries,
+        backoff_seconds=config.vibe_job_retry_backoff_seconds,
+    )
+    if args.resume:
+        if not journal.resumable:
+            emit("error", message="no unfinished vibe run to resume")
+            return EXIT_FATAL
+        jobs = journal.pending()
+        preview = journal.preview
+        already_done = journal.done_count + len(journal.failed())
+    else:
+        songs = scan(args.music_root, args.exclude_blocked)
+        preview = args.preview
+        confirmed: list[tuple[Path, str]] = []
+        queue = plan_vibe_run(
+            songs,
+            config.vibe_cache_max_age_seconds,
+            only_stale=not args.all,
+            preview_ok=preview,
+            on_confirmed=lambda path, fp: confirmed.append((path, fp)),
+        )
+        for path, fingerprint in confirmed:
+            write_fingerprint(path, fingerprint)
+        journal.start(queue, preview=preview)
+        jobs = [(p, 0.0) for p in queue]
+        already_done = 0
+
+    total = journal.total
+    workers = AdaptiveConcurrency(args.workers).current
+    emit(
+        "vibes_start",
+        total=total,
+        queued=len(jobs),
+        workers=workers,
+        preview=preview,
+    )
+    try:
+        ok, failed = run_vibe_jobs(jobs, journal, preview, workers, already_done)
+    except KeyboardInterrupt:
+        emit("interrupted", message="progress saved; rerun with --resume")
+        return 130
+    failed_total = len(journal.failed())
+    journal.finish()
+    emit("vibes_done", ok=ok, failed=failed, total=total)
+    return EXIT_FAILED if failed or failed_total else EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    config = get_config()
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--music-root", type=Path, default=Path(config.music_root))
+    common.add_argument(
+        "--exclude-blocked",
+        action="store_true",
+        help="skip channels marked .blocked",
+    )
+    parser = argparse.ArgumentParser(
+        prog="luna-studio-cli",
+        description="Run library jobs without the GUI; progress is JSON lines.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("scan", parents=[common], help="refresh the tag index")
+    p.add_argument("--songs", action="store_true", help="print every song")
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser(
+        "stale", parents=[common], help="list outdated comments and vibes"
+    )
+    p.add_argument("--check", action="store_true", help="exit 1 if anything is stale")
+    p.add_argument(
+        "--preview-ok",
+        action="store_true",
+        help="count preview-mode vibes as fresh",
+    )
+    p.set_defaults(func=cmd_stale)
+
+    p = sub.add_parser("cache-vibes", parents=[common], help="analyze and tag vibes")
+    p.add_argument("--all", action="store_true", help="redo fresh songs too")
+    p.add_argument("--preview", action="store_true", help="fast preview analysis")
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=config.vibe_worker_count,
+        help="parallel analyses (0 = auto)",
+    )
+    p.add_argument(
+        "--resume", action="store_true", help="continue the last unfinished run"
+    )
+    p.set_defaults(func=cmd_cache_vibes)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except Exception as e:
+        emit("error", message=str(e))
+        return EXIT_FATAL
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from gui.core.config import get_config
+from gui.core.id3 import audio_span
+from gui.core.vibes import VIBE_CACHE_SCHEMA, VibeAnalysis
+
+HASH_CHUNK = 1 << 20
+
+
+def audio_content_hash(
+    file_path: Path, span: tuple[int, int] | None = None
+) -> str:
+    """Hash of the audio payload only, so tag edits keep the same key."""
+    start, end = span or audio_span(file_path)
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(HASH_CHUNK, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def audio_fingerprint(file_path: Path, mtime_ns: int | None = None) -> str:
+    """``<audio bytes>:<audio_content_hash>:<mtime_ns>``, stored with each vibe record.
+
+    ``mtime_ns`` (the file's own if not given) is when the audio was last
+    confirmed; while the file keeps that mtime it need not be hashed again.
+    """
+    if mtime_ns is None:
+        mtime_ns = file_path.stat().st_mtime_ns
+    span = audio_span(file_path)
+    return f"{span[1] - span[0]}:{audio_content_hash(file_path, span)}:{mtime_ns}"
+
+
+def fingerprint_confirmed_at(fingerprint: str, mtime_ns: int) -> bool:
+    """Whether ``fingerprint`` was confirmed against a file with this mtime."""
+    return fingerprint.count(":") == 2 and fingerprint.rsplit(":", 1)[1] == str(
+        mtime_ns
+    )
+
+
+def restamp_fingerprint(fingerprint: str, mtime_ns: int) -> str:
+    """``fingerprint`` re-confirmed at ``mtime_ns``, without re-hashing."""
+    length, _, rest = fingerprint.partition(":")
+    digest = rest.partition(":")[0]
+    return f"{length}:{digest}:{mtime_ns}"
+
+
+def audio_changed(
+    file_path: Path, fingerprint: str, mtime_ns: int | None = None
+) -> bool:
+    """Whether the audio differs from what ``fingerprint`` was taken of.
+
+    A fingerprint confirmed at the file's current ``mtime_ns`` answers
+    without any I/O and a different payload length without reading the
+    audio; only an equal length is confirmed by hashing.
+    """
+    if mtime_ns is not None and fingerprint_confirmed_at(fingerprint, mtime_ns):
+        return False
+    length, _, rest = fingerprint.partition(":")
+    digest = rest.partition(":")[0]
+    try:
+        span = audio_span(file_path)
+        if str(span[1] - span[0]) != length:
+            return True
+        return audio_content_hash(file_path, span) != digest
+    except OSError:
+        return True
+
+
+class AnalysisCache:
+    """Content-addressed store of vibe records, shared by moved or copied files.
+
+    Entries are keyed by audio hash, schema and preview mode. Once the stored
+    records exceed ``max_bytes`` the least recently used ones are evicted.
+    """
+
+    def __init__(self, db_path: Path, max_bytes: int = 16 << 20):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "hash TEXT NOT NULL, "
+            "schema TEXT NOT NULL, "
+            "preview INTEGER NOT NULL, "
+            "record TEXT NOT NULL, "
+            "last_used REAL NOT NULL, "
+            "PRIMARY KEY (hash, schema, preview))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS analyses_lru ON analyses (last_used)"
+        )
+        self._conn.commit()
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(record)), 0) FROM analyses"
+        ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def get(self, content_hash: str, preview: bool = False) -> VibeAnalysis | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM analyses "
+                "WHERE hash = ? AND schema = ? AND preview = ?",
+                (content_hash, VIBE_CACHE_SCHEMA, int(preview)),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE analyses SET last_used = ? "
+                "WHERE hash = ? AND schema = ? AND preview = ?",
+                (time.time(), content_hash, VIBE_CACHE_SCHEMA, int(preview)),
+            )
+            self._conn.commit()
+        try:
+            return VibeAnalysis.from_json(row[0])
+        except ValueError:
+            return None
+
+    def put(self, content_hash: str, analysis: VibeAnalysis):
+        record = analysis.to_json()
+        key = (content_hash, VIBE_CACHE_SCHEMA, int(analysis.preview))
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT LENGTH(record) FROM analyses "
+                "WHERE hash = ? AND schema = ? AND preview = ?",
+                key,
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?)",
+                (*key, record, time.time()),
+            )
+            self._size += len(record) - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        while self._size > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT rowid, LENGTH(record) FROM analyses "
+                "ORDER BY last_used LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                return
+            for rowid, length in rows:
+                if self._size <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM analyses WHERE rowid = ?", (rowid,))
+                self._size -= length
+
+
+_shared: dict[Path, AnalysisCache] = {}
+_shared_lock = threading.Lock()
+
+
+def get_analysis_cache(db_path: Path | None = None) -> AnalysisCache:
+    config = get_config()
+    path = Path(db_path or config.analysis_cache_path).expanduser()
+    with _shared_lock:
+        cache = _shared.get(path)
+        if cache is None:
+            cache = AnalysisCache(path, config.analysis_cache_max_bytes)
+            _shared[path] = cache
+        return cache
+
+
+def cached_analysis(file_path: Path) -> VibeAnalysis | None:
+    """Any cached analysis of ``file_path``'s audio, full before preview.
+
+    Returns None when the cache is disabled or the file cannot be read.
+    """
+    if get_config().analysis_cache_max_bytes <= 0:
+        return None
+    cache = get_analysis_cache()
+    try:
+        content_hash = audio_content_hash(file_path)
+    except OSError:
+        return None
+    return cache.get(content_hash) or cache.get(content_hash, preview=True)
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Iterable, Sequence
+
+import numpy as np
+
+from gui.core.search_index import tokenize
+from gui.core.song import Song
+from gui.core.vibe_index import (
+    DIMENSIONS,
+    KEY_WEIGHT,
+    NUMERIC_FEATURES,
+    vibe_features,
+)
+from gui.core.vibes import VibeAnalysis
+
+# Logit scales: title similarity is a cosine in [0, 1], vibe distance a mean
+# squared distance in standardized units.
+TEXT_SCALE = 8.0
+VIBE_SCALE = 4.0
+
+
+def _title_tokens(text: str) -> list[str]:
+    tokens = dict.fromkeys(tokenize(text))
+    return [t for t in tokens if len(t) > 1 and not t.isdigit()]
+
+
+class ChannelRecommender:
+    """Suggests channels for incoming songs from what each channel holds.
+
+    Each channel gets a title centroid (summed, normalized TF-IDF vectors of
+    its songs' titles and file names plus its own name) and a vibe centroid
+    (mean standardized vibe features). A file is scored against every
+    centroid at once and the scores are softmaxed into confidences.
+    """
+
+    def __init__(
+        self,
+        songs: Iterable[Song],
+        music_root: Path | None = None,
+        channels: Iterable[str] = (),
+    ):
+        self._music_root = Path(music_root) if music_root else None
+        songs = list(songs)
+        song_channels = [self._channel(s) for s in songs]
+        self.channels = sorted({*channels, *filter(None, song_channels)})
+        slot = {c: i for i, c in enumerate(self.channels)}
+
+        # Titles: one document per song, one per channel name.
+        docs = [
+            (slot[c], _title_tokens(f"{s.title} {s.path.stem}"))
+            for s, c in zip(songs, song_channels)
+            if c
+        ]
+        docs += [(slot[c], _title_tokens(c)) for c in self.channels]
+        df: Counter[str] = Counter()
+        for _, tokens in docs:
+            df.update(tokens)
+        vocab = sorted(df)
+        self._vocab = {t: i for i, t in enumerate(vocab)}
+        self._idf = np.array(
+            [math.log(len(docs) / df[t]) + 1.0 for t in vocab], dtype=np.float32
+        )
+        rows, cols, owners = [], [], []
+        for doc, (channel, tokens) in enumerate(docs):
+            for token in tokens:
+                col = self._vocab.get(token)
+                if col is not None:
+                    rows.append(doc)
+                    cols.append(col)
+            owners.append(channel)
+        self._text = self._centroids(
+            np.array(rows, dtype=np.intp),
+            np.array(cols, dtype=np.intp),
+            np.array(owners, dtype=np.intp),
+        )
+
+        # Vibes: standardized feature means per channel.
+        vibe_rows, vibe_owner = [], []
+        for song, channel in zip(songs, song_channels):
+            features = vibe_features(song.vibe) if channel else None
+            if features is not None:
+                vibe_rows.append(features)
+                vibe_owner.append(slot[channel])
+        raw = np.array(vibe_rows).reshape(len(vibe_rows), DIMENSIONS)
+        numeric = len(NUMERIC_FEATURES)
+        self._offset = np.zeros(DIMENSIONS)
+        self._scale = np.full(DIMENSIONS, KEY_WEIGHT)
+        if len(raw) > 1:
+            spread = raw[:, :numeric].std(axis=0)
+            spread[spread == 0] = 1.0
+            self._offset[:numeric] = raw[:, :numeric].mean(axis=0)
+            self._scale[:numeric] = 1.0 / spread
+        else:
+            self._scale[:numeric] = 1.0
+        owner = np.array(vibe_owner, dtype=np.intp)
+        counts = np.bincount(owner, minlength=len(self.channels))
+        sums = np.zeros((len(self.channels), DIMENSIONS))
+        np.add.at(sums, owner, (raw - self._offset) * self._scale)
+        self._has_vibes = counts > 0
+        self._vibes = sums / np.maximum(counts, 1)[:, None]
+
+    def __len__(self) -> int:
+        return len(self.channels)
+
+    def _channel(self, song: Song) -> str:
+        if self._music_root is None:
+            return song.channel
+        try:
+            parts = song.path.relative_to(self._music_root).parts
+        except ValueError:
+            return ""
+        return parts[0] if len(parts) > 1 else ""
+
+    def _weights(self, rows: np.ndarray, cols: np.ndarray, count: int) -> np.ndarray:
+        """L2-normalized TF-IDF weight of each (row, col) entry."""
+        weights = self._idf[cols]
+        norms = np.bincount(rows, weights * weights, minlength=count)
+        return weights / np.sqrt(np.maximum(norms, 1e-12))[rows]
+
+    def _centroids(
+        self, rows: np.ndarray, cols: np.ndarray, owners: np.ndarray
+    ) -> np.ndarray:
+        size = len(self.channels) * len(self._vocab)
+        weights = self._weights(rows, cols, len(owners))
+        flat = owners[rows] * len(self._vocab) + cols
+        text = np.bincount(flat, weights, minlength=size).astype(np.float32)
+        text = text.reshape(len(self.channels), len(self._vocab))
+        norms = np.linalg.norm(text, axis=1, keepdims=True)
+        return text / np.maximum(norms, 1e-12)
+
+    def rank(
+        self, filename: str, vibe: VibeAnalysis | None = None
+    ) -> list[tuple[str, float]]:
+        return self.rank_batch([filename], [vibe])[0]
+
+    def rank_batch(
+        self,
+        filenames: Sequence[str],
+        vibes: Sequence[VibeAnalysis | None] | None = None,
+    ) -> list[list[tuple[str, float]]]:
+        """``(channel, confidence)`` pairs per file, most likely first.
+
+        Files with neither a known title word nor a usable vibe get an empty
+        ranking rather than a guess.
+        """
+        count = len(filenames)
+        vibes = vibes if vibes is not None else [None] * count
+        if not self.channels or not count:
+            return [[] for _ in range(count)]
+        logits = np.zeros((count, len(self.channels)))
+        known = np.zeros(count, dtype=bool)
+
+        rows, cols = [], []
+        for row, name in enumerate(filenames):
+            for token in _title_tokens(Path(name).stem):
+                col = self._vocab.get(token)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        if rows:
+            rows_a = np.array(rows, dtype=np.intp)
+            cols_a = np.array(cols, dtype=np.intp)
+            used, local = np.unique(cols_a, return_inverse=True)
+            query = np.zeros((count, len(used)), dtype=np.float32)
+            np.add.at(query, (rows_a, local), self._weights(rows_a, cols_a, count))
+            logits += TEXT_SCALE * (query @ self._text[:, used].T)
+            known[rows_a] = True
+
+        features = [vibe_features(v) for v in vibes]
+        with_vibes = [i for i, f in enumerate(features) if f is not None]
+        if with_vibes and self._has_vibes.any():
+            points = np.array([features[i] for i in with_vibes]) - self._offset
+            points *= self._scale
+            diff = points[:, None, :] - self._vibes[None, :, :]
+            distance = np.einsum("ijk,ijk->ij", diff, diff) / DIMENSIONS
+            # Channels without any cached vibes count as the farthest one.
+            far = distance[:, self._has_vibes].max(axis=1, keepdims=True)
+            distance[:, ~self._has_vibes] = far
+            logits[with_vibes] -= VIBE_SCALE * distance
+            known[with_vibes] = True
+
+        logits -= logits.max(axis=1, keepdims=True)
+        confidence = np.exp(logits)
+        confidence /= confidence.sum(axis=1, keepdims=True)
+        order = np.argsort(-confidence, axis=1, kind="stable")
+        return [
+            [(self.channels[c], float(confidence[row, c])) for c in order[row]]
+            if known[row]
+            else []
+            for row in range(count)
+        ]
+
+
+_shared: dict[Path, ChannelRecommender] = {}
+_generation = 0
+_shared_lock = threading.Lock()
+
+
+def get_channel_recommender(
+    music_root: Path,
+    songs: Callable[[], Iterable[Song] | None],
+    channels: Iterable[str] = (),
+) -> ChannelRecommender | None:
+    """Shared recommender for ``music_root``, trained from ``songs()`` on demand.
+
+    Training reruns only after ``invalidate_channel_recommenders``. Returns
+    None if ``songs()`` gave up (returned None), e.g. a cancelled scan.
+    """
+    root = Path(music_root).expanduser()
+    with _shared_lock:
+        recommender = _shared.get(root)
+        generation = _generation
+    if recommender is not None:
+        return recommender
+    library = songs()
+    if library is None:
+        return None
+    recommender = ChannelRecommender(library, root, channels)
+    with _shared_lock:
+        # A library change during training makes this result stale already.
+        if generation == _generation:
+            _shared[root] = recommender
+    return recommender
+
+
+def invalidate_channel_recommenders():
+    global _generation
+    with _shared_lock:
+        _shared.clear()
+        _generation += 1
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+from PySide6.QtCore import QObject, Signal
+
+from gui.core.comment_rules import DraftCheck, check_draft
+from gui.core.config import get_config
+from gui.core.library_worker import CommentResearchWorker
+from gui.core.opencode_client import OpenCodeRunner, OpenCodeTask, get_opencode_runner
+from gui.core.prompts import PromptStore
+from gui.core.song import Song
+
+QUEUED = "queued"
+GENERATING = "generating"
+READY = "ready"
+FAILED = "failed"
+WRITTEN = "written"
+# A draft that breaks the comment rules is generated this many more times
+# before it goes to review; the best try is kept.
+RULE_RETRIES = 1
+
+
+@dataclass
+class BatchDraft:
+    path: Path
+    song: Song | None = None
+    status: str = QUEUED
+    check: DraftCheck | None = None
+    error: str = ""
+    accepted: bool = False
+    tries: int = 0
+
+    @property
+    def text(self) -> str:
+        return self.check.text if self.check else ""
+
+    @property
+    def title(self) -> str:
+        return self.song.title if self.song and self.song.title else self.path.stem
+
+
+class CommentBatch(QObject):
+    """Generates comments for many songs with bounded concurrency.
+
+    Songs move through research (a ``CommentResearchWorker``), generation on
+    the shared OpenCode runner and the comment rules. At most ``limit``
+    generations are in flight, so the first drafts can be reviewed while
+    later songs are still being researched. Drafts that pass the rules start
+    out accepted.
+    """
+
+    draft_updated = Signal(int)
+    finished = Signal()
+
+    def __init__(
+        self,
+        song_paths: list[Path],
+        prompts: PromptStore,
+        limit: int = 0,
+        runner: OpenCodeRunner | None = None,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.drafts = [BatchDraft(Path(p)) for p in song_paths]
+        self._prompts = prompts
+        self._template = ""
+        self._runner = runner or get_opencode_runner()
+        self._limit = max(1, limit or self._runner.parallelism)
+        self._pending: deque[tuple[int, str]] = deque()
+        self._tasks: dict[OpenCodeTask, tuple[int, str]] = {}
+        self._worker: CommentResearchWorker | None = None
+        self._researching = False
+        self.running = False
+
+    def start(self):
+        config = get_config()
+        self._template = self._prompts.get_prompt("song_statement")
+        self.running = True
+        self._researching = True
+        worker = CommentResearchWorker(
+            config.music_root,
+            [d.path for d in self.drafts],
+            self._prompts,
+            config.scan_worker_count,
+            self,
+        )
+        worker.prepared.connect(self._on_prepared)
+        worker.failed.connect(self._on_failed)
+        worker.error_occurred.connect(self._on_research_error)
+        worker.finished.connect(self._on_research_done)
+        self._worker = worker
+        worker.start()
+
+    def cancel(self):
+        if not self.running:
+            return
+        self.running = False
+        if self._worker is not None and self._worker.isRunning():
+            self._worker.requestInterruption()
+        for task in self._tasks:
+            self._runner.cancel(task)
+        self._tasks.clear()
+        self._pending.clear()
+        for i, draft in enumerate(self.drafts):
+            if draft.status in (QUEUED, GENERATING):
+                self._fail(i, "Cancelled")
+        self.finished.emit()
+
+    def count(self, status: str) -> int:
+        return sum(1 for d in self.drafts if d.status == status)
+
+    def accepted(self) -> list[BatchDraft]:
+        return [d for d in self.drafts if d.status == READY and d.accepted]
+
+    def _on_prepared(self, index: int, song: Song, prompt: str):
+        if not self.running:
+            return
+        self.drafts[index].song = song
+        self._pending.append((index, prompt))
+        self._pump()
+
+    def _pump(self):
+        while self.running and self._pending and len(self._tasks) < self._limit:
+            index, prompt = self._pending.popleft()
+            draft = self.drafts[index]
+            # A retry after a rule-breaking draft must not get the same one back.
+            task = self._runner.submit(
+                prompt,
+                draft.path.parent,
+                template=self._template,
+                song=str(draft.path),
+                reuse=draft.tries == 0,
+            )
+            self._tasks[task] = (index, prompt)
+            draft.status = GENERATING
+            draft.tries += 1
+            task.signals.finished.connect(
+                lambda text, t=task: self._on_generated(t, text)
+            )
+            task.signals.error_occurred.connect(
+                lambda msg, t=task: self._on_task_failed(t, msg)
+            )
+            self.draft_updated.emit(index)
+
+    def _on_generated(self, task: OpenCodeTask, text: str):
+        entry = self._tasks.pop(task, None)
+        if entry is None:
+            return
+        index, prompt = entry
+        draft = self.drafts[index]
+        check = check_draft(text)
+        if draft.check is None or check.rank < draft.check.rank:
+            draft.check = check
+        if not draft.check.ok and draft.tries <= RULE_RETRIES:
+            self._pending.appendleft((index, prompt))
+        else:
+            draft.status = READY
+            draft.accepted = draft.check.ok
+            self.draft_updated.emit(index)
+        self._pump()
+        self._check_done()
+
+    def _on_task_failed(self, task: OpenCodeTask, msg: str):
+        entry = self._tasks.pop(task, None)
+        if entry is None:
+            return
+        index, _ = entry
+        draft = self.drafts[index]
+        if draft.check is not None:
+            # A rule-breaking draft from an earlier try is still reviewable.
+            draft.status = READY
+            self.draft_updated.emit(index)
+        else:
+            self._fail(index, msg)
+        self._pump()
+        self._check_done()
+
+    def _on_failed(self, index: int, error: str):
+        if self.running:
+            self._fail(index, error)
+
+    def _on_research_error(self, error: str):
+        for i, draft in enumerate(self.drafts):
+            if draft.status == QUEUED:
+                self._fail(i, f"Research failed: {error}")
+        self._pending.clear()
+
+    def _on_research_done(self):
+        self._researching = False
+        if self.running:
+            # Songs the worker never got to, e.g. after an interrupted scan.
+            waiting = {index for index, _ in self._pending}
+            for i, draft in enumerate(self.drafts):
+                if draft.status == QUEUED and i not in waiting:
+                    self._fail(i, "Not researched")
+        self._check_done()
+
+    def _fail(self, index: int, error: str):
+        draft = self.drafts[index]
+        draft.status = FAILED
+        draft.error = error
+        draft.accepted = False
+        self.draft_updated.emit(index)
+
+    def _check_done(self):
+        if self.running and not (self._researching or self._pending or self._tasks):
+            self.running = False
+            self.finished.emit()
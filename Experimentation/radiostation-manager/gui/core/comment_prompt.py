@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from gui.core.config import get_config
+from gui.core.prompts import PromptStore
+from gui.core.related_songs import (
+    LYRICS_MAX_LENGTH,
+    RelatedSongIndex,
+    format_related_songs,
+    truncate,
+)
+from gui.core.song import Song
+from gui.core.vibes import VibeAnalysis
+
+# Q&A fields that make up the song statement, with their prompt labels.
+STATEMENT_FIELDS = (
+    ("why_made", "Why I made this song"),
+    ("backstory", "Backstory"),
+    ("radio_reason", "Why on Midori AI Radio"),
+    ("music_theme", "Music theme"),
+    ("listener_takeaway", "Listener takeaway"),
+)
+
+
+def song_statement(song: Song, answers: dict[str, str] | None = None) -> str:
+    """The Q&A block for a song; ``answers`` override its stored fields."""
+    answers = answers or {}
+    statement = "\n".join(
+        f"{label}: {answers.get(name) or getattr(song, name, '')}"
+        for name, label in STATEMENT_FIELDS
+    )
+    if not statement.strip():
+        statement = f"Song: {song.title} in channel: {song.channel}"
+    return statement
+
+
+def library_research(
+    prompts: PromptStore,
+    song: Song,
+    index: RelatedSongIndex | None,
+    vibe: VibeAnalysis | None = None,
+) -> str:
+    """Related songs from the local index, or research instructions."""
+    config = get_config()
+    template = prompts.get_prompt("related_songs")
+    if index is not None and template:
+        related = index.related(
+            song, config.related_comment_reference_limit, vibe=vibe
+        )
+        return template.format(
+            lyrics=truncate(song.lyrics, LYRICS_MAX_LENGTH) or "(none)",
+            related=format_related_songs(related, config.related_comment_max_length)
+            or "(none)",
+        )
+    research = prompts.get_prompt("library_research")
+    return research.replace("$song_file", str(song.path))
+
+
+def comment_prompt(
+    prompts: PromptStore,
+    song: Song,
+    research: str,
+    answers: dict[str, str] | None = None,
+) -> str:
+    """The filled-in ``song_statement`` prompt for one song."""
+    return prompts.get_prompt("song_statement").format(
+        library_research=research,
+        title=song.title,
+        statement=song_statement(song, answers),
+    )
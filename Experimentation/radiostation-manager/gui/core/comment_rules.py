@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+# Comments are one natural sentence about the song itself (see the
+# song_statement prompt); these are the rules a draft is checked against.
+MIN_WORDS = 8
+MAX_WORDS = 45
+HARD_MAX_WORDS = 70
+# Phrases for boilerplate the prompts forbid: station, collection,
+# productivity, listener use, production history and AI generation. This
+# also covers every is_outdated_comment trigger.
+BOILERPLATE = (
+    "midori ai radio",
+    "radio station",
+    "this station",
+    "playlist",
+    "this collection",
+    "perfect for",
+    "ideal for",
+    "great for",
+    "study session",
+    "productivity",
+    "while you work",
+    "listeners will",
+    "ai-generated",
+    "ai generated",
+    "generated with",
+    "suno",
+)
+# Traces of the library research, which comments must never mention.
+RESEARCH = ("related song", "other songs in", "in the library", "lyrics-eng", ".mp3")
+_ABBREVIATIONS = re.compile(r"\b(?:Mr|Mrs|Ms|Dr|St|vs|etc|e\.g|i\.e)\.", re.I)
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*(?=\s+\S)")
+_WORD = re.compile(r"[^\W_]+(?:['’-][^\W_]+)*")
+
+
+@dataclass
+class DraftCheck:
+    text: str
+    problems: list[str] = field(default_factory=list)  # rule violations
+    warnings: list[str] = field(default_factory=list)  # style issues
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.text) and not self.problems
+
+    @property
+    def score(self) -> float:
+        """1.0 for a clean draft; problems cost far more than warnings."""
+        if not self.text:
+            return 0.0
+        penalty = 0.4 * len(self.problems) + 0.1 * len(self.warnings)
+        return max(0.0, 1.0 - penalty)
+
+    @property
+    def rank(self) -> tuple[bool, float]:
+        """Sort key: rule-abiding drafts first, then by score."""
+        return (not self.ok, -self.score)
+
+
+def clean_draft(text: str) -> str:
+    """The draft as one line, without wrapping quotes or a "Comment:" label."""
+    text = " ".join(text.split())
+    text = re.sub(r"^(?:comment|sentence|draft)\s*:\s*", "", text, flags=re.I)
+    if len(text) > 1 and text[0] == text[-1] and text[0] in "\"'“”":
+        text = text[1:-1].strip()
+    return text.strip("“”").strip()
+
+
+def count_sentences(text: str) -> int:
+    text = _ABBREVIATIONS.sub("", text)
+    return len(_SENTENCE_END.findall(text)) + 1 if text.strip() else 0
+
+
+def check_draft(text: str) -> DraftCheck:
+    text = clean_draft(text)
+    check = DraftCheck(text)
+    if not text:
+        check.problems.append("empty")
+        return check
+    lower = text.lower()
+
+    sentences = count_sentences(text)
+    if sentences != 1:
+        check.problems.append(f"{sentences} sentences")
+    words = len(_WORD.findall(text))
+    if words > HARD_MAX_WORDS:
+        check.problems.append(f"{words} words")
+    elif words > MAX_WORDS:
+        check.warnings.append(f"long ({words} words)")
+    elif words < MIN_WORDS:
+        check.warnings.append(f"short ({words} words)")
+    for phrase in BOILERPLATE:
+        if phrase in lower:
+            check.problems.append(f'boilerplate "{phrase}"')
+    for phrase in RESEARCH:
+        if phrase in lower:
+            check.problems.append(f'mentions research "{phrase}"')
+    if text[-1] not in ".!?\"')”":
+        check.warnings.append("no closing punctuation")
+    if text.startswith(("-", "*", "#")):
+        check.warnings.append("formatted like a list")
+    return check
+
+
+def rank_drafts(drafts: list[str]) -> list[DraftCheck]:
+    """Checked drafts, best first (stable for equal ranks)."""
+    return sorted((check_draft(d) for d in drafts), key=lambda c: c.rank)
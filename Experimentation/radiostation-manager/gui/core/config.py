@@ -17,17 +17,42 @@ class StudioConfig:
     essentia_uv_workdir: Path = Path("/tmp/luna-essentia-uv")
     essentia_uv_cache_dir: Path = Path("/tmp/luna-essentia-uv-cache")
     essentia_uv_package_spec: str = "essentia"
-    max_opencode_attempts: int = 3
+    essentia_worker_max_jobs: int = 200  # recycle a warm worker after N songs
+    essentia_preview_mode: bool = False
+    max_opencode_attempts: int = 3  # per generation; the last try uses the fallback
+    opencode_parallelism: int = 2  # generations running at once
+    opencode_warm_server: bool = True  # attach runs to one `opencode serve`
+    speculative_drafts: int = 1  # candidates per Generate, one per distinct model
+    speculative_keep: int = 2  # cancel the rest once this many pass the rules
     vibe_cache_max_age_seconds: int = 365 * 24 * 60 * 60
     related_comment_reference_limit: int = 30
     related_comment_max_length: int = 220
     related_vibe_retries: int = 2
-    vibe_worker_count: int = 0  # 0 = auto (nproc/2)
+    vibe_worker_count: int = 0  # 0 = auto (nproc/2, adapts to load + memory)
+    scan_worker_count: int = 0  # 0 = auto (nproc, max 8)
+    library_poll_seconds: int = 300  # full resync fallback, 0 = events only
     prompts_path: Path = Path("prompts.toml")
     prompts_base_path: Path = Path("prompts.base.toml")
     feedback_queue_path: Path = Path(
         "/tmp/midoriai/radiostation-manager/feedback_queue.json"
     )
+    tag_index_path: Path = (
+        Path.home() / ".cache" / "luna-studio" / "tag_index.sqlite3"
+    )
+    vibe_job_journal_path: Path = (
+        Path.home() / ".cache" / "luna-studio" / "vibe_job.jsonl"
+    )
+    vibe_job_max_retries: int = 3
+    vibe_job_retry_backoff_seconds: int = 30  # doubles on each retry
+    analysis_cache_path: Path = (
+        Path.home() / ".cache" / "luna-studio" / "analysis_cache.sqlite3"
+    )
+    analysis_cache_max_bytes: int = 16 * 1024 * 1024  # 0 disables the cache
+    generation_cache_path: Path = (
+        Path.home() / ".cache" / "luna-studio" / "generation_cache.sqlite3"
+    )
+    generation_cache_max_entries: int = 5000  # 0 disables the cache
+    generation_cache_ttl_seconds: int = 90 * 24 * 60 * 60  # 0 = never expire
     prompts_for_refinement_model: str = "deepseek/deepseek-v4-flash"
     prompts_for_refinement_variant: str = "max"
 
@@ -1,180 +1,251 @@
 from __future__ import annotations
 
+import atexit
 import subprocess
+import threading
+import time
 from pathlib import Path
 
 from PySide6.QtCore import QRunnable, Signal, QObject
 
+from gui.core.analysis_cache import audio_content_hash, get_analysis_cache
+from gui.core.config import get_config
+from gui.core.essentia_pool import AnalysisPool
+from gui.core.vibes import VibeAnalysis
+
 
 class EssentiaSignals(QObject):
-    finished = Signal(str, str)
+    finished = Signal(str, object)
+    timings = Signal(str, dict)
     error_occurred = Signal(str, str)
 
 
 class EssentiaWorker(QRunnable):
-    def __init__(self, song_path: Path, uv_workdir: Path, uv_package_spec: str):
+    def __init__(
+        self,
+        song_path: Path,
+        uv_workdir: Path,
+        uv_package_spec: str,
+        preview: bool = False,
+    ):
         super().__init__()
         self.song_path = song_path
         self.uv_workdir = uv_workdir
         self.uv_package_spec = uv_package_spec
+        self.preview = preview
         self.signals = EssentiaSignals()
 
     def run(self):
         song_key = str(self.song_path)
         try:
-            analysis = self._analyze()
-            summary = self._build_summary(analysis)
-            self.signals.finished.emit(song_key, f"{analysis}|{summary}")
+            analysis, timings = self.analyze()
+            self.signals.timings.emit(song_key, timings)
+            self.signals.finished.emit(song_key, analysis)
         except Exception as e:
             self.signals.error_occurred.emit(song_key, str(e))
 
-    def _analyze(self) -> str:
-        venv_python = self.uv_workdir / ".venv" / "bin" / "python"
-        if not venv_python.exists():
-            subprocess.run(
-                ["uv", "venv", str(self.uv_workdir / ".venv")],
-                capture_output=True,
-                text=True,
-                timeout=60,
-            )
-            subprocess.run(
-                [
-                    "uv",
-                    "pip",
-                    "install",
-                    "--python",
-                    str(venv_python),
-                    self.uv_package_spec,
-                ],
-                capture_output=True,
-                text=True,
-                timeout=120,
-            )
-        result = subprocess.run(
-            [str(venv_python), "-c", ESSENTIA_SCRIPT, str(self.song_path)],
+    def analyze(self) -> tuple[VibeAnalysis, dict]:
+        """Analyze synchronously on the calling thread; ``run`` wraps this."""
+        cache = None
+        if get_config().analysis_cache_max_bytes > 0:
+            start = time.perf_counter()
+            cache = get_analysis_cache()
+            content_hash = audio_content_hash(self.song_path)
+            cached = cache.get(content_hash, preview=self.preview)
+            elapsed = round(time.perf_counter() - start, 4)
+            if cached is not None:
+                return cached, {"cache hit": elapsed, "total": elapsed}
+
+        pool = get_essentia_pool(self.uv_workdir, self.uv_package_spec)
+        reply = pool.analyze(self.song_path, options={"preview": self.preview})
+        analysis = VibeAnalysis.from_dict(reply["metrics"])
+        if cache is not None:
+            cache.put(content_hash, analysis)
+        return analysis, reply.get("timings", {})
+
+
+_venv_lock = threading.Lock()
+
+
+def ensure_essentia_venv(uv_workdir: Path, uv_package_spec: str) -> Path:
+    venv_python = Path(uv_workdir) / ".venv" / "bin" / "python"
+    with _venv_lock:
+        if venv_python.exists():
+            return venv_python
+        subprocess.run(
+            ["uv", "venv", str(Path(uv_workdir) / ".venv")],
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        subprocess.run(
+            [
+                "uv",
+                "pip",
+                "install",
+                "--python",
+                str(venv_python),
+                uv_package_spec,
+            ],
             capture_output=True,
             text=True,
             timeout=120,
         )
-        if result.returncode != 0:
-            raise RuntimeError(result.stderr.strip() or "Essentia analysis failed")
-        return result.stdout.strip()
-
-    def _build_summary(self, analysis: str) -> str:
-        parts = []
-        metrics = {}
-        for segment in analysis.split("; "):
-            if "=" in segment:
-                k, v = segment.split("=", 1)
-                metrics[k.strip()] = v.strip()
-
-        tempo_raw = metrics.get("tempo", "")
-        tempo_val = tempo_raw.split()[0] if tempo_raw else ""
-        try:
-            t = float(tempo_val)
-            if t < 80:
-                parts.append("slow tempo")
-            elif t < 110:
-                parts.append("steady tempo")
-            elif t < 145:
-                parts.append("driving tempo")
-            else:
-                parts.append("fast tempo")
-        except ValueError:
-            pass
-
-        rms_raw = metrics.get("rms_mean", "")
-        try:
-            r = float(rms_raw)
-            if r < 0.035:
-                parts.append("soft dynamics")
-            elif r < 0.080:
-                parts.append("balanced dynamics")
-            else:
-                parts.append("strong dynamics")
-        except ValueError:
-            pass
-
-        centroid_raw = metrics.get("centroid_mean_hz", "")
-        try:
-            c = float(centroid_raw)
-            if c < 1700:
-                parts.append("warm tone")
-            elif c < 3200:
-                parts.append("neutral tone")
-            else:
-                parts.append("bright tone")
-        except ValueError:
-            pass
+    return venv_python
+
+
+_pools: dict[Path, AnalysisPool] = {}
+_pools_lock = threading.Lock()
 
-        key_raw = metrics.get("key", "")
-        if key_raw:
-            parts.append(f"key {key_raw}")
 
-        if not parts:
-            return "unknown vibes"
-        return ", ".join(parts)
+def get_essentia_pool(uv_workdir: Path, uv_package_spec: str) -> AnalysisPool:
+    """Shared pool of warm Essentia processes for one uv workdir."""
+    venv_python = Path(uv_workdir) / ".venv" / "bin" / "python"
+    with _pools_lock:
+        pool = _pools.get(venv_python)
+        if pool is None:
+            pool = AnalysisPool(
+                [str(venv_python), "-c", ESSENTIA_SCRIPT, "--serve"],
+                max_jobs=get_config().essentia_worker_max_jobs,
+                prepare=lambda: ensure_essentia_venv(uv_workdir, uv_package_spec),
+            )
+            _pools[venv_python] = pool
+        return pool
+
+
+@atexit.register
+def _close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
 
 
 ESSENTIA_SCRIPT = r"""
+import json
+import os
 import sys
-import essentia.standard as es
+import time
 
-song_file = sys.argv[1]
-
-def mean(values):
-    if not values: return None
-    return sum(values) / float(len(values))
-
-def safe_float(value):
-    try: return float(value)
-    except: return None
-
-sample_rate = 44100
-audio = es.MonoLoader(filename=song_file, sampleRate=sample_rate)()
-if len(audio) == 0:
-    sys.exit(1)
-
-duration = len(audio) / float(sample_rate)
-bpm, ticks, confidence, _, _ = es.RhythmExtractor2013(method='multifeature')(audio)
-key, scale, strength = es.KeyExtractor()(audio)
-onset_rate = (len(ticks) / duration) if duration > 0 else None
-
-parts = [f"tempo={float(bpm):.2f} BPM"]
-if key:
-    key_text = str(key)
-    if scale: key_text = f"{key_text} {scale}"
-    key_text = f"{key_text} (strength {float(strength):.2f})"
-    parts.append(f"key={key_text}")
-parts.append(f"rhythm_confidence={float(confidence):.3f}")
-parts.append(f"duration={duration:.2f}s")
-if onset_rate is not None:
-    parts.append(f"onset_rate={onset_rate:.2f}/s")
-
-frame_size = 2048
-hop_size = 512
-windowing = es.Windowing(type='hann')
-spectrum = es.Spectrum(size=frame_size)
-rms_algo = es.RMS()
-centroid_algo = es.Centroid(range=sample_rate / 2.0)
-
-rms_values = []
-centroid_values = []
-
-for frame in es.FrameGenerator(audio, frameSize=frame_size, hopSize=hop_size, startFromZero=True):
-    if len(frame) == 0: continue
-    rms_value = safe_float(rms_algo(frame))
-    if rms_value is not None: rms_values.append(rms_value)
-    try:
-        spec = spectrum(windowing(frame))
-        c_val = safe_float(centroid_algo(spec))
-        if c_val is not None: centroid_values.append(c_val)
-    except: pass
+# Keep replies on a private copy of stdout before essentia is even imported;
+# anything it prints while loading or analyzing goes to stderr instead.
+out = os.fdopen(os.dup(1), "w")
+os.dup2(2, 1)
 
-rms_mean = mean(rms_values)
-if rms_mean is not None: parts.append(f"rms_mean={rms_mean:.4f}")
-centroid_mean = mean(centroid_values)
-if centroid_mean is not None: parts.append(f"centroid_mean_hz={centroid_mean:.2f}")
+import numpy as np
+import essentia.standard as es
 
-print("; ".join(parts))
+SAMPLE_RATE = 44100
+FRAME_SIZE = 2048
+HOP_SIZE = 512
+FRAME_CHUNK = 2048
+
+# Preview mode: rhythm/key on a centred excerpt, frame features on audio
+# resampled to PREVIEW_RATE (frame sizes scale so time resolution matches).
+PREVIEW_SECONDS = 45
+PREVIEW_RATE = 11025
+
+# Built once per process; --serve reuses them for every song.
+rhythm_extractor = es.RhythmExtractor2013(method='multifeature')
+key_extractor = es.KeyExtractor()
+preview_resampler = es.Resample(inputSampleRate=SAMPLE_RATE, outputSampleRate=PREVIEW_RATE)
+
+def frame_features(audio, sample_rate, frame_size, hop_size):
+    # Same framing as es.FrameGenerator(startFromZero=True): zero-padded tail.
+    count = max(1, -(-len(audio) // hop_size))
+    padded = np.zeros((count - 1) * hop_size + frame_size, dtype=np.float32)
+    padded[:len(audio)] = audio
+    frames = np.lib.stride_tricks.sliding_window_view(padded, frame_size)[::hop_size]
+    window = np.hanning(frame_size).astype(np.float32)
+    bins = np.linspace(0.0, sample_rate / 2.0, frame_size // 2 + 1, dtype=np.float32)
+    rms = np.empty(count, dtype=np.float64)
+    centroid = np.empty(count, dtype=np.float64)
+    for start in range(0, count, FRAME_CHUNK):
+        chunk = frames[start:start + FRAME_CHUNK]
+        rms[start:start + len(chunk)] = np.sqrt(np.mean(np.square(chunk, dtype=np.float64), axis=1))
+        mag = np.abs(np.fft.rfft(chunk * window, axis=1))
+        total = mag.sum(axis=1)
+        weighted = mag @ bins
+        centroid[start:start + len(chunk)] = np.divide(
+            weighted, total, out=np.zeros_like(weighted, dtype=np.float64), where=total > 0
+        )
+    return float(rms.mean()), float(centroid.mean())
+
+def analyze(song_file, preview=False):
+    timings = {}
+    clock = time.perf_counter()
+
+    def lap(name):
+        nonlocal clock
+        now = time.perf_counter()
+        timings[name] = round(now - clock, 4)
+        clock = now
+
+    audio = es.MonoLoader(filename=song_file, sampleRate=SAMPLE_RATE)()
+    if len(audio) == 0:
+        raise ValueError("no audio decoded")
+    duration = len(audio) / float(SAMPLE_RATE)
+    excerpt = audio
+    if preview and duration > PREVIEW_SECONDS:
+        start = int((duration - PREVIEW_SECONDS) / 2 * SAMPLE_RATE)
+        excerpt = audio[start:start + PREVIEW_SECONDS * SAMPLE_RATE]
+    lap("load")
+
+    bpm, ticks, confidence, _, _ = rhythm_extractor(excerpt)
+    lap("rhythm")
+    key, scale, strength = key_extractor(excerpt)
+    lap("key")
+
+    if preview:
+        factor = SAMPLE_RATE // PREVIEW_RATE
+        rms_mean, centroid_mean = frame_features(
+            preview_resampler(audio), PREVIEW_RATE, FRAME_SIZE // factor, HOP_SIZE // factor
+        )
+    else:
+        rms_mean, centroid_mean = frame_features(audio, SAMPLE_RATE, FRAME_SIZE, HOP_SIZE)
+    lap("frames")
+
+    excerpt_seconds = len(excerpt) / float(SAMPLE_RATE)
+    metrics = {
+        "tempo": float(bpm),
+        "key": str(key) if key else "",
+        "scale": str(scale) if scale else "",
+        "strength": float(strength),
+        "rhythm_confidence": float(confidence),
+        "duration": duration,
+        "onset_rate": (len(ticks) / excerpt_seconds) if excerpt_seconds > 0 else None,
+        "rms_mean": rms_mean,
+        "centroid_mean_hz": centroid_mean,
+        "preview": bool(preview),
+    }
+    timings["total"] = round(sum(timings.values()), 4)
+    return metrics, timings
+
+def serve():
+    for line in sys.stdin:
+        if not line.strip(): continue
+        start = time.perf_counter()
+        job = {}
+        try:
+            job = json.loads(line)
+            metrics, timings = analyze(job["path"], preview=bool(job.get("preview")))
+            reply = {"ok": True, "metrics": metrics, "timings": timings}
+        except Exception as e:
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        # Echoed so the client can tell a reply from stray output.
+        reply["path"] = job.get("path")
+        reply["seconds"] = round(time.perf_counter() - start, 4)
+        out.write(json.dumps(reply) + "\n")
+        out.flush()
+
+if sys.argv[1] == "--serve":
+    serve()
+else:
+    try:
+        metrics, timings = analyze(sys.argv[1], preview="--preview" in sys.argv[2:])
+    except ValueError:
+        sys.exit(1)
+    out.write(json.dumps({"metrics": metrics, "timings": timings}) + "\n")
+    out.flush()
 """
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import json
+import queue
+import subprocess
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Callable
+
+
+class AnalysisProcess:
+    """One long-lived analysis process speaking JSON lines over stdin/stdout.
+
+    Each request is ``{"path": ..., **options}``; each reply is one JSON object with an
+    ``ok`` flag that echoes the path. stdout and stderr are drained on daemon
+    threads so a chatty child can never block on a full pipe.
+    """
+
+    def __init__(self, command: list[str]):
+        self.jobs = 0
+        self._stderr: deque[str] = deque(maxlen=20)
+        self._replies: queue.Queue[str | None] = queue.Queue()
+        self._proc = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        self._stderr_reader = threading.Thread(target=self._read_stderr, daemon=True)
+        self._stderr_reader.start()
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+
+    def _read_stdout(self):
+        for line in self._proc.stdout:
+            if line.strip():
+                self._replies.put(line)
+        self._replies.put(None)
+
+    def _read_stderr(self):
+        for line in self._proc.stderr:
+            self._stderr.append(line.rstrip())
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def _crash_message(self) -> str:
+        try:
+            self._proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.kill()
+        self._stderr_reader.join(timeout=1)
+        tail = "\n".join(self._stderr).strip()
+        code = self._proc.returncode
+        return tail or f"analysis worker exited with code {code}"
+
+    def request(
+        self, path: Path, timeout: float, options: dict | None = None
+    ) -> dict:
+        self.jobs += 1
+        job = {"path": str(path), **(options or {})}
+        try:
+            self._proc.stdin.write(json.dumps(job) + "\n")
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            raise RuntimeError(self._crash_message())
+        try:
+            line = self._replies.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            raise TimeoutError(f"analysis of {path.name} timed out after {timeout}s")
+        if line is None:
+            raise RuntimeError(self._crash_message())
+        try:
+            reply = json.loads(line)
+        except json.JSONDecodeError:
+            reply = None
+        if not isinstance(reply, dict) or reply.get("path") != job["path"]:
+            # Out of step with its replies; every later answer would be for
+            # the wrong song.
+            self.kill()
+            raise RuntimeError(
+                f"analysis worker sent an unexpected reply for {path.name}: "
+                f"{line.strip()[:200]}"
+            )
+        return reply
+
+    def close(self):
+        try:
+            self._proc.stdin.close()
+            self._proc.wait(timeout=5)
+        except Exception:
+            self.kill()
+
+    def kill(self):
+        self._proc.kill()
+        self._proc.wait()
+
+
+class AnalysisPool:
+    """Reuses up to ``size`` warm analysis processes across songs.
+
+    A process is retired after ``max_jobs`` songs, or as soon as it crashes
+    or times out; the next request starts a fresh one. ``prepare`` runs once
+    before the first process is started (e.g. to create the venv).
+    """
+
+    def __init__(
+        self,
+        command: list[str],
+        size: int = 1,
+        max_jobs: int = 200,
+        prepare: Callable[[], None] | None = None,
+    ):
+        self._command = command
+        self._size = max(1, size)
+        self._max_jobs = max(1, max_jobs)
+        self._prepare = prepare
+        self._prepared = False
+        self._prepare_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._idle: list[AnalysisProcess] = []
+        self._live = 0
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def resize(self, size: int):
+        retired: list[AnalysisProcess] = []
+        with self._cond:
+            self._size = max(1, size)
+            while self._idle and self._live > self._size:
+                retired.append(self._idle.pop())
+                self._live -= 1
+            self._cond.notify_all()
+        for proc in retired:
+            proc.close()
+
+    def analyze(
+        self, path: Path, timeout: float = 120, options: dict | None = None
+    ) -> dict:
+        """Analyze ``path`` on a warm process and return its JSON reply."""
+        proc = self._acquire()
+        healthy = False
+        try:
+            reply = proc.request(path, timeout, options)
+            healthy = True
+        finally:
+            self._release(proc, healthy)
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error") or "Essentia analysis failed")
+        return reply
+
+    def _acquire(self) -> AnalysisProcess:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("analysis pool is closed")
+                while self._idle:
+                    proc = self._idle.pop()
+                    if proc.alive:
+                        return proc
+                    self._live -= 1
+                if self._live < self._size:
+                    self._live += 1
+                    break
+                self._cond.wait()
+        try:
+            return self._spawn()
+        except Exception:
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+            raise
+
+    def _spawn(self) -> AnalysisProcess:
+        with self._prepare_lock:
+            if not self._prepared:
+                if self._prepare:
+                    self._prepare()
+                self._prepared = True
+        return AnalysisProcess(self._command)
+
+    def _release(self, proc: AnalysisProcess, healthy: bool):
+        with self._cond:
+            keep = (
+                healthy
+                and not self._closed
+                and proc.alive
+                and proc.jobs < self._max_jobs
+                and self._live <= self._size
+            )
+            if keep:
+                self._idle.append(proc)
+            else:
+                self._live -= 1
+            self._cond.notify()
+        if not keep:
+            proc.close()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+            self._cond.notify_all()
+        for proc in idle:
+            proc.close()
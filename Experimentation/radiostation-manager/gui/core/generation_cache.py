@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from gui.core.config import get_config
+
+# Eviction is checked every this many writes rather than on each one.
+EVICT_EVERY = 32
+
+
+def generation_key(template: str, model: str, variant: str, prompt: str) -> str:
+    """Cache key for one generation request.
+
+    The template text is hashed on its own so editing ``prompts.toml``
+    retires old drafts even where the formatted prompt would not change.
+    """
+    template_hash = hashlib.sha256(template.encode()).hexdigest()
+    digest = hashlib.sha256()
+    for part in (template_hash, model, variant, prompt):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedDraft:
+    draft: str
+    created: float
+    song: str = ""
+
+
+class GenerationCache:
+    """Draft outputs of past OpenCode generations, keyed by ``generation_key``.
+
+    A key can hold several drafts (regenerating adds one); lookups return the
+    newest first. Drafts older than ``ttl_seconds`` are ignored and pruned,
+    and beyond ``max_entries`` the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self, db_path: Path, max_entries: int = 2000, ttl_seconds: int = 0
+    ):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS drafts ("
+            "key TEXT NOT NULL, "
+            "draft TEXT NOT NULL, "
+            "song TEXT NOT NULL, "
+            "created REAL NOT NULL, "
+            "last_used REAL NOT NULL, "
+            "PRIMARY KEY (key, draft))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS drafts_lru ON drafts (last_used)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS drafts_song ON drafts (song)")
+        self._conn.commit()
+        with self._lock:
+            self._evict()
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM drafts").fetchone()[0]
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+    def get(self, key: str) -> list[CachedDraft]:
+        """Live drafts for ``key``, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT draft, created, song FROM drafts "
+                "WHERE key = ? AND created >= ? ORDER BY created DESC",
+                (key, self._cutoff()),
+            ).fetchall()
+            if rows:
+                self._conn.execute(
+                    "UPDATE drafts SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                self._conn.commit()
+        return [CachedDraft(*row) for row in rows]
+
+    def for_song(self, song: str, limit: int = 20) -> list[CachedDraft]:
+        """The newest drafts generated for ``song``, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT draft, created, song FROM drafts "
+                "WHERE song = ? AND created >= ? ORDER BY created DESC LIMIT ?",
+                (song, self._cutoff(), limit),
+            ).fetchall()
+        return [CachedDraft(*row) for row in rows]
+
+    def put(self, key: str, draft: str, song: str = ""):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO drafts VALUES (?, ?, ?, ?, ?)",
+                (key, draft, song, now, now),
+            )
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict()
+            self._conn.commit()
+
+    def discard(self, key: str, draft: str | None = None):
+        """Forget ``draft`` (or every draft) stored under ``key``."""
+        with self._lock:
+            if draft is None:
+                self._conn.execute("DELETE FROM drafts WHERE key = ?", (key,))
+            else:
+                self._conn.execute(
+                    "DELETE FROM drafts WHERE key = ? AND draft = ?", (key, draft)
+                )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM drafts")
+            self._conn.commit()
+
+    def evict(self):
+        with self._lock:
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.ttl_seconds > 0:
+            self._conn.execute(
+                "DELETE FROM drafts WHERE created < ?", (self._cutoff(),)
+            )
+        count = self._conn.execute("SELECT COUNT(*) FROM drafts").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM drafts WHERE rowid IN ("
+                "SELECT rowid FROM drafts ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+
+_shared: dict[Path, GenerationCache] = {}
+_shared_lock = threading.Lock()
+
+
+def get_generation_cache(db_path: Path | None = None) -> GenerationCache | None:
+    """The shared cache, or None when ``generation_cache_max_entries`` is 0."""
+    config = get_config()
+    if config.generation_cache_max_entries <= 0:
+        return None
+    path = Path(db_path or config.generation_cache_path).expanduser()
+    with _shared_lock:
+        cache = _shared.get(path)
+        if cache is None:
+            cache = GenerationCache(
+                path,
+                config.generation_cache_max_entries,
+                config.generation_cache_ttl_seconds,
+            )
+            _shared[path] = cache
+        return cache
@@ -0,0 +1,385 @@
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+import zlib
+from pathlib import Path
+
+ID3V2_HEADER_SIZE = 10
+ID3V1_SIZE = 128
+ID3_PADDING = 2048
+
+# Frame ids renamed the same way ffmpeg's id3v2 demuxer does, so the dict
+# matches what `ffprobe -show_entries format_tags` used to report.
+FRAME_KEYS = {
+    "TALB": "album",
+    "TCOM": "composer",
+    "TCON": "genre",
+    "TCOP": "copyright",
+    "TENC": "encoded_by",
+    "TIT2": "title",
+    "TLAN": "language",
+    "TPE1": "artist",
+    "TPE2": "album_artist",
+    "TPE3": "performer",
+    "TPOS": "disc",
+    "TPUB": "publisher",
+    "TRCK": "track",
+    "TSSE": "encoder",
+    "TYER": "date",
+    "TCMP": "compilation",
+    "TDRC": "date",
+    "TDRL": "date",
+    "TDEN": "creation_time",
+    "TSOA": "album-sort",
+    "TSOP": "artist-sort",
+    "TSOT": "title-sort",
+    "TIT1": "grouping",
+    "TAL": "album",
+    "TCO": "genre",
+    "TCP": "compilation",
+    "TT2": "title",
+    "TEN": "encoded_by",
+    "TP1": "artist",
+    "TP2": "album_artist",
+    "TP3": "performer",
+    "TRK": "track",
+}
+
+
+class ID3Error(ValueError):
+    pass
+
+
+def _syncsafe(data: bytes) -> int:
+    value = 0
+    for b in data:
+        value = (value << 7) | (b & 0x7F)
+    return value
+
+
+def _unsync(data: bytes) -> bytes:
+    return data.replace(b"\xff\x00", b"\xff")
+
+
+def _split_strings(encoding: int, data: bytes) -> list[bytes]:
+    if encoding in (1, 2):
+        parts: list[bytes] = []
+        start = 0
+        for i in range(0, len(data) - 1, 2):
+            if data[i] == 0 and data[i + 1] == 0:
+                parts.append(data[start:i])
+                start = i + 2
+        parts.append(data[start:])
+        return parts
+    return data.split(b"\x00")
+
+
+def _decode(encoding: int, raw: bytes) -> str:
+    if encoding == 0:
+        return raw.decode("latin-1")
+    if encoding == 1:
+        return raw.decode("utf-16", errors="replace")
+    if encoding == 2:
+        return raw.decode("utf-16-be", errors="replace")
+    return raw.decode("utf-8", errors="replace")
+
+
+def _decode_strings(encoding: int, data: bytes) -> list[str]:
+    values = [_decode(encoding, p) for p in _split_strings(encoding, data)]
+    while values and not values[-1]:
+        values.pop()
+    return values
+
+
+def _split_description(encoding: int, data: bytes) -> tuple[str, str]:
+    parts = _split_strings(encoding, data)
+    desc = _decode(encoding, parts[0]) if parts else ""
+    sep = 2 if encoding in (1, 2) else 1
+    rest = data[len(parts[0]) + sep :] if len(parts) > 1 else b""
+    return desc, ";".join(_decode_strings(encoding, rest))
+
+
+def _frame_payload(major: int, flags: int, data: bytes, tag_unsync: bool) -> bytes:
+    if major == 4:
+        if flags & 0x0040:
+            data = data[1:]
+        if flags & 0x0001:
+            data = data[4:]
+        if flags & 0x0002 or tag_unsync:
+            data = _unsync(data)
+        if flags & 0x0004:
+            raise ID3Error("encrypted frame")
+        if flags & 0x0008:
+            data = zlib.decompress(data)
+    elif major == 3:
+        if flags & 0x0040:
+            raise ID3Error("encrypted frame")
+        if flags & 0x0080:
+            data = data[4:]
+        if flags & 0x0020:
+            data = data[1:]
+        if flags & 0x0080:
+            data = zlib.decompress(data)
+    return data
+
+
+def _raw_frames(major: int, body: bytes):
+    id_len, header_len = (3, 6) if major == 2 else (4, 10)
+    pos = 0
+    while pos + header_len <= len(body):
+        start = pos
+        frame_id = body[pos : pos + id_len]
+        if not frame_id.isalnum() or not frame_id.isupper():
+            break
+        if major == 2:
+            size = int.from_bytes(body[pos + 3 : pos + 6], "big")
+            flags = 0
+        elif major == 3:
+            size, flags = struct.unpack(">IH", body[pos + 4 : pos + 10])
+        else:
+            size = _syncsafe(body[pos + 4 : pos + 8])
+            flags = struct.unpack(">H", body[pos + 8 : pos + 10])[0]
+        pos += header_len
+        data = body[pos : pos + size]
+        pos += size
+        yield frame_id.decode("latin-1"), flags, body[start:pos], data
+
+
+def _iter_frames(major: int, body: bytes, tag_unsync: bool):
+    for frame_id, flags, _, data in _raw_frames(major, body):
+        try:
+            yield frame_id, _frame_payload(major, flags, data, tag_unsync)
+        except (ID3Error, zlib.error):
+            continue
+
+
+def _parse_frame(frame_id: str, data: bytes) -> tuple[str, str] | None:
+    if not data:
+        return None
+    encoding = data[0]
+    if encoding > 3:
+        return None
+    if frame_id in ("TXXX", "TXX"):
+        desc, value = _split_description(encoding, data[1:])
+        return (desc, value) if desc else None
+    if frame_id in ("COMM", "COM"):
+        desc, value = _split_description(encoding, data[4:])
+        return (desc or "comment", value)
+    if frame_id in ("USLT", "ULT"):
+        lang = data[1:4].decode("latin-1", errors="replace")
+        desc, value = _split_description(encoding, data[4:])
+        return (f"lyrics-{desc}-{lang}" if desc else f"lyrics-{lang}", value)
+    if frame_id.startswith("T"):
+        value = ";".join(_decode_strings(encoding, data[1:]))
+        return (FRAME_KEYS.get(frame_id, frame_id), value)
+    return None
+
+
+def parse_id3v2(data: bytes) -> tuple[dict[str, str], int]:
+    """Parse consecutive ID3v2 tags at the start of ``data``.
+
+    Returns the tag dict and the number of bytes the tags occupy.
+    """
+    tags: dict[str, str] = {}
+    offset = 0
+    while data[offset : offset + 3] == b"ID3":
+        header = data[offset : offset + ID3V2_HEADER_SIZE]
+        if len(header) < ID3V2_HEADER_SIZE:
+            raise ID3Error("truncated ID3v2 header")
+        major, flags = header[3], header[5]
+        if major not in (2, 3, 4):
+            raise ID3Error(f"unsupported ID3v2.{major}")
+        size = _syncsafe(header[6:10])
+        body = data[offset + ID3V2_HEADER_SIZE : offset + ID3V2_HEADER_SIZE + size]
+        offset += ID3V2_HEADER_SIZE + size + (10 if flags & 0x10 else 0)
+        tag_unsync = bool(flags & 0x80)
+        if tag_unsync and major < 4:
+            body = _unsync(body)
+        if flags & 0x40 and major == 3:
+            body = body[4 + struct.unpack(">I", body[:4])[0] :]
+        elif flags & 0x40 and major == 4:
+            body = body[_syncsafe(body[:4]) :]
+        for frame_id, payload in _iter_frames(major, body, tag_unsync):
+            parsed = _parse_frame(frame_id, payload)
+            if parsed:
+                key, value = parsed
+                tags[key.lower()] = value.strip()
+    return tags, offset
+
+
+def parse_id3v1(block: bytes) -> dict[str, str]:
+    if len(block) != ID3V1_SIZE or block[:3] != b"TAG":
+        return {}
+
+    def field(start: int, end: int) -> str:
+        return block[start:end].split(b"\x00", 1)[0].decode("latin-1").strip()
+
+    tags = {
+        "title": field(3, 33),
+        "artist": field(33, 63),
+        "album": field(63, 93),
+        "date": field(93, 97),
+    }
+    if block[125] == 0 and block[126] != 0:
+        tags["comment"] = field(97, 125)
+        tags["track"] = str(block[126])
+    else:
+        tags["comment"] = field(97, 127)
+    return {k: v for k, v in tags.items() if v}
+
+
+def read_id3_tags(file_path: Path) -> dict[str, str] | None:
+    """Read ID3v2 (or, failing that, ID3v1) tags without spawning ffprobe.
+
+    Returns None when the file carries no ID3 tag at all, so callers can fall
+    back to a container-aware reader.
+    """
+    with open(file_path, "rb") as f:
+        data = b""
+        head = f.read(ID3V2_HEADER_SIZE)
+        while len(head) == ID3V2_HEADER_SIZE and head[:3] == b"ID3":
+            size = _syncsafe(head[6:10]) + (10 if head[5] & 0x10 else 0)
+            data += head + f.read(size)
+            head = f.read(ID3V2_HEADER_SIZE)
+        if data:
+            tags, _ = parse_id3v2(data)
+            if tags:
+                return tags
+        f.seek(0, 2)
+        if f.tell() >= ID3V1_SIZE:
+            f.seek(-ID3V1_SIZE, 2)
+            v1 = parse_id3v1(f.read(ID3V1_SIZE))
+            if v1:
+                return v1
+    return {} if data else None
+
+
+def audio_span(file_path: Path) -> tuple[int, int]:
+    """Byte range of the audio payload, without ID3v2 or trailing ID3v1 tags."""
+    with open(file_path, "rb") as f:
+        start = 0
+        head = f.read(ID3V2_HEADER_SIZE)
+        while len(head) == ID3V2_HEADER_SIZE and head[:3] == b"ID3":
+            start += ID3V2_HEADER_SIZE + _syncsafe(head[6:10])
+            start += 10 if head[5] & 0x10 else 0
+            f.seek(start)
+            head = f.read(ID3V2_HEADER_SIZE)
+        end = f.seek(0, 2)
+        if end - start >= ID3V1_SIZE:
+            f.seek(end - ID3V1_SIZE)
+            if f.read(3) == b"TAG":
+                end -= ID3V1_SIZE
+    return start, max(start, end)
+
+
+def _syncsafe_bytes(n: int) -> bytes:
+    return bytes([(n >> 21) & 0x7F, (n >> 14) & 0x7F, (n >> 7) & 0x7F, n & 0x7F])
+
+
+def _render_header(major: int, size: int) -> bytes:
+    return b"ID3" + bytes([major, 0, 0]) + _syncsafe_bytes(size)
+
+
+def _render_frame(major: int, frame_id: str, payload: bytes) -> bytes:
+    size = _syncsafe_bytes(len(payload)) if major == 4 else struct.pack(">I", len(payload))
+    return frame_id.encode("latin-1") + size + b"\x00\x00" + payload
+
+
+def _encode(major: int, *values: str) -> tuple[int, list[bytes]]:
+    try:
+        return 0, [v.encode("latin-1") for v in values]
+    except UnicodeEncodeError:
+        if major == 4:
+            return 3, [v.encode("utf-8") for v in values]
+        return 1, [v.encode("utf-16") for v in values]
+
+
+def _render_update(major: int, key: str, value: str) -> bytes:
+    if key.lower() == "title":
+        encoding, (text,) = _encode(major, value)
+        return _render_frame(major, "TIT2", bytes([encoding]) + text)
+    if key.lower() == "comment":
+        encoding, (desc, text) = _encode(major, "", value)
+        term = b"\x00\x00" if encoding == 1 else b"\x00"
+        payload = bytes([encoding]) + b"XXX" + desc + term + text
+        return _render_frame(major, "COMM", payload)
+    encoding, (desc, text) = _encode(major, key, value)
+    term = b"\x00\x00" if encoding == 1 else b"\x00"
+    return _render_frame(major, "TXXX", bytes([encoding]) + desc + term + text)
+
+
+def _rewrite_with_tag(file_path: Path, major: int, body: bytes, audio_offset: int):
+    tmp_path = file_path.with_name(f".id3-update-{file_path.stem}{file_path.suffix}")
+    try:
+        with open(file_path, "rb") as src, open(tmp_path, "wb") as dst:
+            dst.write(_render_header(major, len(body) + ID3_PADDING))
+            dst.write(body + b"\x00" * ID3_PADDING)
+            src.seek(audio_offset)
+            shutil.copyfileobj(src, dst, 1 << 20)
+        shutil.copymode(file_path, tmp_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def write_id3_tags(
+    file_path: Path, updates: dict[str, str], preserve_mtime: bool = False
+) -> bool:
+    """Set ``updates`` (ffprobe-style keys) in the file's ID3v2 tag.
+
+    ``title`` maps to TIT2, ``comment`` to COMM and anything else to a TXXX
+    frame; an empty value removes the frame. All other frames are kept
+    byte-for-byte. When the result fits in the existing tag (padding
+    included) only the tag region is rewritten and True is returned;
+    otherwise the file is rewritten atomically with fresh padding and False
+    is returned. Raises ID3Error for tags this writer does not handle.
+    """
+    st = os.stat(file_path)
+    old_size: int | None = None
+    body = b""
+    audio_offset = 0
+    major = 4
+    with open(file_path, "rb") as f:
+        head = f.read(ID3V2_HEADER_SIZE)
+        if head[:3] == b"ID3":
+            major, flags = head[3], head[5]
+            if major not in (3, 4) or flags & 0xD0:
+                raise ID3Error(f"unsupported ID3v2.{major} tag (flags {flags:#x})")
+            old_size = _syncsafe(head[6:10])
+            body = f.read(old_size)
+            if len(body) < old_size:
+                raise ID3Error("truncated ID3v2 tag")
+            if f.read(3) == b"ID3":
+                raise ID3Error("multiple ID3v2 tags")
+            audio_offset = ID3V2_HEADER_SIZE + old_size
+
+    wanted = {k.lower() for k in updates}
+    kept: list[bytes] = []
+    for frame_id, flags, raw, data in _raw_frames(major, body):
+        try:
+            parsed = _parse_frame(frame_id, _frame_payload(major, flags, data, False))
+        except (ID3Error, zlib.error):
+            parsed = None
+        if parsed and parsed[0].lower() in wanted:
+            continue
+        kept.append(raw)
+    kept.extend(
+        _render_update(major, key, value)
+        for key, value in updates.items()
+        if value
+    )
+    new_body = b"".join(kept)
+
+    in_place = old_size is not None and len(new_body) <= old_size
+    if in_place:
+        with open(file_path, "r+b") as f:
+            f.write(_render_header(major, old_size))
+            f.write(new_body + b"\x00" * (old_size - len(new_body)))
+    else:
+        _rewrite_with_tag(Path(file_path), major, new_body, audio_offset)
+    if preserve_mtime:
+        os.utime(file_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    return in_place
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal
+
+from gui.core.library_worker import (
+    DirectoryRescanWorker,
+    DirectoryScan,
+    LibraryScanWorker,
+)
+from gui.core.metadata import scan_downloads
+from gui.core.song import Song
+from gui.core.tag_index import get_tag_index
+
+
+class LibraryWatcher(QObject):
+    """Keeps an in-memory copy of the library current without full rescans.
+
+    QFileSystemWatcher (inotify on Linux) reports directory changes, and only
+    the changed directory is re-listed, on a worker thread. Songs written
+    through the tag index are picked up the same way. A periodic full sync
+    covers filesystems that do not deliver events, such as NFS mounts.
+    """
+
+    library_changed = Signal()
+    downloads_changed = Signal()
+    _recorded = Signal(str)
+
+    def __init__(
+        self,
+        music_root: Path,
+        downloads_dir: Path,
+        poll_seconds: int = 300,
+        scan_workers: int = 0,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self._music_root = Path(music_root)
+        self._downloads_dir = Path(downloads_dir)
+        self._poll_seconds = poll_seconds
+        self._scan_workers = scan_workers
+        self._songs: dict[str, dict] = {}
+        self._sorted: list[dict] | None = None
+        self._blocked_dirs: set[str] = set()
+        self._downloads: list[Path] = []
+        self._dirty: set[str] = set()
+        self._ready = False
+        self._sync_worker: LibraryScanWorker | None = None
+        # Directories rescanned while a full sync ran; its snapshot may be
+        # older, so they are rescanned again once it lands.
+        self._rescanned_during_sync: set[str] | None = None
+        self._rescan_dirs: set[str] = set()
+        self._rescan_worker: DirectoryRescanWorker | None = None
+
+        self._fs = QFileSystemWatcher(self)
+        self._fs.directoryChanged.connect(self._on_directory_changed)
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(250)
+        self._debounce.timeout.connect(self._flush_dirty)
+
+        self._poll = QTimer(self)
+        self._poll.timeout.connect(self.full_sync)
+
+        self._recorded.connect(self._on_recorded)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def start(self):
+        get_tag_index().add_listener(self._on_index_record)
+        self._refresh_downloads()
+        self.full_sync()
+        if self._poll_seconds > 0:
+            self._poll.start(self._poll_seconds * 1000)
+
+    def stop(self):
+        self._poll.stop()
+        self._debounce.stop()
+        get_tag_index().remove_listener(self._on_index_record)
+        sync, self._sync_worker = self._sync_worker, None
+        rescan, self._rescan_worker = self._rescan_worker, None
+        for worker in (sync, rescan):
+            if worker is not None and worker.isRunning():
+                worker.requestInterruption()
+                worker.wait(5000)
+
+    def songs(self, exclude_blocked: bool = True) -> list[dict]:
+        if self._sorted is None:
+            self._sorted = [self._songs[k] for k in sorted(self._songs, key=Path)]
+        if not exclude_blocked or not self._blocked_dirs:
+            return list(self._sorted)
+        return [
+            s
+            for s in self._sorted
+            if os.path.dirname(str(s["path"])) not in self._blocked_dirs
+        ]
+
+    def downloads(self) -> list[Path]:
+        return list(self._downloads)
+
+    def non_imported_downloads(self) -> list[Path]:
+        library = {os.path.basename(k).lower() for k in self._songs}
+        return [d for d in self._downloads if d.name.lower() not in library]
+
+    def full_sync(self):
+        if self._sync_worker is not None:
+            return
+        worker = LibraryScanWorker(
+            self._music_root, exclude_blocked=False, workers=self._scan_workers
+        )
+        worker.songs_ready.connect(self._on_full_sync)
+        worker.finished.connect(lambda w=worker: self._on_sync_finished(w))
+        worker.finished.connect(worker.deleteLater)
+        self._sync_worker = worker
+        self._rescanned_during_sync = set()
+        worker.start()
+
+    def _on_sync_finished(self, worker: LibraryScanWorker):
+        if self._sync_worker is worker:
+            self._sync_worker = None
+            self._rescanned_during_sync = None  # cancelled or failed
+
+    def _on_full_sync(self, songs: list[dict]):
+        replay, self._rescanned_during_sync = self._rescanned_during_sync, None
+        for directory in replay or ():
+            self._mark_dirty(directory)
+        self._songs = {str(s["path"]): s for s in songs}
+        self._sorted = None
+        dirs = {str(self._music_root)}
+        for key in self._songs:
+            parent = os.path.dirname(key)
+            while parent not in dirs and self._in_library(parent):
+                dirs.add(parent)
+                parent = os.path.dirname(parent)
+        self._blocked_dirs = {
+            d for d in dirs if os.path.exists(os.path.join(d, ".blocked"))
+        }
+        self._watch(dirs)
+        self._ready = True
+        self.library_changed.emit()
+
+    def _in_library(self, path: str) -> bool:
+        root = str(self._music_root)
+        return path == root or path.startswith(root + os.sep)
+
+    def _watch(self, dirs: set[str]):
+        watched = set(self._fs.directories())
+        wanted = [d for d in dirs if d not in watched and os.path.isdir(d)]
+        if wanted:
+            self._fs.addPaths(wanted)
+
+    def _on_index_record(self, song: Song):
+        # Called from whichever thread wrote the tags.
+        self._recorded.emit(str(song.path))
+
+    def _on_recorded(self, path: str):
+        self._mark_dirty(os.path.dirname(path))
+
+    def _on_directory_changed(self, path: str):
+        self._mark_dirty(path)
+
+    def _mark_dirty(self, directory: str):
+        self._dirty.add(directory)
+        self._debounce.start()
+
+    def _flush_dirty(self):
+        dirty, self._dirty = self._dirty, set()
+        for directory in sorted(dirty):
+            if directory == str(self._downloads_dir):
+                self._refresh_downloads()
+                self.downloads_changed.emit()
+            elif self._in_library(directory):
+                self._rescan_dirs.add(directory)
+        self._start_rescan()
+
+    def _start_rescan(self):
+        if self._rescan_worker is not None or not self._rescan_dirs:
+            return
+        dirs, self._rescan_dirs = sorted(self._rescan_dirs), set()
+        worker = DirectoryRescanWorker(
+            dirs, set(self._fs.directories()), workers=self._scan_workers
+        )
+        worker.rescanned.connect(self._on_rescanned)
+        worker.finished.connect(lambda w=worker: self._on_rescan_finished(w))
+        worker.finished.connect(worker.deleteLater)
+        self._rescan_worker = worker
+        worker.start()
+
+    def _on_rescan_finished(self, worker: DirectoryRescanWorker):
+        if self._rescan_worker is worker:
+            self._rescan_worker = None
+            self._start_rescan()  # changes that came in meanwhile
+
+    def _refresh_downloads(self):
+        self._downloads = scan_downloads(self._downloads_dir)
+        if self._downloads_dir.is_dir():
+            self._watch({str(self._downloads_dir)})
+
+    def _on_rescanned(self, scans: list[DirectoryScan]):
+        if self.sender() is not self._rescan_worker:
+            return
+        for scan in scans:
+            self._apply(scan)
+        if self._rescanned_during_sync is not None:
+            self._rescanned_during_sync.update(s.directory for s in scans)
+        self._watch({s.directory for s in scans if s.exists})
+        self._watch({d for s in scans for d in s.subdirs})
+        if self._ready:
+            self._sorted = None
+            self.library_changed.emit()
+
+    def _apply(self, scan: DirectoryScan):
+        directory = scan.directory
+        if not scan.exists:
+            self._drop_tree(directory)
+            return
+        if scan.blocked:
+            self._blocked_dirs.add(directory)
+        else:
+            self._blocked_dirs.discard(directory)
+        # Subdirectories that were moved out or deleted along with their songs.
+        prefix = directory + os.sep
+        gone = {
+            prefix + k[len(prefix) :].split(os.sep, 1)[0]
+            for k in self._songs
+            if k.startswith(prefix) and os.path.dirname(k) != directory
+        } - scan.subdirs
+        for sub in gone:
+            self._drop_tree(sub)
+        for key in [k for k in self._songs if os.path.dirname(k) == directory]:
+            del self._songs[key]
+        for song in scan.songs:
+            self._songs[str(song["path"])] = song
+
+    def _drop_tree(self, directory: str):
+        prefix = directory + os.sep
+        for key in [k for k in self._songs if k.startswith(prefix)]:
+            del self._songs[key]
+        self._blocked_dirs = {
+            d for d in self._blocked_dirs if d != directory and not d.startswith(prefix)
+        }
@@ -1,22 +1,49 @@
 from __future__ import annotations
 
+import os
+from dataclasses import dataclass, field
 from pathlib import Path
 
 from PySide6.QtCore import QThread, Signal
 
-from gui.core.metadata import scan_library, read_song, scan_downloads
-from gui.core.song import Song
+from gui.core.analysis_cache import cached_analysis
+from gui.core.channel_recommender import get_channel_recommender
+from gui.core.comment_prompt import comment_prompt, library_research
+from gui.core.metadata import (
+    LibraryEntry,
+    get_channel_dirs,
+    library_basenames,
+    read_song,
+    scan_downloads,
+    walk_library,
+)
+from gui.core.prompts import PromptStore
+from gui.core.related_songs import RelatedSongIndex
+from gui.core.search_index import SearchIndex
+from gui.core.tag_index import TagIndex, get_tag_index, scan_worker_count
+from gui.core.vibe_index import get_vibe_index
+from gui.core.vibe_scheduler import plan_vibe_run
 
 
 class LibraryScanWorker(QThread):
     progress = Signal(int, int, str)
+    songs_batch = Signal(list)
     songs_ready = Signal(list)
     error_occurred = Signal(str)
 
-    def __init__(self, music_root: Path, exclude_blocked: bool = True, parent=None):
+    def __init__(
+        self,
+        music_root: Path,
+        exclude_blocked: bool = True,
+        workers: int = 0,
+        batch_size: int = 200,
+        parent=None,
+    ):
         super().__init__(parent)
         self._music_root = music_root
         self._exclude_blocked = exclude_blocked
+        self._workers = scan_worker_count(workers)
+        self._batch_size = batch_size
         self._cancelled = False
 
     def cancel(self):
@@ -25,65 +52,207 @@ class LibraryScanWorker(QThread):
 
     def run(self):
         try:
-            self.progress.emit(0, 100, "Scanning library...")
-            paths = scan_library(
-                self._music_root, exclude_blocked=self._exclude_blocked
+            songs = self._scan()
+            if songs is not None:
+                self.songs_ready.emit(songs)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+    def _scan(self) -> list[dict] | None:
+        """Song dicts for the whole library, or None if cancelled."""
+        self.progress.emit(0, 100, "Scanning library...")
+        entries = walk_library(self._music_root, exclude_blocked=self._exclude_blocked)
+        total = len(entries)
+        if total == 0:
+            return []
+
+        songs: list[dict] = []
+
+        def emit_batch(batch):
+            done = len(songs)
+            data = [e.song_dict(s) for s, e in zip(batch, entries[done:])]
+            songs.extend(data)
+            self.songs_batch.emit(data)
+
+        result = get_tag_index().sync(
+            entries,
+            on_progress=lambda i, n, p: self.progress.emit(
+                i, n, f"Reading {p.name}..."
+            ),
+            is_cancelled=lambda: self._cancelled or self.isInterruptionRequested(),
+            workers=self._workers,
+            on_batch=emit_batch,
+            batch_size=self._batch_size,
+        )
+        if result is None:
+            return None
+        self.progress.emit(total, total, "Done.")
+        return songs
+
+
+class VibePlanWorker(LibraryScanWorker):
+    """Scans the library, then picks the songs a vibe run should analyze.
+
+    Checking staleness can hash audio, so it runs here rather than on the
+    GUI thread. ``planned`` carries the ordered queue, the number of songs
+    scanned, and (path, fingerprint) pairs re-confirmed after a tag edit,
+    to be written back so they are not hashed again.
+    """
+
+    planned = Signal(list, int, list)
+
+    def __init__(
+        self,
+        music_root: Path,
+        max_age_seconds: float,
+        only_stale: bool = True,
+        preview_ok: bool = False,
+        exclude_blocked: bool = True,
+        workers: int = 0,
+        parent=None,
+    ):
+        super().__init__(music_root, exclude_blocked, workers, parent=parent)
+        self._max_age_seconds = max_age_seconds
+        self._only_stale = only_stale
+        self._preview_ok = preview_ok
+
+    def run(self):
+        try:
+            songs = self._scan()
+            if songs is None:
+                return
+            confirmed: list[tuple[Path, str]] = []
+            queue = plan_vibe_run(
+                songs,
+                self._max_age_seconds,
+                only_stale=self._only_stale,
+                preview_ok=self._preview_ok,
+                on_confirmed=lambda path, fp: confirmed.append((path, fp)),
             )
-            total = len(paths)
-            if total == 0:
-                self.songs_ready.emit([])
+            if self._cancelled or self.isInterruptionRequested():
                 return
+            self.planned.emit(queue, len(songs), confirmed)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+
+@dataclass
+class DirectoryScan:
+    """One re-listed directory; ``exists`` is False once it is gone."""
+
+    directory: str
+    exists: bool
+    blocked: bool = False
+    subdirs: set[str] = field(default_factory=set)
+    songs: list[dict] = field(default_factory=list)
+
+
+class DirectoryRescanWorker(QThread):
+    """Re-lists changed library directories and reads their changed songs.
+
+    Subdirectories not in ``known_dirs`` (e.g. an album folder that was just
+    moved in) are listed too, recursively. Tags come from the tag index, so
+    only new or modified files are read, and songs that were deleted or moved
+    away are dropped from it.
+    """
+
+    rescanned = Signal(list)
+    error_occurred = Signal(str)
+
+    def __init__(
+        self,
+        directories: list[str],
+        known_dirs: set[str],
+        workers: int = 0,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self._directories = list(directories)
+        self._known_dirs = set(known_dirs)
+        self._workers = scan_worker_count(workers)
 
-            songs: list[dict] = []
-            for i, p in enumerate(paths):
-                if self._cancelled or self.isInterruptionRequested():
+    def run(self):
+        try:
+            scans: list[DirectoryScan] = []
+            entries: dict[str, list[LibraryEntry]] = {}
+            stack = list(reversed(self._directories))
+            seen = set(stack)
+            while stack:
+                if self.isInterruptionRequested():
                     return
-                if i % 5 == 0:
-                    self.progress.emit(i, total, f"Reading {p.name}...")
-                try:
-                    s = read_song(p)
-                    songs.append(
-                        {
-                            "path": p,
-                            "channel": s.channel,
-                            "title": s.title,
-                            "comment": s.comment,
-                            "filename": p.name,
-                            "why_made": s.why_made,
-                            "backstory": s.backstory,
-                            "radio_reason": s.radio_reason,
-                            "music_theme": s.music_theme,
-                            "listener_takeaway": s.listener_takeaway,
-                            "vibe_analysis": s.vibe_analysis,
-                            "vibe_summary": s.vibe_summary,
-                            "vibe_cached_at_epoch": s.vibe_cached_at_epoch,
-                            "vibe_cache_schema": s.vibe_cache_schema,
-                        }
-                    )
-                except Exception:
-                    songs.append(
-                        {
-                            "path": p,
-                            "channel": "",
-                            "title": p.stem,
-                            "comment": "",
-                            "filename": p.name,
-                            "why_made": "",
-                            "backstory": "",
-                            "radio_reason": "",
-                            "music_theme": "",
-                            "listener_takeaway": "",
-                            "vibe_analysis": "",
-                            "vibe_summary": "",
-                            "vibe_cached_at_epoch": "",
-                            "vibe_cache_schema": "",
-                        }
-                    )
-            self.progress.emit(total, total, "Done.")
-            self.songs_ready.emit(songs)
+                scan, found = self._list(stack.pop())
+                scans.append(scan)
+                entries[scan.directory] = found
+                for sub in sorted(scan.subdirs - self._known_dirs - seen):
+                    seen.add(sub)
+                    stack.append(sub)
+
+            tag_index = get_tag_index()
+            tag_index.remove_many(
+                path
+                for scan in scans
+                for path in self._vanished(tag_index, scan, entries[scan.directory])
+            )
+            flat = [e for scan in scans for e in entries[scan.directory]]
+            songs = tag_index.sync(
+                flat,
+                is_cancelled=self.isInterruptionRequested,
+                workers=self._workers,
+                prune=False,
+            )
+            if songs is None:
+                return
+            read = iter(songs)
+            for scan in scans:
+                scan.songs = [e.song_dict(next(read)) for e in entries[scan.directory]]
+            self.rescanned.emit(scans)
         except Exception as e:
             self.error_occurred.emit(str(e))
 
+    @staticmethod
+    def _vanished(
+        tag_index: TagIndex, scan: DirectoryScan, found: list[LibraryEntry]
+    ) -> list[Path]:
+        """Indexed songs under ``scan.directory`` that the listing lost."""
+        listed = {str(e.path) for e in found}
+        prefix = scan.directory + os.sep
+        gone = []
+        for path in tag_index.paths_under(scan.directory):
+            key = str(path)
+            if not scan.exists:
+                gone.append(path)
+            elif os.path.dirname(key) == scan.directory:
+                if key not in listed:
+                    gone.append(path)
+            elif prefix + key[len(prefix) :].split(os.sep, 1)[0] not in scan.subdirs:
+                gone.append(path)
+        return gone
+
+    @staticmethod
+    def _list(directory: str) -> tuple[DirectoryScan, list[LibraryEntry]]:
+        scan = DirectoryScan(directory, exists=True)
+        found: list[LibraryEntry] = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.name == ".blocked":
+                            scan.blocked = True
+                        elif entry.is_dir(follow_symlinks=False):
+                            scan.subdirs.add(entry.path)
+                        elif entry.name[-4:].lower() == ".mp3" and entry.is_file():
+                            st = entry.stat()
+                            found.append(
+                                LibraryEntry(
+                                    Path(entry.path), st.st_size, st.st_mtime_ns
+                                )
+                            )
+                    except OSError:
+                        continue
+        except OSError:
+            return DirectoryScan(directory, exists=False), []
+        return scan, found
+
 
 class DownloadScanWorker(QThread):
     progress = Signal(int, int, str)
@@ -108,7 +277,7 @@ class DownloadScanWorker(QThread):
                 if self._downloads_dir.exists()
                 else []
             )
-            library = {p.name.lower() for p in scan_library(self._music_root)}
+            library = library_basenames(self._music_root)
             non_imported = [d for d in all_downloads if d.name.lower() not in library]
             self.progress.emit(100, 100, "Done.")
             self.ready.emit(all_downloads, non_imported)
@@ -127,22 +296,166 @@ class SongReadWorker(QThread):
     def run(self):
         try:
             s = read_song(self._song_path)
-            data = {
-                "path": self._song_path,
-                "channel": s.channel,
-                "title": s.title,
-                "comment": s.comment,
-                "filename": s.filename,
-                "why_made": s.why_made,
-                "backstory": s.backstory,
-                "radio_reason": s.radio_reason,
-                "music_theme": s.music_theme,
-                "listener_takeaway": s.listener_takeaway,
-                "vibe_analysis": s.vibe_analysis,
-                "vibe_summary": s.vibe_summary,
-                "vibe_cached_at_epoch": s.vibe_cached_at_epoch,
-                "vibe_cache_schema": s.vibe_cache_schema,
-            }
+            data = s.to_dict()
+            data["path"] = self._song_path
             self.song_ready.emit(self._song_path, data)
         except Exception as e:
             self.error_occurred.emit(str(e))
+
+
+class SearchIndexWorker(QThread):
+    index_ready = Signal(object)
+    error_occurred = Signal(str)
+
+    def __init__(self, music_root: Path, workers: int = 0, parent=None):
+        super().__init__(parent)
+        self._music_root = music_root
+        self._workers = scan_worker_count(workers)
+
+    def run(self):
+        try:
+            entries = walk_library(self._music_root, exclude_blocked=True)
+            songs = get_tag_index().sync(
+                entries,
+                is_cancelled=self.isInterruptionRequested,
+                workers=self._workers,
+            )
+            if songs is None:
+                return
+            index = SearchIndex(self._music_root)
+            index.build(songs)
+            self.index_ready.emit(index)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+
+class RelatedIndexWorker(QThread):
+    index_ready = Signal(object)
+    error_occurred = Signal(str)
+
+    def __init__(self, music_root: Path, workers: int = 0, parent=None):
+        super().__init__(parent)
+        self._music_root = music_root
+        self._workers = scan_worker_count(workers)
+
+    def run(self):
+        try:
+            entries = walk_library(self._music_root)
+            songs = get_tag_index().sync(
+                entries,
+                is_cancelled=self.isInterruptionRequested,
+                workers=self._workers,
+            )
+            if songs is None:
+                return
+            self.index_ready.emit(RelatedSongIndex(songs, self._music_root))
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+
+class VibeIndexWorker(QThread):
+    index_ready = Signal(object)
+    error_occurred = Signal(str)
+
+    def __init__(self, music_root: Path, parent=None):
+        super().__init__(parent)
+        self._music_root = music_root
+
+    def run(self):
+        try:
+            self.index_ready.emit(get_vibe_index(self._music_root))
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+
+class CommentResearchWorker(QThread):
+    """Prepares comment prompts for a batch of songs, one at a time.
+
+    Builds the related-song index once, then emits each song with its
+    filled-in prompt as soon as it is ready, so generation can start on the
+    first songs while the rest are still being researched.
+    """
+
+    prepared = Signal(int, object, str)
+    failed = Signal(int, str)
+    error_occurred = Signal(str)
+
+    def __init__(
+        self,
+        music_root: Path,
+        song_paths: list[Path],
+        prompts: PromptStore,
+        workers: int = 0,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self._music_root = music_root
+        self._song_paths = list(song_paths)
+        self._prompts = prompts
+        self._workers = scan_worker_count(workers)
+
+    def run(self):
+        try:
+            tag_index = get_tag_index()
+            songs = tag_index.sync(
+                walk_library(self._music_root),
+                is_cancelled=self.isInterruptionRequested,
+                workers=self._workers,
+            )
+            if songs is None:
+                return
+            index = RelatedSongIndex(songs, self._music_root)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+            return
+        for i, path in enumerate(self._song_paths):
+            if self.isInterruptionRequested():
+                return
+            try:
+                song = tag_index.get(path) or read_song(path)
+                # Uncached songs can still match on a previous analysis.
+                vibe = None if song.vibe else cached_analysis(path)
+                research = library_research(self._prompts, song, index, vibe)
+                prompt = comment_prompt(self._prompts, song, research)
+                self.prepared.emit(i, song, prompt)
+            except Exception as e:
+                self.failed.emit(i, str(e))
+
+
+class ChannelRankWorker(QThread):
+    """Ranks channels for a batch of downloads with the shared recommender."""
+
+    ranked = Signal(list)
+    error_occurred = Signal(str)
+
+    def __init__(
+        self, music_root: Path, downloads: list[Path], workers: int = 0, parent=None
+    ):
+        super().__init__(parent)
+        self._music_root = music_root
+        self._downloads = list(downloads)
+        self._workers = scan_worker_count(workers)
+
+    def _library_songs(self) -> list | None:
+        return get_tag_index().sync(
+            walk_library(self._music_root),
+            is_cancelled=self.isInterruptionRequested,
+            workers=self._workers,
+        )
+
+    def run(self):
+        try:
+            recommender = get_channel_recommender(
+                self._music_root,
+                self._library_songs,
+                get_channel_dirs(self._music_root),
+            )
+            if recommender is None:
+                return
+            vibes = [cached_analysis(path) for path in self._downloads]
+            if self.isInterruptionRequested():
+                return
+            names = [path.name for path in self._downloads]
+            self.ranked.emit(recommender.rank_batch(names, vibes))
+        except Exception as e:
+            self.error_occurred.emit(str(e))
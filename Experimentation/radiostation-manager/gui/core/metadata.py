@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import os
 import subprocess
+from dataclasses import dataclass
 from pathlib import Path
 
+from gui.core.analysis_cache import audio_fingerprint, fingerprint_confirmed_at
+from gui.core.id3 import ID3Error, read_id3_tags, write_id3_tags
 from gui.core.song import Song
 
 MIDORI_TAG_WHY_MADE = "midori_ai_why_made"
@@ -14,9 +18,21 @@ MIDORI_TAG_VIBE_ANALYSIS = "midori_ai_vibe_analysis"
 MIDORI_TAG_VIBE_SUMMARY = "midori_ai_vibe_summary"
 MIDORI_TAG_VIBE_CACHED_AT_EPOCH = "midori_ai_vibe_cached_at_epoch"
 MIDORI_TAG_VIBE_CACHE_SCHEMA = "midori_ai_vibe_cache_schema"
+MIDORI_TAG_VIBE_AUDIO_HASH = "midori_ai_vibe_audio_hash"
 
 
 def _get_all_tags(file_path: Path) -> dict[str, str]:
+    """Return all format tags as a dict, reading ID3 in-process when possible."""
+    try:
+        tags = read_id3_tags(file_path)
+    except Exception:
+        tags = None
+    if tags is not None:
+        return tags
+    return _ffprobe_tags(file_path)
+
+
+def _ffprobe_tags(file_path: Path) -> dict[str, str]:
     """Run ffprobe once and return all format tags as a dict."""
     try:
         result = subprocess.run(
@@ -74,38 +90,116 @@ def read_song(file_path: Path) -> Song:
         vibe_summary=tags.get(MIDORI_TAG_VIBE_SUMMARY, ""),
         vibe_cached_at_epoch=tags.get(MIDORI_TAG_VIBE_CACHED_AT_EPOCH, ""),
         vibe_cache_schema=tags.get(MIDORI_TAG_VIBE_CACHE_SCHEMA, ""),
+        vibe_audio_hash=tags.get(MIDORI_TAG_VIBE_AUDIO_HASH, ""),
+        lyrics=tags.get("lyrics-eng") or _first_lyrics(tags),
     )
 
 
-def scan_library(music_root: Path, exclude_blocked: bool = False) -> list[Path]:
+def _first_lyrics(tags: dict[str, str]) -> str:
+    for key, value in tags.items():
+        if key.startswith("lyrics"):
+            return value
+    return ""
+
+
+@dataclass(frozen=True)
+class LibraryEntry:
+    path: Path
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def from_path(cls, path: Path) -> LibraryEntry:
+        st = path.stat()
+        return cls(path, st.st_size, st.st_mtime_ns)
+
+    def song_dict(self, song: Song) -> dict:
+        """``song.to_dict()`` plus the size and mtime this scan already saw."""
+        return {
+            **song.to_dict(),
+            "size": self.size,
+            "mtime": self.mtime_ns / 1e9,
+            "mtime_ns": self.mtime_ns,
+        }
+
+
+def _iter_mp3_dirs(music_root: Path, exclude_blocked: bool):
+    """Yield (directory, mp3 DirEntries) in one os.scandir pass per directory.
+
+    ``.blocked`` is noticed while listing the directory itself, so blocked
+    channels cost no extra stat calls.
+    """
+    stack = [str(music_root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            it = os.scandir(directory)
+        except OSError:
+            continue
+        mp3s: list[os.DirEntry] = []
+        blocked = False
+        with it:
+            for entry in it:
+                name = entry.name
+                if name == ".blocked":
+                    blocked = True
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif name[-4:].lower() == ".mp3" and entry.is_file():
+                        mp3s.append(entry)
+                except OSError:
+                    continue
+        if mp3s and not (exclude_blocked and blocked):
+            yield directory, mp3s
+
+
+def walk_library(music_root: Path, exclude_blocked: bool = False) -> list[LibraryEntry]:
     if not music_root.exists():
         return []
-    paths: list[Path] = []
-    for mp3 in sorted(music_root.rglob("*.mp3")):
-        if exclude_blocked and (mp3.parent / ".blocked").exists():
-            continue
-        paths.append(mp3)
-    for mp3 in sorted(music_root.rglob("*.MP3")):
-        if exclude_blocked and (mp3.parent / ".blocked").exists():
-            continue
-        paths.append(mp3)
-    return list(dict.fromkeys(paths))
+    entries: list[LibraryEntry] = []
+    for _, mp3s in _iter_mp3_dirs(music_root, exclude_blocked):
+        for entry in mp3s:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append(LibraryEntry(Path(entry.path), st.st_size, st.st_mtime_ns))
+    entries.sort(key=lambda e: e.path)
+    return entries
+
+
+def library_basenames(music_root: Path) -> set[str]:
+    """Lowercased file names of every library MP3, without stat-ing any file."""
+    if not music_root.exists():
+        return set()
+    return {
+        entry.name.lower()
+        for _, mp3s in _iter_mp3_dirs(music_root, exclude_blocked=False)
+        for entry in mp3s
+    }
+
+
+def scan_library(music_root: Path, exclude_blocked: bool = False) -> list[Path]:
+    return [e.path for e in walk_library(music_root, exclude_blocked=exclude_blocked)]
 
 
 def scan_downloads(downloads_dir: Path) -> list[Path]:
     if not downloads_dir.exists():
         return []
-    paths: list[Path] = []
-    for mp3 in sorted(
-        downloads_dir.glob("*.mp3"), key=lambda p: p.stat().st_mtime, reverse=True
-    ):
-        paths.append(mp3)
-    for mp3 in sorted(
-        downloads_dir.glob("*.MP3"), key=lambda p: p.stat().st_mtime, reverse=True
-    ):
-        if mp3 not in paths:
-            paths.append(mp3)
-    return paths
+    found: list[tuple[float, Path]] = []
+    with os.scandir(downloads_dir) as it:
+        for entry in it:
+            if entry.name[-4:].lower() != ".mp3":
+                continue
+            try:
+                if entry.is_file():
+                    found.append((entry.stat().st_mtime, Path(entry.path)))
+            except OSError:
+                continue
+    found.sort(key=lambda item: item[0], reverse=True)
+    return [p for _, p in found]
 
 
 def is_outdated_comment(comment: str) -> bool:
@@ -114,7 +208,25 @@ def is_outdated_comment(comment: str) -> bool:
     return any(t in lower for t in triggers)
 
 
-def recommend_channel(filename: str, channels: list[str]) -> str | None:
+MIN_CHANNEL_CONFIDENCE = 0.4
+
+
+def recommend_channel(
+    filename: str,
+    channels: list[str],
+    ranked: list[tuple[str, float]] | None = None,
+) -> str | None:
+    """Pick a channel for an incoming song.
+
+    ``ranked`` is a learned ``(channel, confidence)`` ranking for the file
+    (see ChannelRecommender); its best channel in ``channels`` wins when it
+    is at least MIN_CHANNEL_CONFIDENCE, otherwise filename keywords decide.
+    """
+    for channel, confidence in ranked or ():
+        if channel in channels:
+            if confidence >= MIN_CHANNEL_CONFIDENCE:
+                return channel
+            break
     rules = [
         ("lofi", "lofi"),
         ("chill", "chill"),
@@ -176,57 +288,25 @@ def get_file_mtime(file_path: Path) -> int:
         return 0
 
 
-def write_song_metadata(song: Song) -> tuple[bool, str]:
-    song_dir = song.path.parent
-    song_dir.mkdir(parents=True, exist_ok=True)
-    temp_path = song_dir / f".metadata-update-{song.path.stem}.mp3"
+def _index_written_song(song: Song) -> None:
     try:
-        result = subprocess.run(
-            [
-                "ffmpeg",
-                "-hide_banner",
-                "-loglevel",
-                "error",
-                "-y",
-                "-i",
-                str(song.path),
-                "-map",
-                "0",
-                "-c",
-                "copy",
-                "-metadata",
-                f"comment={song.comment}",
-                "-metadata",
-                f"{MIDORI_TAG_WHY_MADE}={song.why_made}",
-                "-metadata",
-                f"{MIDORI_TAG_BACKSTORY}={song.backstory}",
-                "-metadata",
-                f"{MIDORI_TAG_RADIO_REASON}={song.radio_reason}",
-                "-metadata",
-                f"{MIDORI_TAG_MUSIC_THEME}={song.music_theme}",
-                "-metadata",
-                f"{MIDORI_TAG_LISTENER_TAKEAWAY}={song.listener_takeaway}",
-                str(temp_path),
-            ],
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
-        if result.returncode != 0:
-            temp_path.unlink(missing_ok=True)
-            return False, result.stderr
-        temp_path.rename(song.path)
-        return True, ""
-    except Exception as e:
-        temp_path.unlink(missing_ok=True)
-        return False, str(e)
+        from gui.core.tag_index import get_tag_index
+
+        get_tag_index().record(song)
+    except Exception:
+        pass
 
 
-def write_vibe_cache(song: Song) -> tuple[bool, str]:
+def _ffmpeg_write_tags(
+    song: Song, tags: dict[str, str], temp_prefix: str, preserve_mtime: bool
+) -> tuple[bool, str]:
     song_dir = song.path.parent
     song_dir.mkdir(parents=True, exist_ok=True)
-    temp_path = song_dir / f".vibe-cache-{song.path.stem}.mp3"
+    temp_path = song_dir / f"{temp_prefix}{song.path.stem}.mp3"
     original_mtime = get_file_mtime(song.path)
+    metadata_args: list[str] = []
+    for key, value in tags.items():
+        metadata_args += ["-metadata", f"{key}={value}"]
     try:
         result = subprocess.run(
             [
@@ -241,14 +321,7 @@ def write_vibe_cache(song: Song) -> tuple[bool, str]:
                 "0",
                 "-c",
                 "copy",
-                "-metadata",
-                f"{MIDORI_TAG_VIBE_ANALYSIS}={song.vibe_analysis}",
-                "-metadata",
-                f"{MIDORI_TAG_VIBE_SUMMARY}={song.vibe_summary}",
-                "-metadata",
-                f"{MIDORI_TAG_VIBE_CACHED_AT_EPOCH}={song.vibe_cached_at_epoch}",
-                "-metadata",
-                f"{MIDORI_TAG_VIBE_CACHE_SCHEMA}={song.vibe_cache_schema}",
+                *metadata_args,
                 str(temp_path),
             ],
             capture_output=True,
@@ -259,16 +332,71 @@ def write_vibe_cache(song: Song) -> tuple[bool, str]:
             temp_path.unlink(missing_ok=True)
             return False, result.stderr
         temp_path.rename(song.path)
-        if original_mtime > 0:
-            import os
-
+        if preserve_mtime and original_mtime > 0:
             os.utime(song.path, (original_mtime, original_mtime))
+        _index_written_song(song)
         return True, ""
     except Exception as e:
         temp_path.unlink(missing_ok=True)
         return False, str(e)
 
 
+def _write_tags(
+    song: Song, tags: dict[str, str], temp_prefix: str, preserve_mtime: bool = False
+) -> tuple[bool, str]:
+    """Update tags in place, falling back to an ffmpeg remux for odd tags."""
+    try:
+        write_id3_tags(song.path, tags, preserve_mtime=preserve_mtime)
+    except ID3Error:
+        return _ffmpeg_write_tags(song, tags, temp_prefix, preserve_mtime)
+    except Exception as e:
+        return False, str(e)
+    _index_written_song(song)
+    return True, ""
+
+
+def write_song_metadata(song: Song) -> tuple[bool, str]:
+    return _write_tags(
+        song,
+        {
+            "comment": song.comment,
+            MIDORI_TAG_WHY_MADE: song.why_made,
+            MIDORI_TAG_BACKSTORY: song.backstory,
+            MIDORI_TAG_RADIO_REASON: song.radio_reason,
+            MIDORI_TAG_MUSIC_THEME: song.music_theme,
+            MIDORI_TAG_LISTENER_TAKEAWAY: song.listener_takeaway,
+        },
+        ".metadata-update-",
+    )
+
+
+def write_vibe_cache(song: Song) -> tuple[bool, str]:
+    """Write the vibe record, stamped with the audio it describes.
+
+    The fingerprint is what later tells a changed file from one whose other
+    tags were merely edited. One already confirmed at the file's current
+    mtime is kept as-is; the write preserves mtime, so it stays confirmed.
+    """
+    try:
+        mtime_ns = song.path.stat().st_mtime_ns
+        if not fingerprint_confirmed_at(song.vibe_audio_hash, mtime_ns):
+            song.vibe_audio_hash = audio_fingerprint(song.path, mtime_ns)
+    except OSError as e:
+        return False, str(e)
+    return _write_tags(
+        song,
+        {
+            MIDORI_TAG_VIBE_ANALYSIS: song.vibe_analysis,
+            MIDORI_TAG_VIBE_SUMMARY: song.vibe_summary,
+            MIDORI_TAG_VIBE_CACHED_AT_EPOCH: song.vibe_cached_at_epoch,
+            MIDORI_TAG_VIBE_CACHE_SCHEMA: song.vibe_cache_schema,
+            MIDORI_TAG_VIBE_AUDIO_HASH: song.vibe_audio_hash,
+        },
+        ".vibe-cache-",
+        preserve_mtime=True,
+    )
+
+
 def trash_file(file_path: Path) -> bool:
     for tool in ["kioclient", "kioclient5"]:
         try:
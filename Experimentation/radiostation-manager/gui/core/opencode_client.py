@@ -1,17 +1,169 @@
 from __future__ import annotations
 
-import json
-import re
+import atexit
+import socket
 import subprocess
 import tempfile
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
 
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import QObject, QRunnable, QThread, QThreadPool, QTimer, Signal
+
+from gui.core.config import get_config
+from gui.core.generation_cache import generation_key, get_generation_cache
+from gui.core.opencode_events import (
+    ErrorEvent,
+    OpenCodeEvent,
+    OpenCodeEventParser,
+    ReasoningDelta,
+    SessionStarted,
+    StepFinish,
+    TextDelta,
+)
+
+SERVER_START_TIMEOUT = 20.0
+PROGRESS_INTERVAL = 0.25
+
+
+class OpenCodeError(RuntimeError):
+    pass
+
+
+@dataclass
+class OpenCodeJob:
+    prompt: str
+    working_dir: Path
+    model: str
+    variant: str
+    session_id: str = ""  # continue this session
+    continue_session: bool = False  # continue the latest session in working_dir
+
+    def command(self, attach: str = "") -> list[str]:
+        cmd = [
+            "opencode",
+            "run",
+            "--dir",
+            str(self.working_dir),
+            "--variant",
+            self.variant,
+            "-m",
+            self.model,
+            "--thinking",
+            "--format",
+            "json",
+        ]
+        if attach:
+            cmd += ["--attach", attach]
+        if self.session_id:
+            cmd += ["--session", self.session_id]
+        elif self.continue_session:
+            cmd.append("-c")
+        cmd.append(self.prompt)
+        return cmd
+
+
+class OpenCodeCall:
+    """One ``opencode run`` process whose stdout is read with blocking reads.
+
+    ``cancel`` may be called from any thread: it terminates the process, so
+    a read waiting for output returns EOF instead of spinning. stderr goes
+    to a temporary file so a chatty process can never fill the pipe.
+    """
+
+    def __init__(self, job: OpenCodeJob, attach: str = ""):
+        self.job = job
+        self._attach = attach
+        self._lock = threading.Lock()
+        self._proc: subprocess.Popen | None = None
+        self.cancelled = False
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            if self._proc is not None and self._proc.poll() is None:
+                self._proc.terminate()
+
+    def lines(self):
+        """Yield non-empty stdout lines; raise OpenCodeError on failure."""
+        with tempfile.TemporaryFile() as stderr:
+            with self._lock:
+                if self.cancelled:
+                    return
+                self._proc = subprocess.Popen(
+                    self.job.command(self._attach),
+                    stdout=subprocess.PIPE,
+                    stderr=stderr,
+                    text=True,
+                )
+            proc = self._proc
+            assert proc.stdout is not None
+            try:
+                for line in proc.stdout:
+                    line = line.strip()
+                    if line:
+                        yield line
+            finally:
+                if proc.poll() is None:
+                    proc.terminate()
+                proc.wait()
+            if proc.returncode != 0 and not self.cancelled:
+                stderr.seek(0)
+                message = stderr.read().decode(errors="replace").strip()
+                raise OpenCodeError(
+                    message or f"OpenCode exited with code {proc.returncode}"
+                )
+
+
+def _generate(call: OpenCodeCall, signals) -> tuple[str, str]:
+    """Stream ``call`` through an event parser into ``signals``.
+
+    Returns (answer text, session id). ``signals`` has the signals of
+    OpenCodeSignals; OpenCodeWorker declares the same ones. Progress and
+    reasoning updates are throttled to PROGRESS_INTERVAL.
+    """
+    parser = OpenCodeEventParser()
+    errors: list[str] = []
+    last_report = 0.0
+
+    def report(event: OpenCodeEvent):
+        nonlocal last_report
+        now = time.monotonic()
+        if now - last_report < PROGRESS_INTERVAL and not isinstance(
+            event, StepFinish
+        ):
+            return
+        last_report = now
+        stats = parser.snapshot()
+        signals.stats_update.emit(stats)
+        signals.progress_update.emit(0, 0, stats.describe())
+        if isinstance(event, ReasoningDelta):
+            signals.reasoning_update.emit(parser.reasoning_tail())
+
+    parser.subscribe(signals.event.emit)
+    parser.subscribe(
+        lambda e: signals.session_started.emit(e.session_id), SessionStarted
+    )
+    parser.subscribe(lambda e: errors.append(e.message), ErrorEvent)
+    parser.subscribe(report, TextDelta, ReasoningDelta, StepFinish)
+
+    signals.progress_update.emit(0, 0, "Starting...")
+    for line in call.lines():
+        parser.feed(line + "\n")
+    parser.close()
+    if errors and not parser.answer and not call.cancelled:
+        raise OpenCodeError(errors[-1])
+    signals.stats_update.emit(parser.snapshot())
+    return parser.answer, parser.session_id
 
 
 class OpenCodeWorker(QThread):
     progress_update = Signal(int, int, str)
     reasoning_update = Signal(str)
+    session_started = Signal(str)
+    event = Signal(object)  # typed events from gui.core.opencode_events
+    stats_update = Signal(object)  # GenerationStats
     finished = Signal(str)
     error_occurred = Signal(str)
 
@@ -25,108 +177,319 @@ class OpenCodeWorker(QThread):
         parent=None,
     ):
         super().__init__(parent)
-        self._prompt = prompt
-        self._working_dir = working_dir
-        self._model = model
-        self._variant = variant
-        self._continue = continue_session
-        self._cancelled = False
+        self._call = OpenCodeCall(
+            OpenCodeJob(prompt, working_dir, model, variant, "", continue_session)
+        )
 
     def cancel(self):
-        self._cancelled = True
+        self._call.cancel()
         self.requestInterruption()
 
     def run(self):
-        output_file = tempfile.mktemp(suffix=".jsonl", prefix="opencode-")
         try:
-            cmd = [
-                "opencode",
-                "run",
-                "--dir",
-                str(self._working_dir),
-                "--variant",
-                self._variant,
-                "-m",
-                self._model,
-                "--thinking",
-                "--format",
-                "json",
-            ]
-            if self._continue:
-                cmd.append("-c")
-            cmd.append(self._prompt)
-
-            self.progress_update.emit(0, 100, "Starting...")
-
-            proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-            )
-            assert proc.stdout is not None and proc.stderr is not None
+            final, _ = _generate(self._call, self)
+            if not self._call.cancelled:
+                self.progress_update.emit(100, 100, "Done.")
+            self.finished.emit(final)
+        except FileNotFoundError:
+            self.error_occurred.emit("opencode not found in PATH")
+        except Exception as e:
+            self.error_occurred.emit(str(e))
 
-            full_text = ""
-            partial_text = ""
-            line_count = 0
 
-            while True:
-                if self._cancelled or self.isInterruptionRequested():
-                    proc.terminate()
-                    self.finished.emit(full_text if full_text else partial_text)
+class OpenCodeSignals(QObject):
+    progress_update = Signal(int, int, str)
+    reasoning_update = Signal(str)
+    session_started = Signal(str)
+    event = Signal(object)  # typed events from gui.core.opencode_events
+    stats_update = Signal(object)  # GenerationStats
+    attempt_failed = Signal(int, str, str)  # attempt, model, error
+    finished = Signal(str)
+    error_occurred = Signal(str)
+
+
+class OpenCodeTask(QRunnable):
+    """A generation that retries through ``attempts`` until one gives text.
+
+    ``attempts`` is a list of (model, variant) pairs tried in order; an
+    empty answer counts as a failed attempt. Cancelled tasks emit nothing.
+    With a ``cache_key`` the answer is stored in the generation cache, and
+    ``reuse`` answers from the cache instead of running OpenCode on a hit.
+    """
+
+    def __init__(
+        self,
+        prompt: str,
+        working_dir: Path,
+        attempts: list[tuple[str, str]],
+        session_id: str = "",
+        server: OpenCodeServer | None = None,
+        cache_key: str = "",
+        song: str = "",
+        reuse: bool = False,
+    ):
+        super().__init__()
+        self.prompt = prompt
+        self.working_dir = working_dir
+        self.attempts = attempts
+        self.session_id = session_id
+        self.signals = OpenCodeSignals()
+        self.cache_key = cache_key
+        self.song = song
+        self.reuse = reuse
+        self.from_cache = False
+        self._cached: str | None = None
+        self._server = server
+        self._lock = threading.Lock()
+        self._call: OpenCodeCall | None = None
+        self.cancelled = False
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            call = self._call
+        if call is not None:
+            call.cancel()
+
+    def cached_draft(self) -> str:
+        """The newest cached answer if this task may reuse one, else ""."""
+        if self._cached is None:
+            cache = get_generation_cache() if self.cache_key and self.reuse else None
+            hits = cache.get(self.cache_key) if cache is not None else []
+            self._cached = hits[0].draft if hits else ""
+        return self._cached
+
+    def run(self):
+        if self.cached_draft():
+            if not self.cancelled:
+                self.from_cache = True
+                self.signals.progress_update.emit(100, 100, "Reused a cached draft.")
+                self.signals.finished.emit(self._cached)
+            return
+        cache = get_generation_cache() if self.cache_key else None
+        error = "No attempts configured"
+        for attempt, (model, variant) in enumerate(self.attempts, start=1):
+            attach = self._server.url() if self._server is not None else ""
+            job = OpenCodeJob(
+                self.prompt, self.working_dir, model, variant, self.session_id
+            )
+            with self._lock:
+                if self.cancelled:
+                    return
+                self._call = OpenCodeCall(job, attach)
+            try:
+                final, session = _generate(self._call, self.signals)
+            except FileNotFoundError:
+                self.signals.error_occurred.emit("opencode not found in PATH")
+                return
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            else:
+                if self.cancelled:
+                    return
+                # Retries continue the conversation the first attempt began.
+                self.session_id = self.session_id or session
+                if final:
+                    if cache is not None:
+                        cache.put(self.cache_key, final, self.song)
+                    self.signals.progress_update.emit(100, 100, "Done.")
+                    self.signals.finished.emit(final)
                     return
+                error = "OpenCode returned an empty answer"
+            if self.cancelled:
+                return
+            self.signals.attempt_failed.emit(attempt, model, error)
+        self.signals.error_occurred.emit(error)
+
+
+class OpenCodeServer:
+    """A warm ``opencode serve`` process that runs attach to.
+
+    Attached runs skip OpenCode's own startup (config, providers, MCP
+    servers) on every generation. If the server cannot be started, ``url``
+    returns "" and runs start their own process as before.
+    """
 
-                line = proc.stdout.readline()
-                if not line and proc.poll() is not None:
-                    break
-                if not line:
-                    continue
-
-                line = line.strip()
-                if not line:
-                    continue
-
-                line_count += 1
-                if line_count % 5 == 0:
-                    self.progress_update.emit(
-                        min(line_count * 2, 90), 100, "Thinking..."
-                    )
-
-                try:
-                    data = json.loads(line)
-                    msg_type = data.get("type", "")
-                    text = data.get("part", {}).get("text", "")
-                    if msg_type == "text" and text:
-                        full_text = text
-                        partial_text = text
-                    if msg_type == "reasoning" and text:
-                        clean = re.sub(r"<think>|</think>", "", text).strip()
-                        if clean:
-                            self.reasoning_update.emit(clean[:200])
-                except (json.JSONDecodeError, KeyError):
-                    pass
-
-            proc.wait()
+    def __init__(self, host: str = "127.0.0.1"):
+        self._host = host
+        self._lock = threading.Lock()
+        self._proc: subprocess.Popen | None = None
+        self._url = ""
+        self._failed = False
+
+    def url(self) -> str:
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                return self._url
+            if self._failed:
+                return ""
             try:
-                stderr_output = proc.stderr.read() if proc.stderr else ""
-            except Exception:
-                stderr_output = ""
+                self._start()
+            except (OSError, OpenCodeError):
+                self._failed = True
+                self._proc = None
+                self._url = ""
+            return self._url
 
-            if proc.returncode != 0:
-                self.error_occurred.emit(
-                    stderr_output or f"OpenCode exited with code {proc.returncode}"
-                )
-                return
+    def _start(self):
+        with socket.socket() as probe:
+            probe.bind((self._host, 0))
+            port = probe.getsockname()[1]
+        self._proc = subprocess.Popen(
+            ["opencode", "serve", "--hostname", self._host, "--port", str(port)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self._proc.poll() is not None:
+                raise OpenCodeError("opencode serve exited during startup")
+            try:
+                socket.create_connection((self._host, port), timeout=0.5).close()
+            except OSError:
+                time.sleep(0.2)
+                continue
+            self._url = f"http://{self._host}:{port}"
+            return
+        self._proc.terminate()
+        raise OpenCodeError("opencode serve did not start in time")
 
-            final = re.sub(
-                r"<think>.*?</think>", "", full_text or partial_text, flags=re.DOTALL
-            ).strip()
-            self.progress_update.emit(100, 100, "Done.")
-            self.finished.emit(final)
+    def stop(self):
+        with self._lock:
+            proc, self._proc, self._url = self._proc, None, ""
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
 
-        except FileNotFoundError:
-            self.error_occurred.emit("opencode not found in PATH")
-        except Exception as e:
-            self.error_occurred.emit(str(e))
-        finally:
-            Path(output_file).unlink(missing_ok=True)
+
+def model_attempts(model: str = "", variant: str = "") -> list[tuple[str, str]]:
+    """(model, variant) per attempt: the primary, then the fallback last.
+
+    ``max_opencode_attempts`` counts every try; with two or more the final
+    one uses the configured fallback model.
+    """
+    config = get_config()
+    primary = (model or config.opencode_model, variant or config.opencode_variant)
+    total = max(1, config.max_opencode_attempts)
+    fallback = (config.opencode_fallback_model, config.opencode_fallback_variant)
+    if total == 1 or not fallback[0]:
+        return [primary] * total
+    return [primary] * (total - 1) + [fallback]
+
+
+class OpenCodeRunner(QObject):
+    """Runs OpenCode generations on a bounded pool, attached to a warm server.
+
+    Up to ``opencode_parallelism`` generations run at once; the rest queue.
+    """
+
+    def __init__(self, parallelism: int = 0, parent=None):
+        super().__init__(parent)
+        config = get_config()
+        self._server = OpenCodeServer() if config.opencode_warm_server else None
+        self._pool = QThreadPool(self)
+        self.set_parallelism(parallelism or config.opencode_parallelism)
+        self._tasks_lock = threading.Lock()
+        self._tasks: set[OpenCodeTask] = set()
+
+    @property
+    def parallelism(self) -> int:
+        return self._pool.maxThreadCount()
+
+    def set_parallelism(self, count: int):
+        self._pool.setMaxThreadCount(max(1, count))
+
+    def submit(
+        self,
+        prompt: str,
+        working_dir: Path,
+        session_id: str = "",
+        model: str = "",
+        variant: str = "",
+        attempts: list[tuple[str, str]] | None = None,
+        template: str | None = None,
+        song: str = "",
+        reuse: bool = False,
+    ) -> OpenCodeTask:
+        """Queue a generation and return its task.
+
+        The task starts on the next event loop turn, so signals connected
+        right after ``submit`` returns see every event, even an immediate
+        error. Passing the ``template`` the prompt was formatted from caches
+        the answer (see ``OpenCodeTask``).
+        """
+        attempts = attempts or model_attempts(model, variant)
+        cache_key = ""
+        if template is not None and attempts:
+            cache_key = generation_key(template, *attempts[0], prompt)
+        task = OpenCodeTask(
+            prompt,
+            working_dir,
+            attempts,
+            session_id,
+            self._server,
+            cache_key,
+            song,
+            reuse,
+        )
+        task.setAutoDelete(False)
+        with self._tasks_lock:
+            self._tasks.add(task)
+        task.signals.finished.connect(lambda _: self._forget(task))
+        task.signals.error_occurred.connect(lambda _: self._forget(task))
+        QTimer.singleShot(0, self, lambda: self._start(task))
+        return task
+
+    def _start(self, task: OpenCodeTask):
+        if task.cancelled:
+            return
+        if task.cached_draft():
+            # Nothing to generate: answer now, without queueing behind
+            # generations.
+            task.run()
+        else:
+            self._pool.start(task)
+
+    def _forget(self, task: OpenCodeTask):
+        with self._tasks_lock:
+            self._tasks.discard(task)
+
+    def cancel(self, task: OpenCodeTask):
+        task.cancel()
+        self._forget(task)
+
+    def cancel_all(self):
+        with self._tasks_lock:
+            tasks = list(self._tasks)
+        for task in tasks:
+            self.cancel(task)
+
+    def shutdown(self, timeout_ms: int = 3000):
+        self.cancel_all()
+        self._pool.waitForDone(timeout_ms)
+        if self._server is not None:
+            self._server.stop()
+
+
+_shared: list[OpenCodeRunner] = []
+_shared_lock = threading.Lock()
+
+
+def get_opencode_runner() -> OpenCodeRunner:
+    """The app-wide runner, so every caller shares one parallelism limit."""
+    with _shared_lock:
+        if not _shared:
+            _shared.append(OpenCodeRunner())
+        return _shared[0]
+
+
+@atexit.register
+def shutdown_opencode_runner():
+    with _shared_lock:
+        runners = list(_shared)
+        _shared.clear()
+    for runner in runners:
+        runner.shutdown()
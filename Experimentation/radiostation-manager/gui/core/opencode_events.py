@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass, field, replace
+from typing import Callable
+
+# Rough size of a token in English text, for throughput before OpenCode
+# reports exact counts at the end of a step.
+CHARS_PER_TOKEN = 4
+_THINK_OPEN = "<think>"
+_THINK_CLOSE = "</think>"
+
+
+@dataclass(frozen=True)
+class SessionStarted:
+    session_id: str
+
+
+@dataclass(frozen=True)
+class TextDelta:
+    part_id: str
+    delta: str  # visible answer text, <think> blocks removed
+
+
+@dataclass(frozen=True)
+class ReasoningDelta:
+    part_id: str
+    delta: str
+
+
+@dataclass(frozen=True)
+class ToolCall:
+    part_id: str
+    tool: str
+    status: str
+    title: str = ""
+
+
+@dataclass(frozen=True)
+class StepFinish:
+    reason: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    reasoning_tokens: int = 0
+    cost: float = 0.0
+
+
+@dataclass(frozen=True)
+class ErrorEvent:
+    message: str
+
+
+OpenCodeEvent = (
+    SessionStarted | TextDelta | ReasoningDelta | ToolCall | StepFinish | ErrorEvent
+)
+
+
+@dataclass
+class GenerationStats:
+    started: float
+    first_token: float | None = None
+    last_token: float | None = None
+    estimated_tokens: int = 0  # from streamed characters
+    reported_tokens: int = 0  # output + reasoning tokens from finished steps
+
+    @property
+    def tokens(self) -> int:
+        return max(self.reported_tokens, self.estimated_tokens)
+
+    @property
+    def time_to_first_token(self) -> float | None:
+        if self.first_token is None:
+            return None
+        return self.first_token - self.started
+
+    @property
+    def tokens_per_second(self) -> float:
+        if self.first_token is None or self.last_token is None:
+            return 0.0
+        elapsed = self.last_token - self.first_token
+        return self.tokens / elapsed if elapsed > 0 else 0.0
+
+    def describe(self) -> str:
+        ttft = self.time_to_first_token
+        if ttft is None:
+            return "Waiting for the first token..."
+        return (
+            f"First token after {ttft:.1f}s, {self.tokens} tokens "
+            f"at {self.tokens_per_second:.0f} tok/s"
+        )
+
+
+def _string(value) -> str:
+    return value if isinstance(value, str) else ""
+
+
+def _number(value, kind: type = int):
+    """``value`` as ``kind``, or 0 when OpenCode sent something unusable."""
+    try:
+        return kind(value or 0)
+    except (TypeError, ValueError, OverflowError):
+        return kind(0)
+
+
+class _ThinkFilter:
+    """Drops ``<think>...</think>`` spans from text that arrives in pieces."""
+
+    def __init__(self):
+        self._inside = False
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        text = self._pending + text
+        self._pending = ""
+        out = []
+        while text:
+            tag = _THINK_CLOSE if self._inside else _THINK_OPEN
+            at = text.find(tag)
+            if at < 0:
+                # Hold back a suffix that could be the start of the tag.
+                keep = next(
+                    (n for n in range(len(tag) - 1, 0, -1) if text.endswith(tag[:n])),
+                    0,
+                )
+                if not self._inside:
+                    out.append(text[: len(text) - keep])
+                self._pending = text[len(text) - keep :]
+                break
+            if not self._inside:
+                out.append(text[:at])
+            text = text[at + len(tag) :]
+            self._inside = not self._inside
+        return "".join(out)
+
+    def flush(self) -> str:
+        """Release held-back text once no more can arrive."""
+        text, self._pending = self._pending, ""
+        return "" if self._inside else text
+
+
+@dataclass
+class _Part:
+    raw: str = ""
+    visible: list[str] = field(default_factory=list)
+    think: _ThinkFilter = field(default_factory=_ThinkFilter)
+
+
+class OpenCodeEventParser:
+    """Decodes ``opencode run --format json`` output as it streams in.
+
+    ``feed`` accepts arbitrary chunks; complete lines are decoded into typed
+    events and passed to subscribers. OpenCode resends a part's full text on
+    each update (or sends a ``delta``); either way only new text is dispatched.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._buffer = ""
+        self._subscribers: list[tuple[tuple[type, ...], Callable]] = []
+        self._text_parts: dict[str, _Part] = {}
+        self._reasoning_parts: dict[str, str] = {}
+        self._last_text_part = ""
+        self.session_id = ""
+        self.stats = GenerationStats(started=clock())
+
+    def subscribe(self, handler: Callable[[OpenCodeEvent], None], *types: type):
+        """Call ``handler`` for events of ``types`` (all events if none)."""
+        self._subscribers.append((types, handler))
+
+    @property
+    def answer(self) -> str:
+        """Visible text of the latest text part, i.e. the final answer."""
+        part = self._text_parts.get(self._last_text_part)
+        return "".join(part.visible).strip() if part else ""
+
+    def reasoning_tail(self, length: int = 200) -> str:
+        text = "".join(self._reasoning_parts.values())
+        text = text.replace(_THINK_OPEN, "").replace(_THINK_CLOSE, "")
+        return " ".join(text.split())[-length:]
+
+    def snapshot(self) -> GenerationStats:
+        return replace(self.stats)
+
+    def feed(self, chunk: str):
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._decode(line)
+
+    def close(self):
+        if self._buffer:
+            line, self._buffer = self._buffer, ""
+            self._decode(line)
+        for part_id, state in self._text_parts.items():
+            tail = state.think.flush()
+            if tail:
+                state.visible.append(tail)
+                self._emit(TextDelta(part_id, tail))
+
+    def _emit(self, event: OpenCodeEvent):
+        for types, handler in self._subscribers:
+            if not types or isinstance(event, types):
+                handler(event)
+
+    def _decode(self, line: str):
+        line = line.strip()
+        if not line:
+            return
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            return
+        if not isinstance(data, dict):
+            return
+        session = _string(data.get("sessionID"))
+        if session and not self.session_id:
+            self.session_id = session
+            self._emit(SessionStarted(session))
+        kind = _string(data.get("type"))
+        if kind == "error":
+            self._emit(ErrorEvent(self._error_message(data.get("error"))))
+            return
+        # Anything malformed below is skipped; it must never end the stream.
+        part = data.get("part") or {}
+        if not isinstance(part, dict):
+            return
+        part_id = _string(part.get("id")) or kind
+        if kind == "text":
+            self._on_text(part_id, part)
+        elif kind == "reasoning":
+            self._on_reasoning(part_id, part)
+        elif kind == "tool_use":
+            state = part.get("state") or {}
+            if not isinstance(state, dict):
+                state = {}
+            self._emit(
+                ToolCall(
+                    part_id,
+                    _string(part.get("tool")),
+                    _string(state.get("status")),
+                    _string(state.get("title")),
+                )
+            )
+        elif kind == "step_finish":
+            tokens = part.get("tokens") or {}
+            if not isinstance(tokens, dict):
+                tokens = {}
+            finish = StepFinish(
+                _string(part.get("reason")),
+                _number(tokens.get("input")),
+                _number(tokens.get("output")),
+                _number(tokens.get("reasoning")),
+                _number(part.get("cost"), float),
+            )
+            self.stats.reported_tokens += (
+                finish.output_tokens + finish.reasoning_tokens
+            )
+            self._emit(finish)
+
+    @staticmethod
+    def _error_message(error) -> str:
+        """Best message from an error payload, which may be a bare string."""
+        message = ""
+        if isinstance(error, dict):
+            details = error.get("data") or {}
+            if isinstance(details, dict):
+                message = details.get("message") or ""
+            elif isinstance(details, str):
+                message = details
+            message = message or error.get("name") or ""
+        elif isinstance(error, str):
+            message = error
+        if not isinstance(message, str):
+            message = str(message)
+        return message or "OpenCode reported an error"
+
+    @staticmethod
+    def _new_suffix(old: str, new: str, delta: str | None) -> tuple[str, bool]:
+        """(new text, whether the part restarted) for an updated part."""
+        if delta:
+            return delta, False
+        if new.startswith(old):
+            return new[len(old) :], False
+        return new, True
+
+    def _count(self, text: str):
+        now = self._clock()
+        if self.stats.first_token is None:
+            self.stats.first_token = now
+        self.stats.last_token = now
+        self.stats.estimated_tokens += max(1, len(text) // CHARS_PER_TOKEN)
+
+    def _on_text(self, part_id: str, part: dict):
+        state = self._text_parts.setdefault(part_id, _Part())
+        new, restarted = self._new_suffix(
+            state.raw, _string(part.get("text")), _string(part.get("delta"))
+        )
+        if restarted:
+            self._text_parts[part_id] = state = _Part()
+        state.raw += new
+        self._last_text_part = part_id
+        if not new:
+            return
+        self._count(new)
+        visible = state.think.feed(new)
+        if visible:
+            state.visible.append(visible)
+            self._emit(TextDelta(part_id, visible))
+
+    def _on_reasoning(self, part_id: str, part: dict):
+        old = self._reasoning_parts.get(part_id, "")
+        new, restarted = self._new_suffix(
+            old, _string(part.get("text")), _string(part.get("delta"))
+        )
+        self._reasoning_parts[part_id] = new if restarted else old + new
+        if new:
+            self._count(new)
+            self._emit(ReasoningDelta(part_id, new))
@@ -1,12 +1,24 @@
 from __future__ import annotations
 
 import json
+import os
 import tomllib
 import shutil
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # not POSIX: only threads of this process are serialized
+    fcntl = None
+
+# Compact the feedback queue once at least this many lines are dead and
+# they outnumber the live entries.
+COMPACT_MIN_DEAD = 64
+
 
 @dataclass
 class FeedbackEntry:
@@ -102,40 +114,207 @@ class PromptStore:
 
 
 class FeedbackQueue:
+    """Feedback entries in an append-only JSON Lines file.
+
+    Each entry is one line. ``remove`` appends a tombstone naming the
+    entry's byte offset instead of rewriting the file, and the file is
+    compacted once dead lines outnumber live ones. An in-memory offset index
+    is caught up by reading only what was appended since the last call, so
+    ``append`` and ``count`` cost the same however long the queue grows.
+    Writers in other processes are serialized with a lock on ``<file>.lock``.
+    A queue saved as one JSON array by older versions is converted in place.
+    """
+
     def __init__(self, queue_path: Path):
-        self.queue_path = queue_path
+        self.queue_path = Path(queue_path)
+        self._lock_path = self.queue_path.with_name(self.queue_path.name + ".lock")
+        self._thread_lock = threading.RLock()
+        self._offsets: dict[int, None] = {}  # live entries by offset, in order
+        self._order: list[int] | None = None
+        self._dead = 0  # removed entries and tombstones
+        self._indexed = 0  # bytes of the file covered by the index
+        self._file_id: tuple[int, int] | None = None
 
-    def load_all(self) -> list[FeedbackEntry]:
-        if not self.queue_path.exists():
-            return []
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            self.queue_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._lock_path, "a+b") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                yield  # closing the lock file releases the lock
+
+    def _reset_index(self, file_id: tuple[int, int] | None = None):
+        self._offsets = {}
+        self._order = None
+        self._dead = 0
+        self._indexed = 0
+        self._file_id = file_id
+
+    def _refresh(self):
+        """Bring the index up to date with the file; call with the lock held."""
         try:
-            data = json.loads(self.queue_path.read_text())
-            if isinstance(data, list):
-                return [FeedbackEntry.from_dict(item) for item in data]
-        except (json.JSONDecodeError, Exception):
-            pass
-        return []
+            st = os.stat(self.queue_path)
+        except FileNotFoundError:
+            self._reset_index()
+            return
+        file_id = (st.st_dev, st.st_ino)
+        if file_id != self._file_id or st.st_size < self._indexed:
+            # Compacted, cleared or replaced by another process.
+            self._reset_index(file_id)
+        if st.st_size == self._indexed:
+            return
+        with open(self.queue_path, "rb") as f:
+            f.seek(self._indexed)
+            offset = self._indexed
+            for line in f:
+                if offset == 0 and line.lstrip().startswith(b"["):
+                    self._migrate()
+                    return
+                if not line.endswith(b"\n"):
+                    break  # a line still being written, or torn by a crash
+                self._apply(offset, line)
+                offset += len(line)
+        self._indexed = offset
 
-    def save_all(self, entries: list[FeedbackEntry]):
-        self.queue_path.parent.mkdir(parents=True, exist_ok=True)
-        self.queue_path.write_text(
-            json.dumps([e.to_dict() for e in entries], indent=2, ensure_ascii=False)
+    def _apply(self, offset: int, line: bytes):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            self._dead += 1
+        elif record.get("op") == "remove":
+            self._dead += 1
+            if self._offsets.pop(int(record.get("at", -1)), 0) is None:
+                self._dead += 1
+                self._order = None
+        elif line.strip():
+            self._offsets[offset] = None
+            self._order = None
+
+    def _write(self, line: bytes):
+        """Append one record line; call with the lock held."""
+        try:
+            st = os.stat(self.queue_path)
+            size, file_id = st.st_size, (st.st_dev, st.st_ino)
+        except FileNotFoundError:
+            size, file_id = 0, None
+        with open(self.queue_path, "ab") as f:
+            if size and self._last_byte() != b"\n":
+                f.write(b"\n")  # seal a torn line so it doesn't swallow this one
+                size += 1
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        if file_id is None:
+            st = os.stat(self.queue_path)
+            file_id = (st.st_dev, st.st_ino)
+            self._reset_index(file_id)
+        if file_id == self._file_id and size == self._indexed:
+            self._apply(size, line)
+            self._indexed = size + len(line)
+
+    def _last_byte(self) -> bytes:
+        with open(self.queue_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1)
+
+    def _rewrite(self, lines: list[bytes]):
+        """Atomically replace the file with ``lines``; call with the lock held."""
+        tmp = self.queue_path.with_name(self.queue_path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.queue_path)
+        self._reset_index()
+        self._refresh()
+
+    def _migrate(self):
+        try:
+            data = json.loads(self.queue_path.read_text(encoding="utf-8"))
+        except ValueError:
+            data = []
+        entries = data if isinstance(data, list) else []
+        self._rewrite(
+            [
+                self._encode(FeedbackEntry.from_dict(item))
+                for item in entries
+                if isinstance(item, dict)
+            ]
         )
 
+    @staticmethod
+    def _encode(entry: FeedbackEntry) -> bytes:
+        return (json.dumps(entry.to_dict(), ensure_ascii=False) + "\n").encode()
+
+    def _read(self, f, offset: int) -> FeedbackEntry:
+        f.seek(offset)
+        return FeedbackEntry.from_dict(json.loads(f.readline()))
+
+    def _live_offsets(self) -> list[int]:
+        if self._order is None:
+            self._order = list(self._offsets)
+        return self._order
+
+    def load_all(self) -> list[FeedbackEntry]:
+        with self._locked():
+            self._refresh()
+            if not self._offsets:
+                return []
+            with open(self.queue_path, "rb") as f:
+                return [self._read(f, offset) for offset in self._offsets]
+
+    def get(self, index: int) -> FeedbackEntry | None:
+        with self._locked():
+            self._refresh()
+            offsets = self._live_offsets()
+            if not 0 <= index < len(offsets):
+                return None
+            with open(self.queue_path, "rb") as f:
+                return self._read(f, offsets[index])
+
+    def save_all(self, entries: list[FeedbackEntry]):
+        with self._locked():
+            self._rewrite([self._encode(e) for e in entries])
+
     def append(self, entry: FeedbackEntry):
-        entries = self.load_all()
-        entries.append(entry)
-        self.save_all(entries)
+        with self._locked():
+            self._write(self._encode(entry))
 
     def remove(self, index: int):
-        entries = self.load_all()
-        if 0 <= index < len(entries):
-            entries.pop(index)
-            self.save_all(entries)
+        with self._locked():
+            self._refresh()
+            offsets = self._live_offsets()
+            if not 0 <= index < len(offsets):
+                return
+            record = {"op": "remove", "at": offsets[index]}
+            self._write((json.dumps(record) + "\n").encode())
+            if self._dead >= COMPACT_MIN_DEAD and self._dead > len(self._offsets):
+                self._compact()
+
+    def compact(self):
+        """Rewrite the file with only the live entries."""
+        with self._locked():
+            self._refresh()
+            self._compact()
+
+    def _compact(self):
+        lines = []
+        if self._offsets:
+            with open(self.queue_path, "rb") as f:
+                for offset in self._offsets:
+                    f.seek(offset)
+                    lines.append(f.readline())
+        self._rewrite(lines)
 
     def clear(self):
-        self.queue_path.write_text("[]")
+        with self._locked():
+            self._rewrite([])
 
     @property
     def count(self) -> int:
-        return len(self.load_all())
+        with self._locked():
+            self._refresh()
+            return len(self._offsets)
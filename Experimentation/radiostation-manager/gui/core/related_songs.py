@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import heapq
+import math
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+
+from gui.core.metadata import is_outdated_comment
+from gui.core.search_index import tokenize
+from gui.core.song import Song
+from gui.core.vibes import VibeAnalysis
+
+# Text similarity is TF-IDF cosine over these fields.
+TEXT_WEIGHTS = {"title": 3.0, "music_theme": 2.0, "lyrics": 1.0}
+# Only a song's most distinctive terms are indexed and queried.
+MAX_TERMS = 40
+# Tokens in more than this share of songs ("the", "love") carry no signal,
+# and skipping them keeps the postings for lyrics small.
+MAX_DOC_FREQUENCY = 0.05
+VIBE_FEATURES = ("tempo", "rms_mean", "centroid_mean_hz", "onset_rate")
+VIBE_WEIGHT = 0.5
+CHANNEL_BONUS = 0.05
+LYRICS_MAX_LENGTH = 2000
+
+
+def truncate(text: str, max_length: int) -> str:
+    text = " ".join(text.split())
+    if len(text) > max_length:
+        return text[:max_length].rstrip() + "..."
+    return text
+
+
+def _text_terms(song: Song) -> dict[str, float]:
+    terms = dict.fromkeys(tokenize(song.lyrics[:LYRICS_MAX_LENGTH]), 1.0)
+    for text, weight in (
+        (song.music_theme, TEXT_WEIGHTS["music_theme"]),
+        (f"{song.title} {song.path.stem}", TEXT_WEIGHTS["title"]),
+    ):
+        for token in set(tokenize(text)):
+            terms[token] = terms.get(token, 0.0) + weight
+    return terms
+
+
+class RelatedSongIndex:
+    """Finds library songs whose comments are good references for another.
+
+    Built once from the tag index; a query scores every commented song by
+    title/theme/lyrics overlap plus closeness of cached vibe features, so
+    it needs no file access and answers in milliseconds.
+    """
+
+    def __init__(self, songs: Iterable[Song], music_root: Path | None = None):
+        self._music_root = Path(music_root) if music_root else None
+        self._songs: list[Song] = [
+            s
+            for s in songs
+            if s.comment.strip() and not is_outdated_comment(s.comment)
+        ]
+        self._channels = [self._channel(s) for s in self._songs]
+        n = max(1, len(self._songs))
+        doc_terms = [_text_terms(s) for s in self._songs]
+        df: Counter[str] = Counter()
+        for terms in doc_terms:
+            df.update(terms.keys())
+        self._idf = {
+            t: math.log(n / c)
+            for t, c in df.items()
+            if c <= max(1, MAX_DOC_FREQUENCY * n)
+        }
+        self._postings: dict[str, list[tuple[int, float]]] = {}
+        self._norms: list[float] = []
+        for doc, terms in enumerate(doc_terms):
+            norm = 0.0
+            for token, weight in self._weigh(terms):
+                self._postings.setdefault(token, []).append((doc, weight))
+                norm += weight * weight
+            self._norms.append(math.sqrt(norm) or 1.0)
+        # Terms cut from every song's top ``MAX_TERMS`` have no postings; a
+        # query must not spend one of its own slots on them.
+        self._idf = {t: w for t, w in self._idf.items() if t in self._postings}
+
+        # Vibe features scaled to unit spread; only complete vectors are kept.
+        raw = [self._vibe_vector(s.vibe) for s in self._songs]
+        columns = [[v[i] for v in raw if v] for i in range(len(VIBE_FEATURES))]
+        scale = [self._spread(values) for values in columns]
+        self._scale = scale
+        self._vibes: list[tuple[int, tuple[float, ...]]] = [
+            (doc, tuple(x / k for x, k in zip(v, scale)))
+            for doc, v in enumerate(raw)
+            if v
+        ]
+        self._by_channel: dict[str, list[int]] = {}
+        for doc, channel in enumerate(self._channels):
+            if channel:
+                self._by_channel.setdefault(channel, []).append(doc)
+        self._title_keys = [s.title.casefold() for s in self._songs]
+        self._by_title = sorted(
+            range(len(self._songs)), key=self._title_keys.__getitem__
+        )
+
+    def __len__(self) -> int:
+        return len(self._songs)
+
+    def _channel(self, song: Song) -> str:
+        if self._music_root is None:
+            return song.channel
+        try:
+            parts = song.path.relative_to(self._music_root).parts
+        except ValueError:
+            return ""
+        return parts[0] if len(parts) > 1 else ""
+
+    def _weigh(self, terms: dict[str, float]) -> list[tuple[str, float]]:
+        """TF-IDF weights of the ``MAX_TERMS`` most distinctive terms."""
+        idf = self._idf
+        weighted = [(t, tf * idf[t]) for t, tf in terms.items() if t in idf]
+        if len(weighted) > MAX_TERMS:
+            weighted = heapq.nlargest(MAX_TERMS, weighted, key=lambda tw: tw[1])
+        return weighted
+
+    @staticmethod
+    def _vibe_vector(analysis: VibeAnalysis | None) -> tuple[float, ...] | None:
+        if analysis is None:
+            return None
+        vector = tuple(getattr(analysis, f) for f in VIBE_FEATURES)
+        return None if None in vector else vector
+
+    @staticmethod
+    def _spread(values: list[float]) -> float:
+        if len(values) < 2:
+            return 1.0
+        mean = sum(values) / len(values)
+        var = sum((v - mean) ** 2 for v in values) / len(values)
+        return math.sqrt(var) or 1.0
+
+    def related(
+        self, song: Song, limit: int, vibe: VibeAnalysis | None = None
+    ) -> list[Song]:
+        """The ``limit`` best reference songs for ``song``, best first.
+
+        ``vibe`` overrides the song's cached vibe (e.g. a fresh analysis).
+        """
+        if limit <= 0 or not self._songs:
+            return []
+        scores: dict[int, float] = {}
+        query = dict(self._weigh(_text_terms(song)))
+        q_norm = math.sqrt(sum(w * w for w in query.values())) or 1.0
+        for token, q_weight in query.items():
+            for doc, weight in self._postings[token]:
+                scores[doc] = scores.get(doc, 0.0) + q_weight * weight
+        for doc in scores:
+            scores[doc] /= q_norm * self._norms[doc]
+
+        target = self._vibe_vector(vibe or song.vibe)
+        if target is not None:
+            t = [x / k for x, k in zip(target, self._scale)]
+            rms = math.sqrt(len(t))
+            for doc, v in self._vibes:
+                similarity = VIBE_WEIGHT / (1.0 + math.dist(t, v) / rms)
+                scores[doc] = scores.get(doc, 0.0) + similarity
+        for doc in self._by_channel.get(self._channel(song), ()):
+            scores[doc] = scores.get(doc, 0.0) + CHANNEL_BONUS
+
+        titles = self._title_keys
+        best = heapq.nsmallest(
+            limit + 1, scores, key=lambda d: (-scores[d], titles[d])
+        )
+        picked = [d for d in best if self._songs[d].path != song.path][:limit]
+        if len(picked) < limit:
+            # Nothing in common with the rest; fill up alphabetically.
+            seen = set(picked)
+            for doc in self._by_title:
+                if len(picked) >= limit:
+                    break
+                if doc not in seen and self._songs[doc].path != song.path:
+                    picked.append(doc)
+        return [self._songs[doc] for doc in picked]
+
+
+def format_related_songs(songs: list[Song], max_length: int) -> str:
+    """One ``title : vibes : Theme=... : comment`` line per song."""
+    lines = []
+    for s in songs:
+        title = s.title or s.path.stem
+        vibes = s.vibe_summary or "unknown vibes"
+        theme = s.music_theme or "unknown theme"
+        lines.append(
+            f"{title} : {vibes} : Theme={theme} : {truncate(s.comment, max_length)}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import heapq
+import re
+from bisect import bisect_left
+from pathlib import Path
+
+from gui.core.song import Song
+
+# Free-text terms score by the field they hit; exact tokens beat prefixes.
+FIELD_WEIGHTS = {
+    "title": 8.0,
+    "filename": 4.0,
+    "channel": 3.0,
+    "comment": 3.0,
+    "music_theme": 2.0,
+    "vibe_summary": 2.0,
+    "why_made": 1.0,
+    "backstory": 1.0,
+    "radio_reason": 1.0,
+    "listener_takeaway": 1.0,
+}
+PREFIX_FACTOR = 0.5
+_LIGHTEST_FIRST = sorted(FIELD_WEIGHTS, key=FIELD_WEIGHTS.__getitem__)
+
+FIELD_ALIASES = {
+    "title": "title",
+    "file": "filename",
+    "filename": "filename",
+    "channel": "channel",
+    "comment": "comment",
+    "theme": "music_theme",
+    "vibe": "vibe_summary",
+    "vibes": "vibe_summary",
+    "why": "why_made",
+    "backstory": "backstory",
+    "reason": "radio_reason",
+    "takeaway": "listener_takeaway",
+}
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.casefold())
+
+
+def parse_query(query: str) -> tuple[list[str], list[tuple[str, str]]]:
+    """Split a query into free-text tokens and ``(field, token)`` filters.
+
+    ``channel:lofi rain`` gives ``(["rain"], [("channel", "lofi")])``.
+    Unknown ``name:`` prefixes are searched as ordinary text.
+    """
+    terms: list[str] = []
+    filters: list[tuple[str, str]] = []
+    for word in query.split():
+        name, sep, value = word.partition(":")
+        field = FIELD_ALIASES.get(name.casefold()) if sep else None
+        if field:
+            filters += [(field, t) for t in tokenize(value)]
+        else:
+            terms += tokenize(word)
+    return terms, filters
+
+
+class _Postings:
+    """token -> {doc: weight}, with a lazily sorted vocabulary for prefixes."""
+
+    def __init__(self):
+        self.docs: dict[str, dict[int, float]] = {}
+        self._vocab: list[str] | None = None
+
+    def add_many(self, weights: dict[str, float], doc: int):
+        docs = self.docs
+        known = len(docs)
+        for token, weight in weights.items():
+            bucket = docs.get(token)
+            if bucket is None:
+                docs[token] = {doc: weight}
+            else:
+                bucket[doc] = weight
+        if len(docs) != known:
+            self._vocab = None
+
+    def discard(self, token: str, doc: int):
+        bucket = self.docs.get(token)
+        if bucket is None:
+            return
+        bucket.pop(doc, None)
+        if not bucket:
+            del self.docs[token]
+            self._vocab = None
+
+    def expand(self, prefix: str) -> list[str]:
+        if self._vocab is None:
+            self._vocab = sorted(self.docs)
+        vocab = self._vocab
+        out = []
+        for i in range(bisect_left(vocab, prefix), len(vocab)):
+            if not vocab[i].startswith(prefix):
+                break
+            out.append(vocab[i])
+        return out
+
+    def match(self, prefix: str) -> dict[int, float]:
+        """Score every doc holding ``prefix`` exactly or as a token prefix."""
+        tokens = self.expand(prefix)
+        if tokens == [prefix]:
+            return self.docs[prefix]
+        scores: dict[int, float] = {}
+        for token in tokens:
+            factor = 1.0 if token == prefix else PREFIX_FACTOR
+            for doc, weight in self.docs[token].items():
+                score = weight * factor
+                if score > scores.get(doc, 0.0):
+                    scores[doc] = score
+        return scores
+
+
+class SearchIndex:
+    """In-memory inverted index over the searchable Song fields.
+
+    Every query word must match (as a whole token or a token prefix) in some
+    field; ``field:value`` words must match in that field. Results are ranked
+    by field weight, exact hits above prefix hits, then by path.
+    """
+
+    def __init__(self, music_root: Path | None = None):
+        self._music_root = Path(music_root) if music_root else None
+        self.clear()
+
+    def clear(self):
+        self._all = _Postings()
+        self._fields: dict[str, _Postings] = {f: _Postings() for f in FIELD_WEIGHTS}
+        self._songs: dict[int, Song] = {}
+        self._paths: dict[int, str] = {}
+        self._ids: dict[str, int] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._songs)
+
+    def build(self, songs: list[Song]):
+        self.clear()
+        for song in songs:
+            self.add(song)
+
+    def _channel(self, song: Song) -> str:
+        if self._music_root is None:
+            return song.channel
+        try:
+            parts = song.path.relative_to(self._music_root).parts
+        except ValueError:
+            return ""
+        return parts[0] if len(parts) > 1 else ""
+
+    def _field_text(self, song: Song, field: str) -> str:
+        if field == "channel":
+            return self._channel(song)
+        if field == "filename":
+            return song.path.stem
+        return getattr(song, field) or ""
+
+    def add(self, song: Song):
+        """Index ``song``, replacing any earlier entry for the same path."""
+        key = str(song.path)
+        if key in self._ids:
+            self.remove(song.path)
+        doc = self._next_id
+        self._next_id += 1
+        self._ids[key] = doc
+        self._songs[doc] = song
+        self._paths[doc] = key
+        # Fields come lightest first, so each token keeps its heaviest weight.
+        best: dict[str, float] = {}
+        for field, tokens in self._tokens(song):
+            weights = dict.fromkeys(tokens, FIELD_WEIGHTS[field])
+            self._fields[field].add_many(weights, doc)
+            best.update(weights)
+        self._all.add_many(best, doc)
+
+    def _tokens(self, song: Song):
+        for field in _LIGHTEST_FIRST:
+            yield field, set(tokenize(self._field_text(song, field)))
+
+    def remove(self, path: Path):
+        doc = self._ids.pop(str(path), None)
+        if doc is None:
+            return
+        song = self._songs.pop(doc)
+        del self._paths[doc]
+        for field, tokens in self._tokens(song):
+            postings = self._fields[field]
+            for token in tokens:
+                self._all.discard(token, doc)
+                postings.discard(token, doc)
+
+    def search(
+        self, query: str, limit: int | None = None
+    ) -> tuple[list[Song], int]:
+        """Return up to ``limit`` ranked songs and the total number of hits."""
+        terms, filters = parse_query(query)
+        if not terms and not filters:
+            return [], 0
+
+        lookups = [(self._all, t) for t in terms]
+        lookups += [(self._fields[f], t) for f, t in filters]
+        # Narrowest posting list first keeps the intersections small.
+        matches = sorted((p.match(t) for p, t in lookups), key=len)
+        scores = matches[0]
+        for hit in matches[1:]:
+            scores = {d: s + hit[d] for d, s in scores.items() if d in hit}
+            if not scores:
+                return [], 0
+
+        paths = self._paths
+
+        def rank(doc: int) -> tuple[float, str]:
+            return (-scores[doc], paths[doc])
+
+        if limit is not None and limit < len(scores):
+            ranked = heapq.nsmallest(limit, scores, key=rank)
+        else:
+            ranked = sorted(scores, key=rank)
+        return [self._songs[doc] for doc in ranked], len(scores)
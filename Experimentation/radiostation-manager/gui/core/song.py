@@ -3,6 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 
+from gui.core.vibes import VibeAnalysis, parse_vibe_analysis
+
 
 @dataclass
 class Song:
@@ -18,6 +20,8 @@ class Song:
     vibe_summary: str = ""
     vibe_cached_at_epoch: str = ""
     vibe_cache_schema: str = ""
+    vibe_audio_hash: str = ""
+    lyrics: str = ""
 
     @property
     def display_name(self) -> str:
@@ -45,6 +49,30 @@ class Song:
     def filename(self) -> str:
         return self.path.name
 
+    @property
+    def vibe(self) -> VibeAnalysis | None:
+        return parse_vibe_analysis(self.vibe_analysis, self.vibe_cache_schema)
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "channel": self.channel,
+            "title": self.title,
+            "comment": self.comment,
+            "filename": self.filename,
+            "why_made": self.why_made,
+            "backstory": self.backstory,
+            "radio_reason": self.radio_reason,
+            "music_theme": self.music_theme,
+            "listener_takeaway": self.listener_takeaway,
+            "vibe_analysis": self.vibe_analysis,
+            "vibe_summary": self.vibe_summary,
+            "vibe_cached_at_epoch": self.vibe_cached_at_epoch,
+            "vibe_cache_schema": self.vibe_cache_schema,
+            "vibe_audio_hash": self.vibe_audio_hash,
+            "lyrics": self.lyrics,
+        }
+
     def _guess_music_root(self) -> Path:
         parent = self.path.parent
         while parent != parent.parent:
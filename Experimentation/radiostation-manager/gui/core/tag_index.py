@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import fields
+from pathlib import Path
+from typing import Callable, Iterable
+
+from gui.core.config import get_config
+from gui.core.metadata import LibraryEntry, read_song
+from gui.core.song import Song
+
+SCHEMA_VERSION = 3  # bump whenever Song gains a field
+SONG_COLUMNS = [f.name for f in fields(Song) if f.name != "path"]
+COMMIT_EVERY = 256
+
+
+class TagIndex:
+    """Persistent cache of every Song field, keyed by path, size and mtime.
+
+    Only files whose size or mtime changed since they were last indexed are
+    handed to the (slow) tag reader; everything else comes from one query.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[Song], None]] = []
+        self._change_listeners: list[Callable[[list[Song], list[Path]], None]] = []
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self._lock:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS songs")
+            columns = ", ".join(f"{c} TEXT NOT NULL DEFAULT ''" for c in SONG_COLUMNS)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS songs ("
+                "path TEXT PRIMARY KEY, "
+                "size INTEGER NOT NULL, "
+                f"mtime_ns INTEGER NOT NULL, {columns})"
+            )
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+
+    @staticmethod
+    def _row_to_song(row: tuple) -> Song:
+        values = dict(zip(SONG_COLUMNS, row[3:]))
+        return Song(path=Path(row[0]), **values)
+
+    @staticmethod
+    def _song_to_row(song: Song, size: int, mtime_ns: int) -> tuple:
+        return (
+            str(song.path),
+            size,
+            mtime_ns,
+            *(str(getattr(song, c) or "") for c in SONG_COLUMNS),
+        )
+
+    def _upsert_many(self, rows: list[tuple]):
+        if not rows:
+            return
+        placeholders = ", ".join("?" for _ in range(3 + len(SONG_COLUMNS)))
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO songs VALUES ({placeholders})", rows
+            )
+            self._conn.commit()
+        if self._change_listeners:
+            self._changed([self._row_to_song(r) for r in rows], [])
+
+    def get(self, path: Path) -> Song | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM songs WHERE path = ?", (str(path),)
+            ).fetchone()
+        return self._row_to_song(row) if row else None
+
+    def all_songs(self) -> list[Song]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM songs ORDER BY path").fetchall()
+        return [self._row_to_song(r) for r in rows]
+
+    def put(self, song: Song, size: int, mtime_ns: int):
+        self._upsert_many([self._song_to_row(song, size, mtime_ns)])
+
+    def add_listener(self, callback: Callable[[Song], None]):
+        """Call ``callback`` (from the writing thread) after every record()."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[Song], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def add_change_listener(
+        self, callback: Callable[[list[Song], list[Path]], None]
+    ):
+        """Call ``callback(updated, removed)`` whenever rows change.
+
+        It runs on the writing thread, for record(), sync() and remove() alike.
+        """
+        self._change_listeners.append(callback)
+
+    def remove_change_listener(
+        self, callback: Callable[[list[Song], list[Path]], None]
+    ):
+        if callback in self._change_listeners:
+            self._change_listeners.remove(callback)
+
+    def _changed(self, updated: list[Song], removed: list[Path]):
+        for callback in list(self._change_listeners):
+            callback(updated, removed)
+
+    def record(self, song: Song):
+        """Store ``song`` as the current state of its file on disk."""
+        try:
+            st = song.path.stat()
+        except OSError:
+            self.remove(song.path)
+        else:
+            self.put(song, st.st_size, st.st_mtime_ns)
+        for callback in list(self._listeners):
+            callback(song)
+
+    def remove(self, path: Path):
+        self.remove_many([path])
+
+    def remove_many(self, paths: Iterable[Path]):
+        keys = [(str(p),) for p in paths]
+        if not keys:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM songs WHERE path = ?", keys)
+            self._conn.commit()
+        self._changed([], [Path(k) for k, in keys])
+
+    def paths_under(self, directory: Path | str) -> list[Path]:
+        """Indexed paths anywhere below ``directory``."""
+        prefix = os.path.join(str(directory), "")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM songs WHERE path >= ? AND path < ?",
+                (prefix, prefix + "\U0010ffff"),
+            ).fetchall()
+        return [Path(r[0]) for r in rows]
+
+    def clear(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT path FROM songs").fetchall()
+            self._conn.execute("DELETE FROM songs")
+            self._conn.commit()
+        self._changed([], [Path(r[0]) for r in rows])
+
+    def sync(
+        self,
+        entries: list[LibraryEntry],
+        reader: Callable[[Path], Song] = read_song,
+        on_progress: Callable[[int, int, Path], None] | None = None,
+        is_cancelled: Callable[[], bool] | None = None,
+        workers: int = 1,
+        on_batch: Callable[[list[Song]], None] | None = None,
+        batch_size: int = 200,
+        prune: bool = True,
+    ) -> list[Song] | None:
+        """Return a Song for every entry, re-reading only new or changed files.
+
+        ``entries`` come from ``walk_library`` and already carry size and
+        mtime, so nothing is stat-ed again here. Changed files are read on a
+        pool of ``workers`` threads. Results are always produced in
+        ``entries`` order; ``on_batch`` receives them in chunks of
+        ``batch_size`` as soon as each chunk is complete.
+
+        With ``prune`` set, rows for files that no longer exist are dropped;
+        pass False when ``entries`` only covers part of the library.
+
+        Returns None if ``is_cancelled`` fired; anything probed so far is
+        kept in the index so the next sync resumes from there.
+        """
+        known = self._rows_by_path(None if prune else entries)
+
+        seen = {str(e.path) for e in entries}
+        rows: list[tuple | None] = []
+        for e in entries:
+            row = known.get(str(e.path))
+            if row and row[1] == e.size and row[2] == e.mtime_ns:
+                rows.append(row)
+            else:
+                rows.append(None)
+
+        total = len(entries)
+        songs: list[Song] = []
+        batch: list[Song] = []
+        pending: list[tuple] = []
+        pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        cancelled = False
+        try:
+            futures = {
+                i: pool.submit(reader, e.path)
+                for i, (e, row) in enumerate(zip(entries, rows))
+                if row is None
+            }
+            for i, (e, row) in enumerate(zip(entries, rows)):
+                if on_progress and i % 5 == 0:
+                    on_progress(i, total, e.path)
+                # Cached rows never wait on a future, so a warm index is
+                # checked once per batch instead.
+                if row is not None:
+                    if i % batch_size == 0 and is_cancelled and is_cancelled():
+                        cancelled = True
+                    else:
+                        song = self._row_to_song(row)
+                elif not _await(futures[i], is_cancelled):
+                    cancelled = True
+                if cancelled:
+                    for j, f in futures.items():
+                        if j >= i and f.done() and not f.cancelled():
+                            if f.exception() is None:
+                                pending.append(
+                                    self._song_to_row(
+                                        f.result(),
+                                        entries[j].size,
+                                        entries[j].mtime_ns,
+                                    )
+                                )
+                    self._upsert_many(pending)
+                    return None
+                if row is None:
+                    try:
+                        song = futures[i].result()
+                    except Exception:
+                        song = Song(path=e.path, title=e.path.stem)
+                    else:
+                        pending.append(
+                            self._song_to_row(song, e.size, e.mtime_ns)
+                        )
+                    if len(pending) >= COMMIT_EVERY:
+                        self._upsert_many(pending)
+                        pending = []
+                songs.append(song)
+                batch.append(song)
+                if on_batch and len(batch) >= batch_size:
+                    on_batch(batch)
+                    batch = []
+        finally:
+            pool.shutdown(wait=not cancelled, cancel_futures=True)
+
+        self._upsert_many(pending)
+        if on_batch and batch:
+            on_batch(batch)
+        if prune:
+            self._prune_missing(set(known) - seen)
+        return songs
+
+    def _rows_by_path(self, entries: list[LibraryEntry] | None) -> dict[str, tuple]:
+        with self._lock:
+            if entries is None:
+                rows = self._conn.execute("SELECT * FROM songs").fetchall()
+            else:
+                keys = [str(e.path) for e in entries]
+                rows = []
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start : start + 500]
+                    marks = ", ".join("?" for _ in chunk)
+                    rows += self._conn.execute(
+                        f"SELECT * FROM songs WHERE path IN ({marks})", chunk
+                    ).fetchall()
+        return {row[0]: row for row in rows}
+
+    def _prune_missing(self, candidates: set[str]):
+        self.remove_many(Path(p) for p in candidates if not Path(p).exists())
+
+
+def _await(future: Future, is_cancelled: Callable[[], bool] | None) -> bool:
+    """Wait for ``future``; return False as soon as ``is_cancelled`` fires."""
+    while True:
+        if is_cancelled and is_cancelled():
+            return False
+        done, _ = wait([future], timeout=0.1)
+        if done:
+            return True
+
+
+def scan_worker_count(configured: int) -> int:
+    if configured > 0:
+        return configured
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+_shared: dict[Path, TagIndex] = {}
+_shared_lock = threading.Lock()
+
+
+def get_tag_index(db_path: Path | None = None) -> TagIndex:
+    path = Path(db_path or get_config().tag_index_path).expanduser()
+    with _shared_lock:
+        index = _shared.get(path)
+        if index is None:
+            index = TagIndex(path)
+            _shared[path] = index
+        return index
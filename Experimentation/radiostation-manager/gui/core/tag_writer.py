@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import atexit
+import threading
+from pathlib import Path
+from typing import Callable
+
+from PySide6.QtCore import QThread, Signal
+
+from gui.core.metadata import read_song, write_song_metadata, write_vibe_cache
+
+VIBE_FIELDS = frozenset(
+    {
+        "vibe_analysis",
+        "vibe_summary",
+        "vibe_cached_at_epoch",
+        "vibe_cache_schema",
+        "vibe_audio_hash",
+    }
+)
+METADATA_FIELDS = frozenset(
+    {
+        "comment",
+        "why_made",
+        "backstory",
+        "radio_reason",
+        "music_theme",
+        "listener_takeaway",
+    }
+)
+
+
+class TagWriteQueue(QThread):
+    """Serializes tag writes on one background thread.
+
+    ``enqueue`` never blocks on I/O: updates for the same song are merged
+    (later values win) until the writer picks them up, and each pass writes
+    every song that is waiting. ``written`` reports the outcome per song.
+    ``call`` runs other disk work (e.g. journal flushes) on the same thread.
+    """
+
+    written = Signal(str, bool, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._pending: dict[str, dict[str, str]] = {}
+        self._calls: list[Callable[[], None]] = []
+        self._stopping = False
+
+    def enqueue(self, song_path: Path, fields: dict[str, str]):
+        unknown = set(fields) - VIBE_FIELDS - METADATA_FIELDS
+        if unknown:
+            raise ValueError(f"not a writable song field: {sorted(unknown)}")
+        with self._cond:
+            self._pending.setdefault(str(song_path), {}).update(fields)
+            self._cond.notify()
+
+    def call(self, fn: Callable[[], None]):
+        """Run ``fn`` on the writer thread after the writes queued so far.
+
+        Once the writer is stopping, ``fn`` runs right away instead.
+        """
+        with self._cond:
+            if not self._stopping:
+                self._calls.append(fn)
+                self._cond.notify()
+                return
+        fn()
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def stop(self, timeout_ms: int = 30000):
+        """Write whatever is still queued, then end the thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self.isRunning():
+            self.wait(timeout_ms)
+
+    def run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._calls and not self._stopping:
+                    self._cond.wait()
+                if not self._pending and not self._calls:
+                    return
+                batch, self._pending = self._pending, {}
+                calls, self._calls = self._calls, []
+            for key, fields in batch.items():
+                ok, error = self._write(Path(key), fields)
+                self.written.emit(key, ok, error)
+            for fn in calls:
+                try:
+                    fn()
+                except Exception:
+                    pass
+
+    @staticmethod
+    def _write(song_path: Path, fields: dict[str, str]) -> tuple[bool, str]:
+        try:
+            song = read_song(song_path)
+            for name, value in fields.items():
+                setattr(song, name, value)
+            if VIBE_FIELDS & fields.keys():
+                ok, error = write_vibe_cache(song)
+                if not ok:
+                    return False, error
+            if METADATA_FIELDS & fields.keys():
+                return write_song_metadata(song)
+            return True, ""
+        except Exception as e:
+            return False, str(e)
+
+
+_shared: list[TagWriteQueue] = []
+_shared_lock = threading.Lock()
+
+
+def get_tag_writer() -> TagWriteQueue:
+    """The app-wide writer, so no two threads ever rewrite one file at once."""
+    with _shared_lock:
+        if not _shared:
+            writer = TagWriteQueue()
+            writer.start()
+            _shared.append(writer)
+        return _shared[0]
+
+
+@atexit.register
+def stop_tag_writer():
+    with _shared_lock:
+        writers = list(_shared)
+        _shared.clear()
+    for writer in writers:
+        writer.stop()
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import math
+import threading
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from gui.core.config import get_config
+from gui.core.song import Song
+from gui.core.tag_index import TagIndex, get_tag_index
+from gui.core.vibes import VibeAnalysis
+
+# Numeric features, z-scored across the library before comparing.
+NUMERIC_FEATURES = ("tempo", "rms_mean", "centroid_mean_hz", "onset_rate")
+# Key sits on the circle of fifths (cos, sin) plus a minor flag; these
+# columns are already bounded and are only scaled by KEY_WEIGHT.
+KEY_WEIGHT = 0.5
+DIMENSIONS = len(NUMERIC_FEATURES) + 3
+
+_NOTES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+_FLATS = {"Db": "C#", "Eb": "D#", "Gb": "F#", "Ab": "G#", "Bb": "A#"}
+
+
+def vibe_features(analysis: VibeAnalysis | None) -> np.ndarray | None:
+    """Raw feature row for ``analysis``, or None if a numeric value is missing.
+
+    Songs without a detected key get a neutral (0, 0, 0) key position.
+    """
+    if analysis is None:
+        return None
+    numeric = [getattr(analysis, f) for f in NUMERIC_FEATURES]
+    if any(v is None for v in numeric):
+        return None
+    key = [0.0, 0.0, 0.0]
+    note = _FLATS.get(analysis.key, analysis.key)
+    if note in _NOTES:
+        pitch = _NOTES.index(note)
+        angle = 2 * math.pi * ((pitch * 7) % 12) / 12
+        minor = 1.0 if analysis.scale == "minor" else 0.0
+        key = [math.cos(angle), math.sin(angle), minor]
+    return np.array(numeric + key, dtype=np.float64)
+
+
+class VibeIndex:
+    """Nearest-neighbour search over cached vibe features.
+
+    Rows live in a growable matrix keyed by path, so songs can be added or
+    replaced one at a time as their vibes get cached. Numeric columns are
+    weighted by 1/std across the library when compared; those statistics
+    are refreshed lazily after changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._raw = np.empty((0, DIMENSIONS))
+        self._songs: list[Song] = []
+        self._rows: dict[str, int] = {}
+        self._stale = True
+        self._weights = np.ones(DIMENSIONS)
+
+    def __len__(self) -> int:
+        return len(self._songs)
+
+    def __contains__(self, path: Path) -> bool:
+        return str(path) in self._rows
+
+    def build(self, songs: Iterable[Song]):
+        with self._lock:
+            self._build(songs)
+
+    def follow(self, tags: TagIndex):
+        """Build from ``tags``, then apply every change it reports."""
+        tags.add_change_listener(self.apply)
+        # Changes reported while the rows load wait for the lock and land on
+        # top, so none fall between the snapshot and the listener.
+        with self._lock:
+            self._build(tags.all_songs())
+
+    def _build(self, songs: Iterable[Song]):
+        rows, kept = [], []
+        for song in songs:
+            features = vibe_features(song.vibe)
+            if features is not None:
+                rows.append(features)
+                kept.append(song)
+        self._raw = np.array(rows).reshape(len(rows), DIMENSIONS)
+        self._songs = kept
+        self._rows = {str(s.path): i for i, s in enumerate(kept)}
+        self._stale = True
+
+    def apply(self, updated: list[Song], removed: list[Path]):
+        for song in updated:
+            self.add(song)
+        for path in removed:
+            self.remove(path)
+
+    def add(self, song: Song):
+        """Insert or update ``song``; songs without usable vibes are dropped."""
+        features = vibe_features(song.vibe)
+        if features is None:
+            self.remove(song.path)
+            return
+        with self._lock:
+            key = str(song.path)
+            row = self._rows.get(key)
+            if row is None:
+                row = len(self._songs)
+                if row == len(self._raw):
+                    grown = np.empty((max(64, 2 * row), DIMENSIONS))
+                    grown[:row] = self._raw[:row]
+                    self._raw = grown
+                self._songs.append(song)
+                self._rows[key] = row
+            else:
+                self._songs[row] = song
+            self._raw[row] = features
+            self._stale = True
+
+    def remove(self, path: Path):
+        with self._lock:
+            row = self._rows.pop(str(path), None)
+            if row is None:
+                return
+            last = len(self._songs) - 1
+            if row != last:
+                moved = self._songs[last]
+                self._songs[row] = moved
+                self._raw[row] = self._raw[last]
+                self._rows[str(moved.path)] = row
+            self._songs.pop()
+            self._stale = True
+
+    def _column_weights(self) -> np.ndarray:
+        """1/std per numeric column (KEY_WEIGHT for key columns); lock held."""
+        if self._stale:
+            numeric = len(NUMERIC_FEATURES)
+            weights = np.full(DIMENSIONS, KEY_WEIGHT)
+            weights[:numeric] = 1.0
+            if len(self._songs) > 1:
+                spread = self._raw[: len(self._songs), :numeric].std(axis=0)
+                spread[spread == 0] = 1.0
+                weights[:numeric] = 1.0 / spread
+            self._weights = weights
+            self._stale = False
+        return self._weights
+
+    def nearest(
+        self,
+        analysis: VibeAnalysis,
+        k: int = 10,
+        exclude: Path | None = None,
+    ) -> list[tuple[Song, float]]:
+        """The ``k`` songs closest to ``analysis``, nearest first."""
+        features = vibe_features(analysis)
+        if features is None or k <= 0:
+            return []
+        with self._lock:
+            if not self._songs:
+                return []
+            weights = self._column_weights()
+            diff = self._raw[: len(self._songs)] - features
+            diff *= weights
+            distances = np.einsum("ij,ij->i", diff, diff)
+            skip = self._rows.get(str(exclude)) if exclude is not None else None
+            if skip is not None:
+                distances[skip] = np.inf
+            count = min(k, len(distances) - (skip is not None))
+            if count <= 0:
+                return []
+            best = np.argpartition(distances, count - 1)[:count]
+            best = best[np.argsort(distances[best])]
+            return [(self._songs[i], float(np.sqrt(distances[i]))) for i in best]
+
+    def similar(self, song: Song, k: int = 10) -> list[tuple[Song, float]]:
+        analysis = song.vibe
+        if analysis is None:
+            with self._lock:
+                row = self._rows.get(str(song.path))
+                analysis = self._songs[row].vibe if row is not None else None
+        if analysis is None:
+            return []
+        return self.nearest(analysis, k, exclude=song.path)
+
+
+_shared: dict[Path, VibeIndex] = {}
+_shared_lock = threading.Lock()
+
+
+def get_vibe_index(music_root: Path | None = None) -> VibeIndex:
+    """Library-wide index, built from the tag index on first use.
+
+    The first call reads every song, so make it from a worker (see
+    ``VibeIndexWorker``); ``loaded_vibe_index`` never blocks. The index then
+    follows the tag index, so written vibes, rescans and deletions all
+    update it.
+    """
+    root = Path(music_root or get_config().music_root).expanduser()
+    with _shared_lock:
+        index = _shared.get(root)
+        if index is None:
+            index = VibeIndex()
+            index.follow(get_tag_index())
+            _shared[root] = index
+        return index
+
+
+def loaded_vibe_index(music_root: Path | None = None) -> VibeIndex | None:
+    """The shared index if it has been built, else None."""
+    root = Path(music_root or get_config().music_root).expanduser()
+    # No lock: it is held for the whole first build, and a dict read is atomic.
+    return _shared.get(root)
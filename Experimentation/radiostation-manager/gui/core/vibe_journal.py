@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable
+
+
+class VibeJobJournal:
+    """Append-only record of a bulk vibe-caching run, so it can be resumed.
+
+    One JSON object per line: a ``start`` record with the ordered song list,
+    then a ``done`` or ``fail`` record per attempt. Replaying the file
+    rebuilds the state after a crash.
+
+    State changes take effect in memory at once. Without ``schedule`` each
+    record is written and fsync-ed before the call returns; with it, records
+    are buffered and ``schedule(self.flush)`` is asked to write them, so the
+    caller (e.g. the GUI thread) never waits on the disk and one fsync
+    covers every record since the last flush.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_retries: int = 3,
+        backoff_seconds: float = 30,
+        schedule: Callable[[Callable[[], None]], None] | None = None,
+    ):
+        self.path = Path(path)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._schedule = schedule
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._buffer: list[str] = []
+        self._truncate = False
+        self._flush_pending = False
+        self._songs: list[str] = []
+        self._song_set: frozenset[str] = frozenset()
+        self.preview = False
+        self.started_at = 0.0
+        self._done: set[str] = set()
+        self._attempts: dict[str, int] = {}
+        self._retry_at: dict[str, float] = {}
+        self._errors: dict[str, str] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn final line from a crash
+            self._apply(record)
+
+    def _apply(self, record: dict):
+        op = record.get("op")
+        path = record.get("path", "")
+        if op == "start":
+            self._songs = [str(p) for p in record.get("songs", [])]
+            self._song_set = frozenset(self._songs)
+            self.preview = bool(record.get("preview", False))
+            self.started_at = float(record.get("ts", 0.0))
+            self._done.clear()
+            self._attempts.clear()
+            self._retry_at.clear()
+            self._errors.clear()
+        elif op == "done":
+            self._done.add(path)
+            self._retry_at.pop(path, None)
+            self._errors.pop(path, None)
+        elif op == "fail":
+            self._attempts[path] = int(record.get("attempt", 1))
+            self._errors[path] = str(record.get("error", ""))
+            retry_at = record.get("retry_at")
+            if retry_at is None:
+                self._retry_at.pop(path, None)
+            else:
+                self._retry_at[path] = float(retry_at)
+
+    def _append(self, record: dict):
+        """Apply ``record`` and buffer it; the lock is held."""
+        self._apply(record)
+        self._buffer.append(json.dumps(record) + "\n")
+
+    def _request_flush(self):
+        if self._schedule is None:
+            self.flush()
+            return
+        with self._lock:
+            if self._flush_pending:
+                return
+            self._flush_pending = True
+        self._schedule(self.flush)
+
+    def flush(self):
+        """Write buffered records with a single fsync."""
+        with self._io_lock:
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+                truncate, self._truncate = self._truncate, False
+                self._flush_pending = False
+            if truncate:
+                self.path.unlink(missing_ok=True)
+            if not lines:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def start(self, songs: list[Path], preview: bool = False):
+        """Begin a new run, discarding any previous journal."""
+        with self._lock:
+            self._buffer = []
+            self._truncate = True
+            self._append(
+                {
+                    "op": "start",
+                    "songs": [str(p) for p in songs],
+                    "preview": preview,
+                    "ts": time.time(),
+                }
+            )
+        self._request_flush()
+
+    def mark_done(self, path: Path):
+        with self._lock:
+            self._append({"op": "done", "path": str(path)})
+        self._request_flush()
+
+    def mark_failed(self, path: Path, error: str) -> float | None:
+        """Record a failure; return seconds until a retry, or None if exhausted."""
+        with self._lock:
+            key = str(path)
+            attempt = self._attempts.get(key, 0) + 1
+            delay = None
+            if attempt <= self.max_retries:
+                delay = self.backoff_seconds * 2 ** (attempt - 1)
+            self._append(
+                {
+                    "op": "fail",
+                    "path": key,
+                    "attempt": attempt,
+                    "error": error,
+                    "retry_at": None if delay is None else time.time() + delay,
+                }
+            )
+        self._request_flush()
+        return delay
+
+    def finish(self):
+        with self._lock:
+            self._buffer = []
+            self._truncate = True
+            self._songs = []
+            self._song_set = frozenset()
+            self._done.clear()
+            self._attempts.clear()
+            self._retry_at.clear()
+            self._errors.clear()
+        self._request_flush()
+
+    def __contains__(self, path: Path) -> bool:
+        return str(path) in self._song_set
+
+    @property
+    def total(self) -> int:
+        return len(self._songs)
+
+    @property
+    def done_count(self) -> int:
+        return len(self._done & self._song_set)
+
+    def failed(self) -> dict[Path, str]:
+        """Songs that used up their retries, with the last error."""
+        return {
+            Path(p): self._errors.get(p, "")
+            for p in self._attempts
+            if p not in self._done and p not in self._retry_at
+        }
+
+    def pending(self) -> list[tuple[Path, float]]:
+        """Unfinished songs in queue order, with the time each may next run."""
+        exhausted = self.failed()
+        out = []
+        for p in self._songs:
+            if p in self._done or Path(p) in exhausted:
+                continue
+            out.append((Path(p), self._retry_at.get(p, 0.0)))
+        return out
+
+    @property
+    def resumable(self) -> bool:
+        return bool(self._songs) and bool(self.pending())
+
+
+class ThroughputMeter:
+    """Songs per minute over a sliding window of recent completions."""
+
+    def __init__(self, window: int = 50, started: float | None = None):
+        self._times: deque[float] = deque(maxlen=window)
+        self._started = time.monotonic() if started is None else started
+
+    def tick(self, now: float | None = None):
+        self._times.append(time.monotonic() if now is None else now)
+
+    def per_minute(self) -> float:
+        times = self._times
+        if len(times) >= 2:
+            count, elapsed = len(times) - 1, times[-1] - times[0]
+        elif times:
+            count, elapsed = 1, times[0] - self._started
+        else:
+            return 0.0
+        return count * 60.0 / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self, remaining: int) -> float | None:
+        rate = self.per_minute()
+        if rate <= 0:
+            return None
+        return remaining * 60.0 / rate
+
+
+def format_eta(seconds: float | None) -> str:
+    if seconds is None:
+        return "--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {secs:02d}s"
+    return f"{secs}s"
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import os
+import time
+from functools import partial
+from pathlib import Path
+from typing import Callable
+
+from gui.core.analysis_cache import (
+    audio_changed,
+    fingerprint_confirmed_at,
+    restamp_fingerprint,
+)
+from gui.core.vibes import vibe_cache_staleness
+
+# Rough resident size of one warm Essentia process mid-analysis.
+ESSENTIA_WORKER_BYTES = 512 * 1024 * 1024
+MAX_VIBE_WORKERS = 16
+
+
+def system_load() -> float | None:
+    """One-minute load average, or None where the OS doesn't report it."""
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+def available_memory(meminfo: Path = Path("/proc/meminfo")) -> int | None:
+    """Bytes the kernel considers available for new work, if known."""
+    try:
+        with open(meminfo, encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class AdaptiveConcurrency:
+    """Picks how many analyses to run at once.
+
+    A positive ``configured`` count is used as-is. With 0 (auto) the limit
+    starts at nproc/2 and then follows the CPU left over by other programs
+    (load average minus our own workers), one step per call so a load spike
+    doesn't make it thrash, and never exceeds what free memory can hold.
+    """
+
+    def __init__(
+        self,
+        configured: int = 0,
+        cpus: int | None = None,
+        worker_bytes: int = ESSENTIA_WORKER_BYTES,
+        max_workers: int = MAX_VIBE_WORKERS,
+    ):
+        self.configured = configured
+        self.cpus = max(1, cpus or os.cpu_count() or 1)
+        self.worker_bytes = worker_bytes
+        self.max_workers = max(1, min(max_workers, self.cpus))
+        self.current = configured if configured > 0 else max(1, self.cpus // 2)
+        self.current = min(self.current, self.max_workers)
+
+    @property
+    def auto(self) -> bool:
+        return self.configured <= 0
+
+    def update(
+        self,
+        running: int,
+        load: float | None = None,
+        mem_available: int | None = None,
+    ) -> int:
+        if not self.auto:
+            return self.current
+        target = self.current
+        if load is not None:
+            others = max(0.0, load - running)
+            target = int(self.cpus - others)
+        if mem_available is not None:
+            target = min(target, running + mem_available // self.worker_bytes)
+        target = max(1, min(self.max_workers, target))
+        if target > self.current:
+            self.current += 1
+        elif target < self.current:
+            self.current -= 1
+        return self.current
+
+
+def order_by_size(
+    paths: list[Path],
+    group: Callable[[Path], object] | None = None,
+    size: Callable[[Path], int | None] | None = None,
+) -> list[Path]:
+    """Largest files first, so the longest analyses don't straggle at the end.
+
+    With ``group`` (e.g. a song's ``STALE_*`` reason) paths are ordered by
+    group first and by size only within each group. ``size`` looks up sizes
+    a scan already knows; only paths it has no answer for are stat-ed.
+    """
+
+    def key(path: Path) -> tuple:
+        known = size(path) if size else None
+        if known is None:
+            try:
+                known = path.stat().st_size
+            except OSError:
+                known = 0
+        return (group(path) if group else 0, -known)
+
+    return sorted(paths, key=key)
+
+
+def stale_vibe_songs(
+    songs: list[dict],
+    max_age_seconds: float,
+    preview_ok: bool = False,
+    now: float | None = None,
+    on_confirmed: Callable[[Path, str], None] | None = None,
+) -> list[tuple[Path, int]]:
+    """Songs (``Song.to_dict`` form) whose cached vibes need redoing.
+
+    Each comes with its ``STALE_*`` reason. The ``mtime`` a library scan
+    attaches is used as-is; other songs are stat-ed, and skipped if they
+    vanished. This may hash audio, so keep it off the GUI thread.
+
+    When a newer mtime turns out to be a tag edit, ``on_confirmed`` gets the
+    song and its fingerprint re-stamped with that mtime; writing it back
+    means the next check needs no hashing.
+    """
+    now = time.time() if now is None else now
+    stale: list[tuple[Path, int]] = []
+    for s in songs:
+        path = Path(s["path"])
+        mtime = s.get("mtime")
+        mtime_ns = s.get("mtime_ns")
+        if mtime is None or mtime_ns is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            mtime, mtime_ns = st.st_mtime, st.st_mtime_ns
+        fingerprint = s.get("vibe_audio_hash", "")
+        changed = None
+        if fingerprint:
+            changed = partial(
+                _audio_changed, path, fingerprint, mtime_ns, on_confirmed
+            )
+        staleness = vibe_cache_staleness(
+            s.get("vibe_analysis", ""),
+            s.get("vibe_cached_at_epoch", ""),
+            s.get("vibe_cache_schema", ""),
+            mtime,
+            now,
+            max_age_seconds,
+            preview_ok=preview_ok,
+            audio_changed=changed,
+        )
+        if staleness is not None:
+            stale.append((path, staleness[0]))
+    return stale
+
+
+def _audio_changed(
+    path: Path,
+    fingerprint: str,
+    mtime_ns: int,
+    on_confirmed: Callable[[Path, str], None] | None,
+) -> bool:
+    if audio_changed(path, fingerprint, mtime_ns):
+        return True
+    if on_confirmed and not fingerprint_confirmed_at(fingerprint, mtime_ns):
+        on_confirmed(path, restamp_fingerprint(fingerprint, mtime_ns))
+    return False
+
+
+def plan_vibe_run(
+    songs: list[dict],
+    max_age_seconds: float,
+    only_stale: bool = True,
+    preview_ok: bool = False,
+    on_confirmed: Callable[[Path, str], None] | None = None,
+) -> list[Path]:
+    """The songs a vibe run should analyze, in the order to analyze them.
+
+    With ``only_stale`` that is the stale songs, most urgent reason first
+    (missing before merely expired); otherwise every song. See
+    ``stale_vibe_songs`` for ``on_confirmed``.
+    """
+    sizes = {Path(s["path"]): s.get("size") for s in songs}
+    if not only_stale:
+        return order_by_size(list(sizes), size=sizes.get)
+    reasons = dict(
+        stale_vibe_songs(
+            songs, max_age_seconds, preview_ok=preview_ok, on_confirmed=on_confirmed
+        )
+    )
+    return order_by_size(list(reasons), group=reasons.get, size=sizes.get)
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, fields
+from typing import Callable
+
+# v1: "; "-joined text from ESSENTIA_SCRIPT. v2: compact JSON of VibeAnalysis.
+VIBE_CACHE_SCHEMA = "v2"
+
+# Decimal places kept in the tag; enough for display and similarity.
+_PRECISION = {
+    "tempo": 2,
+    "strength": 3,
+    "rhythm_confidence": 3,
+    "duration": 2,
+    "onset_rate": 3,
+    "rms_mean": 5,
+    "centroid_mean_hz": 1,
+}
+
+
+def _float(value) -> float | None:
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class VibeAnalysis:
+    tempo: float | None = None
+    key: str = ""
+    scale: str = ""
+    strength: float | None = None
+    rhythm_confidence: float | None = None
+    duration: float | None = None
+    onset_rate: float | None = None
+    rms_mean: float | None = None
+    centroid_mean_hz: float | None = None
+    preview: bool = False
+
+    def to_dict(self) -> dict:
+        out: dict = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if value is None or value == "" or value is False:
+                continue
+            if f.name in _PRECISION:
+                value = round(value, _PRECISION[f.name])
+            out[f.name] = value
+        return out
+
+    @classmethod
+    def from_dict(cls, d: dict) -> VibeAnalysis:
+        return cls(
+            tempo=_float(d.get("tempo")),
+            key=str(d.get("key") or ""),
+            scale=str(d.get("scale") or ""),
+            strength=_float(d.get("strength")),
+            rhythm_confidence=_float(d.get("rhythm_confidence")),
+            duration=_float(d.get("duration")),
+            onset_rate=_float(d.get("onset_rate")),
+            rms_mean=_float(d.get("rms_mean")),
+            centroid_mean_hz=_float(d.get("centroid_mean_hz")),
+            preview=bool(d.get("preview", False)),
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text: str) -> VibeAnalysis:
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("vibe analysis must be a JSON object")
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_legacy(cls, text: str) -> VibeAnalysis:
+        """Parse the v1 ``tempo=120.00 BPM; key=A minor (strength 0.80)`` form."""
+        metrics: dict[str, str] = {}
+        for segment in text.split("; "):
+            if "=" in segment:
+                k, v = segment.split("=", 1)
+                metrics[k.strip()] = v.strip()
+
+        def number(name: str) -> float | None:
+            raw = metrics.get(name, "").split()
+            return _float(raw[0].rstrip("s")) if raw else None
+
+        key = scale = ""
+        strength = None
+        key_raw = metrics.get("key", "")
+        if key_raw:
+            name, _, rest = key_raw.partition(" (strength ")
+            key, _, scale = name.partition(" ")
+            strength = _float(rest.rstrip(")")) if rest else None
+        return cls(
+            tempo=number("tempo"),
+            key=key,
+            scale=scale,
+            strength=strength,
+            rhythm_confidence=number("rhythm_confidence"),
+            duration=number("duration"),
+            onset_rate=_float(metrics.get("onset_rate", "").removesuffix("/s")),
+            rms_mean=number("rms_mean"),
+            centroid_mean_hz=number("centroid_mean_hz"),
+        )
+
+    @property
+    def key_name(self) -> str:
+        return f"{self.key} {self.scale}".strip()
+
+    def describe(self) -> str:
+        """Human-readable form, matching what v1 stored in the tag."""
+        parts = []
+        if self.tempo is not None:
+            parts.append(f"tempo={self.tempo:.2f} BPM")
+        if self.key:
+            key_text = self.key_name
+            if self.strength is not None:
+                key_text = f"{key_text} (strength {self.strength:.2f})"
+            parts.append(f"key={key_text}")
+        if self.rhythm_confidence is not None:
+            parts.append(f"rhythm_confidence={self.rhythm_confidence:.3f}")
+        if self.duration is not None:
+            parts.append(f"duration={self.duration:.2f}s")
+        if self.onset_rate is not None:
+            parts.append(f"onset_rate={self.onset_rate:.2f}/s")
+        if self.rms_mean is not None:
+            parts.append(f"rms_mean={self.rms_mean:.4f}")
+        if self.centroid_mean_hz is not None:
+            parts.append(f"centroid_mean_hz={self.centroid_mean_hz:.2f}")
+        return "; ".join(parts)
+
+    def summary(self) -> str:
+        parts = []
+        t = self.tempo
+        if t is not None:
+            if t < 80:
+                parts.append("slow tempo")
+            elif t < 110:
+                parts.append("steady tempo")
+            elif t < 145:
+                parts.append("driving tempo")
+            else:
+                parts.append("fast tempo")
+
+        r = self.rms_mean
+        if r is not None:
+            if r < 0.035:
+                parts.append("soft dynamics")
+            elif r < 0.080:
+                parts.append("balanced dynamics")
+            else:
+                parts.append("strong dynamics")
+
+        c = self.centroid_mean_hz
+        if c is not None:
+            if c < 1700:
+                parts.append("warm tone")
+            elif c < 3200:
+                parts.append("neutral tone")
+            else:
+                parts.append("bright tone")
+
+        if self.key:
+            key_text = self.key_name
+            if self.strength is not None:
+                key_text = f"{key_text} (strength {self.strength:.2f})"
+            parts.append(f"key {key_text}")
+
+        if not parts:
+            return "unknown vibes"
+        return ", ".join(parts)
+
+
+def parse_vibe_analysis(
+    text: str, schema: str = VIBE_CACHE_SCHEMA
+) -> VibeAnalysis | None:
+    """Decode a stored ``vibe_analysis`` tag, or None if it is empty or garbled."""
+    if not text:
+        return None
+    try:
+        if schema == "v1" or not text.lstrip().startswith("{"):
+            return VibeAnalysis.from_legacy(text)
+        return VibeAnalysis.from_json(text)
+    except (ValueError, TypeError):
+        return None
+
+
+# Why a cached vibe needs redoing, most urgent first.
+STALE_MISSING = 0
+STALE_FILE_CHANGED = 1
+STALE_SCHEMA = 2
+STALE_PREVIEW = 3
+STALE_EXPIRED = 4
+
+
+def vibe_cache_staleness(
+    analysis: str,
+    cached_at_epoch: str,
+    schema: str,
+    mtime: float,
+    now: float,
+    max_age_seconds: float,
+    preview_ok: bool = False,
+    audio_changed: Callable[[], bool] | None = None,
+) -> tuple[int, float] | None:
+    """Return None if the cached vibe is fresh, else a sort key (reason, -age).
+
+    Fresh means: a parseable record in the current schema, cached no longer
+    than ``max_age_seconds`` ago, and no audio change since. The vibe writer
+    preserves mtime, so an older mtime settles that; a newer one may just be
+    a comment edit, and is only trusted as a change when ``audio_changed``
+    (comparing the record's audio fingerprint) says so or is not given.
+    Preview records only count as fresh when ``preview_ok`` is set.
+    """
+    try:
+        cached_at = float(cached_at_epoch)
+    except (TypeError, ValueError):
+        cached_at = None
+    record = parse_vibe_analysis(analysis, schema)
+    if cached_at is None or record is None:
+        return (STALE_MISSING, 0.0)
+    age = now - cached_at
+    if mtime > cached_at + 1 and (audio_changed is None or audio_changed()):
+        return (STALE_FILE_CHANGED, -age)
+    if schema != VIBE_CACHE_SCHEMA:
+        return (STALE_SCHEMA, -age)
+    if record.preview and not preview_ok:
+        return (STALE_PREVIEW, -age)
+    if max_age_seconds > 0 and age > max_age_seconds:
+        return (STALE_EXPIRED, -age)
+    return None
@@ -0,0 +1,28 @@
+"""Small song and vibe factories shared by the library tests."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from gui.core.song import Song
+from gui.core.vibes import VibeAnalysis
+
+ROOT = Path("/music")
+
+
+def make_vibe(tempo: float, rms: float, key: str = "C") -> VibeAnalysis:
+    return VibeAnalysis(
+        tempo=tempo, rms_mean=rms, centroid_mean_hz=2000, onset_rate=2, key=key
+    )
+
+
+def make_song(
+    channel: str, title: str, vibe: VibeAnalysis | None = None, **fields
+) -> Song:
+    """A song at ``ROOT/<channel>/<title>.mp3``; ``fields`` set any other tag."""
+    return Song(
+        path=ROOT / channel / f"{title}.mp3",
+        title=title,
+        vibe_analysis=vibe.to_json() if vibe else "",
+        **fields,
+    )
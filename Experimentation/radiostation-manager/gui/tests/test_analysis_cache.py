@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import shutil
+
+from gui.core import analysis_cache
+from gui.core.analysis_cache import (
+    AnalysisCache,
+    audio_changed,
+    audio_content_hash,
+    audio_fingerprint,
+)
+from gui.core.id3 import write_id3_tags
+from gui.core.vibes import VibeAnalysis
+
+MPEG_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        self.now += 1  # every access is strictly later than the last
+        return self.now
+
+
+def test_hash_ignores_tags_but_not_audio(tmp_path):
+    song = tmp_path / "song.mp3"
+    song.write_bytes(MPEG_FRAME * 20)
+    bare = audio_content_hash(song)
+
+    write_id3_tags(song, {"title": "Moonlit Drive", "comment": "calm"})
+    with open(song, "ab") as f:
+        f.write(b"TAG" + b"\x00" * 125)
+    assert audio_content_hash(song) == bare
+
+    copy = tmp_path / "song (1).mp3"
+    shutil.copy(song, copy)
+    write_id3_tags(copy, {"comment": "a much longer comment " * 200})
+    assert audio_content_hash(copy) == bare
+
+    song.write_bytes(MPEG_FRAME * 19 + b"\xff\xfb\x90\x64" + b"\x01" * 413)
+    assert audio_content_hash(song) != bare
+
+
+def test_cache_round_trip_and_lru_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis_cache, "time", FakeClock())
+    record = VibeAnalysis(tempo=120.0, key="C", scale="major", rms_mean=0.04)
+    size = len(record.to_json())
+    cache = AnalysisCache(tmp_path / "cache.sqlite3", max_bytes=size * 3)
+
+    for name in ("a", "b", "c"):
+        cache.put(name, record)
+    assert cache.get("a") == record
+    assert cache.get("a", preview=True) is None
+
+    cache.put("d", record)  # "b" is now least recently used
+    assert len(cache) == 3
+    assert cache.get("b") is None
+    assert cache.get("a") == record
+    assert cache.size_bytes == size * 3
+
+    cache.close()
+    reopened = AnalysisCache(tmp_path / "cache.sqlite3", max_bytes=size * 3)
+    assert reopened.size_bytes == size * 3
+    assert reopened.get("d") == record
+
+
+def test_fingerprint_tells_audio_changes_from_tag_edits(tmp_path):
+    song = tmp_path / "song.mp3"
+    song.write_bytes(MPEG_FRAME * 20)
+    fingerprint = audio_fingerprint(song)
+    write_id3_tags(song, {"comment": "calm"})
+    assert not audio_changed(song, fingerprint)
+
+    song.write_bytes(MPEG_FRAME * 19 + b"\xff\xfb\x90\x64" + b"\x01" * 413)
+    assert audio_changed(song, fingerprint)  # same length, other audio
+    song.write_bytes(MPEG_FRAME * 21)
+    assert audio_changed(song, fingerprint)
+    assert audio_changed(tmp_path / "gone.mp3", fingerprint)
@@ -38,11 +38,11 @@ def test_window_title_and_size(window):
     assert window.height() == 720
 
 
-def test_mainwindow_has_ten_stack_widgets(window):
+def test_mainwindow_has_eleven_stack_widgets(window):
     assert isinstance(window._stack, QStackedWidget)
-    # 10 regular widgets + 1 loading page = 11
-    assert len(window._widgets) == 11
-    assert window._stack.count() == 11
+    # 11 regular widgets + 1 loading page = 12
+    assert len(window._widgets) == 12
+    assert window._stack.count() == 12
 
 
 def test_navigation_via_signals_switches_pages(window):
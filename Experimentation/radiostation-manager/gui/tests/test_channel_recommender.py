@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from gui.core import channel_recommender
+from gui.core.channel_recommender import (
+    ChannelRecommender,
+    get_channel_recommender,
+    invalidate_channel_recommenders,
+)
+from gui.core.metadata import recommend_channel
+from gui.core.song import Song
+from gui.tests.helpers import ROOT, make_song, make_vibe
+
+
+def _library() -> list[Song]:
+    songs = []
+    for i in range(10):
+        songs.append(make_song("chill", f"Harbor Rain {i}", make_vibe(70 + i, 0.02)))
+        songs.append(
+            make_song("bits-tech", f"Pixel Quest {i}", make_vibe(150 + i, 0.2))
+        )
+        songs.append(make_song("indie", f"Porch Song {i}"))
+    return songs
+
+
+def test_rank_batch_learns_titles_and_vibes():
+    recommender = ChannelRecommender(_library(), ROOT, ["chill", "empty"])
+    assert recommender.channels == ["bits-tech", "chill", "empty", "indie"]
+
+    by_title, by_vibe, both, unknown = recommender.rank_batch(
+        ["Pixel Dungeon.mp3", "untitled.mp3", "Harbor Lights.mp3", "zzz.mp3"],
+        [None, make_vibe(72, 0.025), make_vibe(155, 0.2), None],
+    )
+    assert by_title[0][0] == "bits-tech"
+    assert by_vibe[0][0] == "chill"
+    assert abs(sum(c for _, c in by_vibe) - 1.0) < 1e-9
+    assert unknown == []
+    # Conflicting vibes make the title's pick less confident.
+    assert both[0][0] == "chill"
+    assert both[0][1] < recommender.rank("Harbor Lights.mp3")[0][1]
+
+    # A channel's own name counts, even with no songs in it yet.
+    assert recommender.rank("empty room.mp3")[0][0] == "empty"
+
+
+def test_recommend_channel_uses_confident_rankings_only():
+    channels = ["chill", "lofi"]
+    assert recommend_channel("lofi beat.mp3", channels, [("chill", 0.9)]) == "chill"
+    assert recommend_channel("lofi beat.mp3", channels, [("chill", 0.3)]) == "lofi"
+    assert recommend_channel("lofi beat.mp3", channels, [("gone", 0.9)]) == "lofi"
+    assert recommend_channel("lofi beat.mp3", channels) == "lofi"
+
+
+def test_shared_recommender_retrains_after_invalidation():
+    calls = []
+
+    def songs():
+        calls.append(1)
+        return _library()
+
+    invalidate_channel_recommenders()
+    first = get_channel_recommender(ROOT, songs)
+    assert get_channel_recommender(ROOT, songs) is first
+    assert get_channel_recommender(ROOT / "other", lambda: None) is None
+    invalidate_channel_recommenders()
+    assert get_channel_recommender(ROOT, songs) is not first
+    assert len(calls) == 2
+    assert channel_recommender._shared
+    invalidate_channel_recommenders()
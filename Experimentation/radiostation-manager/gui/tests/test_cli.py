@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from gui import cli
+from gui.core.song import Song
+from gui.core.tag_index import TagIndex
+
+
+def _events(capsys) -> list[dict]:
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_stale_reports_json_lines_and_check_exit_code(tmp_path, monkeypatch, capsys):
+    channel = tmp_path / "music" / "lofi"
+    channel.mkdir(parents=True)
+    for name in ("fresh", "old"):
+        (channel / f"{name}.mp3").write_bytes(b"\x00" * 16)
+
+    def reader(path: Path) -> Song:
+        song = Song(path=path, comment="A calm loop.")
+        if path.stem == "fresh":
+            song.vibe_analysis = '{"tempo":90.0}'
+            song.vibe_cached_at_epoch = str(int(path.stat().st_mtime) + 5)
+            song.vibe_cache_schema = "v2"
+        else:
+            song.comment = "Made with Suno"
+        return song
+
+    index = TagIndex(tmp_path / "index.sqlite3")
+    original_sync = index.sync
+    monkeypatch.setattr(
+        index, "sync", lambda entries, **kw: original_sync(entries, reader=reader, **kw)
+    )
+    monkeypatch.setattr(cli, "get_tag_index", lambda: index)
+    root = str(tmp_path / "music")
+
+    assert cli.main(["stale", "--music-root", root]) == cli.EXIT_OK
+    events = _events(capsys)
+    assert [e["event"] for e in events][0] == "scan_start"
+    stale = [e for e in events if e["event"] == "stale"]
+    assert stale == [
+        {
+            "event": "stale",
+            "path": str(channel / "old.mp3"),
+            "comment": True,
+            "vibe": "missing",
+        }
+    ]
+    assert events[-1]["stale_comments"] == 1
+
+    assert cli.main(["stale", "--check", "--music-root", root]) == cli.EXIT_FAILED
+
+
+def test_resume_without_journal_is_fatal(tmp_path, monkeypatch, capsys):
+    config = cli.get_config()
+    config.vibe_job_journal_path = tmp_path / "none.jsonl"
+    monkeypatch.setattr(cli, "get_config", lambda: config)
+    assert cli.main(["cache-vibes", "--resume"]) == cli.EXIT_FATAL
+    assert _events(capsys)[-1]["event"] == "error"
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from gui.core.comment_batch import FAILED, GENERATING, QUEUED, READY, CommentBatch
+from gui.core.comment_prompt import song_statement
+from gui.core.opencode_client import OpenCodeSignals
+from gui.core.song import Song
+
+GOOD = "Soft rain and a slow piano follow Luna Midori home across the harbor at night."
+BAD = "A slow song about rain. It was made with Suno for the playlist."
+
+
+class FakeTask:
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.signals = OpenCodeSignals()
+
+
+class FakeRunner:
+    parallelism = 2
+
+    def __init__(self):
+        self.submitted = []
+        self.cancelled = []
+
+    def submit(self, prompt, working_dir, template, song, reuse):
+        task = FakeTask(prompt)
+        task.reuse = reuse
+        self.submitted.append(task)
+        return task
+
+    def cancel(self, task):
+        self.cancelled.append(task)
+
+
+def _batch(count: int) -> tuple[CommentBatch, FakeRunner]:
+    runner = FakeRunner()
+    paths = [Path(f"/music/Lofi/song{i}.mp3") for i in range(count)]
+    batch = CommentBatch(paths, prompts=None, runner=runner)
+    batch.running = True
+    batch._researching = True
+    return batch, runner
+
+
+def _prepare(batch: CommentBatch, index: int):
+    song = Song(path=batch.drafts[index].path, title=f"Song {index}")
+    batch._on_prepared(index, song, f"prompt {index}")
+
+
+def test_generations_are_bounded_and_pipelined():
+    batch, runner = _batch(3)
+    for i in range(3):
+        _prepare(batch, i)
+    assert [t.prompt for t in runner.submitted] == ["prompt 0", "prompt 1"]
+    assert [d.status for d in batch.drafts] == [GENERATING, GENERATING, QUEUED]
+
+    runner.submitted[0].signals.finished.emit(GOOD)
+    assert batch.drafts[0].status == READY and batch.drafts[0].accepted
+    assert batch.drafts[0].text == GOOD
+    assert runner.submitted[2].prompt == "prompt 2"  # freed slot is reused
+
+    finished = []
+    batch.finished.connect(lambda: finished.append(True))
+    runner.submitted[1].signals.error_occurred.emit("provider down")
+    runner.submitted[2].signals.finished.emit(GOOD)
+    batch._on_research_done()
+    assert batch.drafts[1].status == FAILED and batch.drafts[1].error == "provider down"
+    assert finished == [True] and not batch.running
+    assert [d.path.name for d in batch.accepted()] == ["song0.mp3", "song2.mp3"]
+
+
+def test_rule_breaking_draft_is_retried_once_then_kept_for_review():
+    batch, runner = _batch(1)
+    _prepare(batch, 0)
+    runner.submitted[0].signals.finished.emit(BAD)
+    assert len(runner.submitted) == 2  # regenerated with the same prompt
+    assert runner.submitted[1].prompt == "prompt 0"
+    assert runner.submitted[0].reuse and not runner.submitted[1].reuse
+    runner.submitted[1].signals.finished.emit(BAD.replace("Suno", "love"))
+    draft = batch.drafts[0]
+    assert draft.status == READY and draft.tries == 2
+    assert not draft.accepted  # still breaks the rules; the user decides
+    assert "playlist" in draft.text
+
+
+def test_cancel_stops_queued_and_running_songs():
+    batch, runner = _batch(3)
+    _prepare(batch, 0)
+    batch.cancel()
+    assert runner.cancelled == runner.submitted
+    assert {d.status for d in batch.drafts} == {FAILED}
+    runner.submitted[0].signals.finished.emit(GOOD)  # late answer is ignored
+    assert batch.drafts[0].status == FAILED
+
+
+def test_song_statement_prefers_answers():
+    song = Song(path=Path("a.mp3"), title="A", why_made="old", music_theme="rain")
+    statement = song_statement(song, {"why_made": "new", "backstory": ""})
+    assert "Why I made this song: new" in statement
+    assert "Music theme: rain" in statement
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from gui.core.comment_rules import check_draft, count_sentences, rank_drafts
+
+GOOD = "Soft rain and a slow piano follow Luna Midori home across the harbor at night."
+
+
+def test_count_sentences_ignores_abbreviations_and_final_stop():
+    assert count_sentences(GOOD) == 1
+    assert count_sentences("Dr. Moon hums along. Then the beat drops!") == 2
+    assert count_sentences("") == 0
+
+
+def test_check_draft_flags_rule_breaks():
+    clean = check_draft(f'Comment: "{GOOD}"')
+    assert clean.ok and clean.score == 1.0
+    assert clean.text == GOOD
+
+    two = check_draft("A slow song about rain. It was made with Suno for the playlist.")
+    assert not two.ok
+    assert two.problems == ["2 sentences", 'boilerplate "playlist"', 'boilerplate "suno"']
+
+    short = check_draft("Rainy harbor piano")
+    assert short.ok
+    assert short.warnings == ["short (3 words)", "no closing punctuation"]
+    assert not check_draft("  ").ok
+
+
+def test_rank_drafts_puts_valid_drafts_first():
+    ranked = rank_drafts(
+        [
+            "Perfect for a study session on Midori AI Radio.",
+            "Rainy harbor piano",
+            GOOD,
+        ]
+    )
+    assert [c.text for c in ranked] == [
+        GOOD,
+        "Rainy harbor piano",
+        "Perfect for a study session on Midori AI Radio.",
+    ]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from gui.core.essentia_pool import AnalysisPool
+
+# Stands in for ESSENTIA_SCRIPT --serve: echoes the path and its own pid,
+# and dies or prints stray output on request.
+FAKE_SERVER = r"""
+import json, os, sys
+for line in sys.stdin:
+    path = json.loads(line)["path"]
+    if path.endswith("crash.mp3"):
+        sys.stderr.write("segfault in decoder\n")
+        sys.exit(3)
+    if path.endswith("chatty.mp3"):
+        print("[ INFO   ] decoder warming up", flush=True)
+    if path.endswith("bad.mp3"):
+        reply = {"ok": False, "error": "no audio decoded", "path": path}
+    else:
+        reply = {"ok": True, "path": path, "pid": os.getpid()}
+    print(json.dumps(reply), flush=True)
+"""
+
+
+def _pool(**kwargs) -> AnalysisPool:
+    return AnalysisPool([sys.executable, "-c", FAKE_SERVER], **kwargs)
+
+
+def test_pool_reuses_process_and_recycles_after_max_jobs():
+    prepared: list[int] = []
+    pool = _pool(max_jobs=3, prepare=lambda: prepared.append(1))
+    try:
+        pids = [pool.analyze(Path(f"/m/{i}.mp3"))["pid"] for i in range(5)]
+    finally:
+        pool.close()
+    assert prepared == [1]
+    assert pids[0] == pids[1] == pids[2]
+    assert pids[3] == pids[4] != pids[0]
+
+
+def test_pool_reports_errors_and_replaces_crashed_process():
+    pool = _pool()
+    try:
+        first = pool.analyze(Path("/m/a.mp3"))["pid"]
+        with pytest.raises(RuntimeError, match="no audio decoded"):
+            pool.analyze(Path("/m/bad.mp3"))
+        assert pool.analyze(Path("/m/b.mp3"))["pid"] == first
+
+        with pytest.raises(RuntimeError, match="segfault in decoder"):
+            pool.analyze(Path("/m/crash.mp3"))
+        assert pool.analyze(Path("/m/c.mp3"))["pid"] != first
+    finally:
+        pool.close()
+
+
+def test_pool_bounds_concurrent_processes():
+    pool = _pool(size=2)
+    results: list[int] = []
+    lock = threading.Lock()
+
+    def work(i: int):
+        pid = pool.analyze(Path(f"/m/{i}.mp3"))["pid"]
+        with lock:
+            results.append(pid)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(12)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+    finally:
+        pool.close()
+    assert len(results) == 12
+    assert len(set(results)) <= 2
+
+
+def test_stray_output_is_rejected_and_process_replaced():
+    pool = _pool()
+    try:
+        first = pool.analyze(Path("/m/a.mp3"))["pid"]
+        with pytest.raises(RuntimeError, match="unexpected reply for chatty.mp3"):
+            pool.analyze(Path("/m/chatty.mp3"))
+        reply = pool.analyze(Path("/m/b.mp3"))
+        assert reply["path"] == "/m/b.mp3" and reply["pid"] != first
+    finally:
+        pool.close()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+
+from gui.core import prompts
+from gui.core.prompts import FeedbackEntry, FeedbackQueue
+
+
+def _entry(title: str, rating: int = 3) -> FeedbackEntry:
+    return FeedbackEntry(
+        rating=rating,
+        output=f"A draft for {title}.",
+        prompt_template="song_statement",
+        song_title=title,
+        song_context="channel: lofi",
+    )
+
+
+def test_append_remove_and_get(tmp_path):
+    queue = FeedbackQueue(tmp_path / "queue.json")
+    assert queue.count == 0 and queue.load_all() == [] and queue.get(0) is None
+    for title in ("a", "b", "c"):
+        queue.append(_entry(title))
+    assert queue.count == 3
+    queue.remove(1)
+    assert [e.song_title for e in queue.load_all()] == ["a", "c"]
+    assert queue.get(1).song_title == "c"
+    queue.remove(5)  # out of range is ignored
+    assert queue.count == 2
+
+    lines = (tmp_path / "queue.json").read_text().splitlines()
+    assert len(lines) == 4  # three entries and one tombstone, nothing rewritten
+    assert json.loads(lines[-1])["op"] == "remove"
+
+
+def test_instances_see_each_others_writes(tmp_path):
+    path = tmp_path / "queue.json"
+    editor, manager = FeedbackQueue(path), FeedbackQueue(path)
+    editor.append(_entry("a"))
+    assert manager.count == 1
+    editor.append(_entry("b"))
+    manager.remove(0)
+    assert [e.song_title for e in editor.load_all()] == ["b"]
+
+    manager.compact()
+    editor.append(_entry("c"))
+    assert [e.song_title for e in manager.load_all()] == ["b", "c"]
+    manager.clear()
+    assert editor.count == 0
+
+
+def test_compacts_once_dead_lines_dominate(tmp_path, monkeypatch):
+    monkeypatch.setattr(prompts, "COMPACT_MIN_DEAD", 4)
+    path = tmp_path / "queue.json"
+    queue = FeedbackQueue(path)
+    for i in range(4):
+        queue.append(_entry(str(i)))
+    queue.remove(0)
+    assert len(path.read_text().splitlines()) == 5
+    queue.remove(0)  # 4 dead lines against 2 live entries
+    assert len(path.read_text().splitlines()) == 2
+    assert [e.song_title for e in queue.load_all()] == ["2", "3"]
+    queue.append(_entry("4"))
+    assert queue.count == 3
+
+
+def test_torn_line_is_skipped_and_sealed(tmp_path):
+    path = tmp_path / "queue.json"
+    queue = FeedbackQueue(path)
+    queue.append(_entry("a"))
+    with open(path, "a") as f:
+        f.write('{"rating": 5, "outp')  # crash mid-write
+    assert queue.count == 1
+    queue.append(_entry("b"))
+    assert [e.song_title for e in FeedbackQueue(path).load_all()] == ["a", "b"]
+
+
+def test_legacy_json_array_is_converted(tmp_path):
+    path = tmp_path / "queue.json"
+    path.write_text(json.dumps([_entry("a").to_dict(), _entry("b").to_dict()]))
+    queue = FeedbackQueue(path)
+    assert queue.count == 2
+    queue.append(_entry("c"))
+    assert [e.song_title for e in queue.load_all()] == ["a", "b", "c"]
+    assert path.read_text().count("\n") == 3
+
+    path.write_text("[]")  # what clear() used to write
+    assert FeedbackQueue(path).count == 0
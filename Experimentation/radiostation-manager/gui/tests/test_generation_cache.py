@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+
+from PySide6.QtCore import QCoreApplication
+
+from gui.core import generation_cache, opencode_client
+from gui.core.generation_cache import GenerationCache, generation_key
+from gui.core.opencode_client import OpenCodeTask
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+def test_key_covers_template_model_variant_and_prompt():
+    base = generation_key("T {title}", "m", "high", "T Rain")
+    assert base == generation_key("T {title}", "m", "high", "T Rain")
+    assert base != generation_key("T  {title}", "m", "high", "T Rain")
+    assert base != generation_key("T {title}", "other", "high", "T Rain")
+    assert base != generation_key("T {title}", "m", "max", "T Rain")
+    assert base != generation_key("T {title}", "m", "high", "T Snow")
+
+
+def test_drafts_are_kept_per_key_and_song(tmp_path):
+    cache = GenerationCache(tmp_path / "gen.sqlite3")
+    cache.put("k1", "first", song="/music/a.mp3")
+    cache.put("k1", "second", song="/music/a.mp3")
+    cache.put("k2", "other", song="/music/b.mp3")
+    assert [d.draft for d in cache.get("k1")] == ["second", "first"]
+    assert [d.draft for d in cache.for_song("/music/a.mp3")] == ["second", "first"]
+    cache.discard("k1", "second")
+    assert [d.draft for d in cache.get("k1")] == ["first"]
+    assert cache.get("missing") == []
+
+    reopened = GenerationCache(tmp_path / "gen.sqlite3")
+    assert len(reopened) == 2
+
+
+def test_ttl_and_lru_eviction(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(generation_cache, "time", clock)
+    cache = GenerationCache(tmp_path / "gen.sqlite3", max_entries=2, ttl_seconds=60)
+    cache.put("old", "a")
+    clock.now += 30
+    cache.put("mid", "b")
+    clock.now += 40
+    assert cache.get("old") == []  # expired, though not evicted yet
+    assert [d.draft for d in cache.get("mid")] == ["b"]
+
+    cache.put("new", "c")
+    clock.now += 1
+    cache.get("mid")
+    clock.now += 1
+    cache.put("newest", "d")
+    cache.evict()
+    assert len(cache) == 2
+    assert cache.get("new") == []  # least recently used
+    assert [d.draft for d in cache.get("mid")] == ["b"]
+
+
+def test_task_reuses_cached_answer_without_running_opencode(tmp_path, monkeypatch):
+    cache = GenerationCache(tmp_path / "gen.sqlite3")
+    cache.put("key", "A cached song about rain.")
+    monkeypatch.setattr(opencode_client, "get_generation_cache", lambda: cache)
+    monkeypatch.setenv("PATH", str(tmp_path))  # no opencode to run
+
+    task = OpenCodeTask(
+        "Write it", tmp_path, [("m", "high")], cache_key="key", reuse=True
+    )
+    drafts = []
+    task.signals.finished.connect(drafts.append)
+    task.run()
+    assert drafts == ["A cached song about rain."]
+    assert task.from_cache
+
+    fresh = OpenCodeTask("Write it", tmp_path, [("m", "high")], cache_key="key")
+    errors = []
+    fresh.signals.error_occurred.connect(errors.append)
+    fresh.run()
+    assert errors == ["opencode not found in PATH"]
+
+
+def test_disabled_cache_is_none(monkeypatch):
+    config = SimpleNamespace(generation_cache_max_entries=0)
+    monkeypatch.setattr(generation_cache, "get_config", lambda: config)
+    assert generation_cache.get_generation_cache() is None
+
+
+def test_runner_delivers_cached_answer_after_caller_connects(tmp_path, monkeypatch):
+    app = QCoreApplication.instance() or QCoreApplication([])
+    cache = GenerationCache(tmp_path / "gen.sqlite3")
+    monkeypatch.setattr(opencode_client, "get_generation_cache", lambda: cache)
+    runner = opencode_client.OpenCodeRunner(parallelism=1)
+    key = generation_key("T", "m", "high", "Write it")
+    cache.put(key, "A cached song about rain.")
+
+    task = runner.submit(
+        "Write it", tmp_path, attempts=[("m", "high")], template="T", reuse=True
+    )
+    drafts = []
+    task.signals.finished.connect(drafts.append)
+    for _ in range(5):
+        app.processEvents()
+    assert drafts == ["A cached song about rain."]
+    runner.shutdown()
+
+
+def test_runner_delivers_instant_error_after_caller_connects(tmp_path, monkeypatch):
+    app = QCoreApplication.instance() or QCoreApplication([])
+    monkeypatch.setenv("PATH", str(tmp_path))
+    monkeypatch.setattr(opencode_client, "get_generation_cache", lambda: None)
+    runner = opencode_client.OpenCodeRunner(parallelism=1)
+
+    task = runner.submit("Write it", tmp_path, attempts=[("m", "high")])
+    time.sleep(0.2)  # the caller is slow to connect
+    errors = []
+    task.signals.error_occurred.connect(errors.append)
+    deadline = time.monotonic() + 5
+    while not errors and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    assert errors == ["opencode not found in PATH"]
+    runner.shutdown()
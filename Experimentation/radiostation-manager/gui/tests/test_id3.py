@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import os
+import struct
+
+from gui.core.id3 import parse_id3v1, read_id3_tags, write_id3_tags
+
+MPEG_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+def _syncsafe(n: int) -> bytes:
+    return bytes([(n >> 21) & 0x7F, (n >> 14) & 0x7F, (n >> 7) & 0x7F, n & 0x7F])
+
+
+def _frame(major: int, frame_id: str, payload: bytes) -> bytes:
+    size = _syncsafe(len(payload)) if major == 4 else struct.pack(">I", len(payload))
+    return frame_id.encode() + size + b"\x00\x00" + payload
+
+
+def _tag(major: int, frames: list[bytes], padding: int = 0) -> bytes:
+    body = b"".join(frames) + b"\x00" * padding
+    return b"ID3" + bytes([major, 0, 0]) + _syncsafe(len(body)) + body
+
+
+def test_reads_ffmpeg_style_v24_tag(tmp_path):
+    tag = _tag(
+        4,
+        [
+            _frame(4, "TIT2", b"\x00Moonlit Drive"),
+            _frame(4, "COMM", b"\x00XXX\x00A calm late-night ride."),
+            _frame(4, "TXXX", b"\x03midori_ai_why_made\x00Caf\xc3\xa9 nights"),
+            _frame(4, "USLT", b"\x00eng\x00line one\nline two"),
+            _frame(4, "TBPM", b"\x0092"),
+        ],
+        padding=64,
+    )
+    song = tmp_path / "song.mp3"
+    song.write_bytes(tag + MPEG_FRAME * 3)
+
+    tags = read_id3_tags(song)
+    assert tags == {
+        "title": "Moonlit Drive",
+        "comment": "A calm late-night ride.",
+        "midori_ai_why_made": "Café nights",
+        "lyrics-eng": "line one\nline two",
+        "tbpm": "92",
+    }
+
+
+def test_reads_utf16_v23_frames(tmp_path):
+    title = "﻿Starlight".encode("utf-16-le")
+    desc = "﻿midori_ai_music_theme".encode("utf-16-le")
+    value = "﻿hope".encode("utf-16-le")
+    tag = _tag(
+        3,
+        [
+            _frame(3, "TIT2", b"\x01" + title),
+            _frame(3, "TXXX", b"\x01" + desc + b"\x00\x00" + value),
+        ],
+    )
+    song = tmp_path / "song.mp3"
+    song.write_bytes(tag + MPEG_FRAME)
+
+    assert read_id3_tags(song) == {
+        "title": "Starlight",
+        "midori_ai_music_theme": "hope",
+    }
+
+
+def test_falls_back_to_id3v1_and_reports_untagged(tmp_path):
+    block = bytearray(128)
+    block[0:3] = b"TAG"
+    block[3:10] = b"Old One"
+    block[97:104] = b"classic"
+    block[126] = 7
+    assert parse_id3v1(bytes(block)) == {
+        "title": "Old One",
+        "comment": "classic",
+        "track": "7",
+    }
+
+    v1_only = tmp_path / "v1.mp3"
+    v1_only.write_bytes(MPEG_FRAME + bytes(block))
+    assert read_id3_tags(v1_only)["title"] == "Old One"
+
+    bare = tmp_path / "bare.mp3"
+    bare.write_bytes(MPEG_FRAME)
+    assert read_id3_tags(bare) is None
+
+
+def test_writer_uses_padding_in_place_and_keeps_other_frames(tmp_path):
+    lyrics = _frame(4, "USLT", b"\x00eng\x00la la la")
+    tag = _tag(4, [_frame(4, "TIT2", b"\x00Keep Me"), lyrics], padding=512)
+    audio = MPEG_FRAME * 5
+    song = tmp_path / "song.mp3"
+    song.write_bytes(tag + audio)
+    os.utime(song, ns=(1_000_000_000, 1_500_000_000))
+
+    in_place = write_id3_tags(
+        song,
+        {"comment": "New comment", "midori_ai_vibe_summary": "warm tone"},
+        preserve_mtime=True,
+    )
+
+    assert in_place
+    data = song.read_bytes()
+    assert len(data) == len(tag) + len(audio)
+    assert data.endswith(audio)
+    assert song.stat().st_mtime_ns == 1_500_000_000
+    assert read_id3_tags(song) == {
+        "title": "Keep Me",
+        "lyrics-eng": "la la la",
+        "comment": "New comment",
+        "midori_ai_vibe_summary": "warm tone",
+    }
+
+    write_id3_tags(song, {"comment": "", "midori_ai_vibe_summary": "bright tone"})
+    assert read_id3_tags(song) == {
+        "title": "Keep Me",
+        "lyrics-eng": "la la la",
+        "midori_ai_vibe_summary": "bright tone",
+    }
+
+
+def test_writer_rewrites_atomically_when_tag_grows(tmp_path):
+    audio = MPEG_FRAME * 5
+    song = tmp_path / "song.mp3"
+    song.write_bytes(_tag(3, [_frame(3, "TIT2", b"\x00Old")]) + audio)
+
+    in_place = write_id3_tags(song, {"midori_ai_backstory": "Grew up by the sea ☾"})
+
+    assert not in_place
+    assert song.read_bytes().endswith(audio)
+    assert read_id3_tags(song) == {
+        "title": "Old",
+        "midori_ai_backstory": "Grew up by the sea ☾",
+    }
+    assert not list(tmp_path.glob(".id3-update-*"))
+
+    bare = tmp_path / "bare.mp3"
+    bare.write_bytes(audio)
+    assert not write_id3_tags(bare, {"title": "Fresh"})
+    assert read_id3_tags(bare) == {"title": "Fresh"}
+    assert write_id3_tags(bare, {"comment": "now fits in the padding"})
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+from PySide6.QtCore import QCoreApplication
+
+from gui.core import library_watcher, library_worker
+from gui.core.id3 import write_id3_tags
+from gui.core.library_watcher import LibraryWatcher
+from gui.core.tag_index import TagIndex
+
+MPEG_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+def _song(path: Path, title: str) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(MPEG_FRAME * 4)
+    write_id3_tags(path, {"title": title})
+    return path
+
+
+def _wait(condition, timeout: float = 10.0):
+    app = QCoreApplication.instance()
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "watcher did not settle"
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def _settle(watcher: LibraryWatcher, *dirs: Path):
+    """Report ``dirs`` as changed (as inotify would) and wait for the rescan."""
+    for d in dirs:
+        watcher._mark_dirty(str(d))
+    watcher._flush_dirty()
+    _wait(lambda: watcher._rescan_worker is None and not watcher._rescan_dirs)
+
+
+def _titles(watcher: LibraryWatcher, exclude_blocked: bool = True) -> list[str]:
+    return [s["title"] for s in watcher.songs(exclude_blocked)]
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    QCoreApplication.instance() or QCoreApplication([])
+    index = TagIndex(tmp_path / "index.sqlite3")
+    monkeypatch.setattr(library_worker, "get_tag_index", lambda: index)
+    monkeypatch.setattr(library_watcher, "get_tag_index", lambda: index)
+    root = tmp_path / "music"
+    _song(root / "lofi" / "a.mp3", "A")
+    watcher = LibraryWatcher(root, tmp_path / "downloads", poll_seconds=0)
+    watcher.start()
+    _wait(lambda: watcher.ready)
+    yield watcher, root
+    watcher.stop()
+
+
+def test_create_modify_and_delete(library):
+    watcher, root = library
+    lofi = root / "lofi"
+    _song(lofi / "b.mp3", "B")
+    _settle(watcher, lofi)
+    assert _titles(watcher) == ["A", "B"]
+
+    write_id3_tags(lofi / "a.mp3", {"title": "A (remaster)"})
+    _settle(watcher, lofi)
+    assert _titles(watcher) == ["A (remaster)", "B"]
+
+    (lofi / "b.mp3").unlink()
+    _settle(watcher, lofi)
+    assert _titles(watcher) == ["A (remaster)"]
+    assert library_worker.get_tag_index().get(lofi / "b.mp3") is None
+
+
+def test_album_moved_in_and_out(library, tmp_path):
+    watcher, root = library
+    album = tmp_path / "elsewhere" / "Night Drive"
+    _song(album / "one.mp3", "One")
+    _song(album / "disc 2" / "two.mp3", "Two")
+
+    os.rename(album, root / "lofi" / "Night Drive")
+    _settle(watcher, root / "lofi")
+    assert sorted(_titles(watcher)) == ["A", "One", "Two"]
+
+    os.rename(root / "lofi" / "Night Drive", album)
+    _settle(watcher, root / "lofi")
+    assert _titles(watcher) == ["A"]
+    index = library_worker.get_tag_index()
+    assert index.paths_under(root / "lofi" / "Night Drive") == []
+
+
+def test_blocked_marker_toggles_channel(library):
+    watcher, root = library
+    lofi = root / "lofi"
+    (lofi / ".blocked").touch()
+    _settle(watcher, lofi)
+    assert _titles(watcher) == []
+    assert _titles(watcher, exclude_blocked=False) == ["A"]
+
+    (lofi / ".blocked").unlink()
+    _settle(watcher, lofi)
+    assert _titles(watcher) == ["A"]
+
+
+def test_rescans_during_full_sync_are_replayed(library):
+    watcher, root = library
+    _song(root / "lofi" / "b.mp3", "B")
+    _settle(watcher, root / "lofi")
+    # A full sync that started before "B" arrived lands afterwards.
+    watcher._rescanned_during_sync = {str(root / "lofi")}
+    watcher._on_full_sync([])
+    assert _titles(watcher) == []
+    _settle(watcher)
+    assert _titles(watcher) == ["A", "B"]
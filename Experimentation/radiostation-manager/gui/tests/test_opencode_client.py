@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from gui.core import opencode_client
+from gui.core.opencode_client import (
+    OpenCodeCall,
+    OpenCodeError,
+    OpenCodeJob,
+    OpenCodeSignals,
+    OpenCodeTask,
+    _generate,
+    model_attempts,
+)
+
+FAKE_OPENCODE = """#!{python}
+import json, os, sys, time
+args = sys.argv[1:]
+model = args[args.index("-m") + 1]
+mode = os.environ.get("FAKE_OPENCODE_MODE", "ok")
+if mode == "hang":
+    time.sleep(30)
+if mode == "fail":
+    sys.stderr.write("provider exploded")
+    sys.exit(3)
+session = args[args.index("--session") + 1] if "--session" in args else "ses_1"
+def emit(kind, text):
+    part = {{"text": text}}
+    print(json.dumps({{"type": kind, "sessionID": session, "part": part}}), flush=True)
+emit("reasoning", "<think>pondering</think>")
+if not (mode == "empty-primary" and model == "primary"):
+    emit("text", "<think>x</think>A calm song about rain.")
+"""
+
+
+@pytest.fixture
+def fake_opencode(tmp_path, monkeypatch):
+    script = tmp_path / "opencode"
+    script.write_text(FAKE_OPENCODE.format(python=sys.executable))
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    return monkeypatch
+
+
+def _job(tmp_path, model: str = "primary") -> OpenCodeJob:
+    return OpenCodeJob("Write it", tmp_path, model, "high")
+
+
+def test_generate_streams_answer_and_session(fake_opencode, tmp_path):
+    signals = OpenCodeSignals()
+    reasoning = []
+    signals.reasoning_update.connect(reasoning.append)
+    answer, session = _generate(OpenCodeCall(_job(tmp_path)), signals)
+    assert answer == "A calm song about rain."
+    assert session == "ses_1"
+    assert reasoning == ["pondering"]
+
+
+def test_failed_run_reports_stderr(fake_opencode, tmp_path):
+    fake_opencode.setenv("FAKE_OPENCODE_MODE", "fail")
+    with pytest.raises(OpenCodeError, match="provider exploded"):
+        list(OpenCodeCall(_job(tmp_path)).lines())
+
+
+def test_cancel_unblocks_a_silent_process(fake_opencode, tmp_path):
+    fake_opencode.setenv("FAKE_OPENCODE_MODE", "hang")
+    call = OpenCodeCall(_job(tmp_path))
+    threading.Timer(0.3, call.cancel).start()
+    start = time.monotonic()
+    assert list(call.lines()) == []
+    assert time.monotonic() - start < 5
+
+
+def test_task_falls_back_after_empty_answers(fake_opencode, tmp_path):
+    fake_opencode.setenv("FAKE_OPENCODE_MODE", "empty-primary")
+    task = OpenCodeTask(
+        "Write it", tmp_path, [("primary", "high"), ("fallback", "max")]
+    )
+    failures, drafts = [], []
+    task.signals.attempt_failed.connect(lambda *a: failures.append(a))
+    task.signals.finished.connect(drafts.append)
+    task.run()
+    assert failures == [(1, "primary", "OpenCode returned an empty answer")]
+    assert drafts == ["A calm song about rain."]
+    assert task.session_id == "ses_1"
+
+
+def test_model_attempts_end_with_fallback(monkeypatch):
+    config = SimpleNamespace(
+        opencode_model="main",
+        opencode_variant="high",
+        opencode_fallback_model="backup",
+        opencode_fallback_variant="max",
+        max_opencode_attempts=3,
+    )
+    monkeypatch.setattr(opencode_client, "get_config", lambda: config)
+    assert model_attempts() == [("main", "high"), ("main", "high"), ("backup", "max")]
+    assert model_attempts("other", "low")[0] == ("other", "low")
+    config.max_opencode_attempts = 1
+    assert model_attempts() == [("main", "high")]
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import json
+
+from gui.core.opencode_events import (
+    ErrorEvent,
+    OpenCodeEventParser,
+    ReasoningDelta,
+    SessionStarted,
+    StepFinish,
+    TextDelta,
+    ToolCall,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _line(kind: str, **part) -> str:
+    return json.dumps({"type": kind, "sessionID": "ses_9", "part": part}) + "\n"
+
+
+def test_parser_dispatches_typed_deltas_from_chunks():
+    clock = FakeClock()
+    parser = OpenCodeEventParser(clock)
+    events = []
+    parser.subscribe(events.append)
+    texts = []
+    parser.subscribe(lambda e: texts.append(e.delta), TextDelta)
+
+    stream = (
+        _line("reasoning", id="r1", text="<think>Rain, harbor")
+        + _line("reasoning", id="r1", text="<think>Rain, harbor, night</think>")
+        + _line("tool_use", id="t1", tool="read", state={"status": "completed"})
+        + _line("text", id="p1", text="<think>hmm</think>A calm")
+        + _line("text", id="p1", text="<think>hmm</think>A calm song.")
+        + _line("step_finish", reason="stop", tokens={"output": 40, "reasoning": 60})
+        + "not json\n"
+    )
+    clock.now = 102.5  # first token arrives 2.5s after the start
+    for i in range(0, len(stream), 7):  # split mid-line and mid-tag
+        parser.feed(stream[i : i + 7])
+    parser.close()
+
+    assert isinstance(events[0], SessionStarted)
+    assert [type(e) for e in events[1:]] == [
+        ReasoningDelta,
+        ReasoningDelta,
+        ToolCall,
+        TextDelta,
+        TextDelta,
+        StepFinish,
+    ]
+    assert events[2].delta == ", night</think>"
+    assert texts == ["A calm", " song."]
+    assert parser.answer == "A calm song."
+    assert parser.session_id == "ses_9"
+    assert parser.reasoning_tail() == "Rain, harbor, night"
+
+    stats = parser.snapshot()
+    assert stats.time_to_first_token == 2.5
+    assert stats.tokens == 100  # reported counts replace the estimate
+
+
+def test_think_blocks_split_across_updates_stay_hidden():
+    parser = OpenCodeEventParser()
+    for delta in ("Hi <th", "ink>secret</thi", "nk> there", " <", "3"):
+        parser.feed(_line("text", id="p", delta=delta))
+    assert parser.answer == "Hi  there <3"
+
+
+def test_restarted_part_and_errors():
+    parser = OpenCodeEventParser()
+    errors = []
+    parser.subscribe(lambda e: errors.append(e.message), ErrorEvent)
+    parser.feed(_line("text", id="p", text="First try"))
+    parser.feed(_line("text", id="p", text="Second"))
+    parser.feed(
+        json.dumps({"type": "error", "error": {"data": {"message": "rate limit"}}})
+        + "\n"
+    )
+    assert parser.answer == "Second"
+    assert errors == ["rate limit"]
+
+
+def test_error_payloads_of_any_shape():
+    parser = OpenCodeEventParser()
+    errors = []
+    parser.subscribe(lambda e: errors.append(e.message), ErrorEvent)
+    for error in (
+        "socket hang up",
+        {"name": "APIError", "data": "model not loaded"},
+        {"name": "APIError", "data": None},
+        None,
+    ):
+        parser.feed(json.dumps({"type": "error", "error": error}) + "\n")
+    assert errors == [
+        "socket hang up",
+        "model not loaded",
+        "APIError",
+        "OpenCode reported an error",
+    ]
+
+
+def test_close_releases_a_trailing_partial_tag():
+    parser = OpenCodeEventParser()
+    deltas = []
+    parser.subscribe(lambda e: deltas.append(e.delta), TextDelta)
+    parser.feed(_line("text", id="p", delta="Stay close <"))
+    assert parser.answer == "Stay close"
+    parser.close()
+    assert deltas == ["Stay close ", "<"]
+    assert parser.answer == "Stay close <"
+
+
+def test_malformed_parts_are_skipped_without_ending_the_stream():
+    parser = OpenCodeEventParser()
+    events = []
+    parser.subscribe(events.append)
+    for line in (
+        {"type": "text", "part": "not a part"},
+        {"type": "tool_use", "part": ["read"]},
+        {"type": "tool_use", "part": {"id": "t", "tool": "read", "state": "done"}},
+        {"type": "text", "part": {"id": "p", "text": 42}},
+        {
+            "type": "step_finish",
+            "part": {"reason": "stop", "tokens": {"output": "many"}, "cost": "?"},
+        },
+        {"type": "step_finish", "part": {"tokens": "none"}},
+    ):
+        parser.feed(json.dumps(line) + "\n")
+    parser.feed(_line("text", id="p", text="Still here."))
+    assert events[0] == ToolCall("t", "read", "", "")
+    assert events[1] == StepFinish("stop")
+    assert events[2] == StepFinish("")
+    assert parser.answer == "Still here."
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from gui.core.related_songs import RelatedSongIndex, format_related_songs
+from gui.core.vibes import VibeAnalysis
+from gui.tests.helpers import ROOT, make_song, make_vibe
+
+
+def test_related_prefers_shared_words_then_vibes():
+    filler = [
+        make_song("misc", f"Track {i}", comment=f"Filler {i}.") for i in range(20)
+    ]
+    songs = filler + [
+        make_song(
+            "lofi",
+            "Rainy Harbor Night",
+            comment="Rain taps on the docks.",
+            lyrics="lanterns over the harbor",
+        ),
+        make_song("lofi", "Slow Tide", make_vibe(72, 0.02), comment="Tide rolls in."),
+        make_song(
+            "edm", "Festival Lights", make_vibe(150, 0.2), comment="Bright drops."
+        ),
+        make_song("lofi", "No Comment Yet"),
+        make_song("lofi", "Old", comment="Made with Suno"),
+    ]
+    index = RelatedSongIndex(songs, ROOT)
+    assert len(index) == 23  # uncommented and outdated songs are skipped
+
+    target = make_song("lofi", "Harbor Lanterns", make_vibe(70, 0.025))
+    titles = [s.title for s in index.related(target, limit=3)]
+    assert titles == ["Rainy Harbor Night", "Slow Tide", "Festival Lights"]
+
+    # A fresh analysis overrides the (missing) cached vibe.
+    bare = make_song("edm", "Untitled")
+    fast = VibeAnalysis(tempo=152, rms_mean=0.21)
+    assert index.related(bare, limit=1, vibe=fast)[0].title == "Festival Lights"
+    assert index.related(songs[20], limit=50)[0].path != songs[20].path
+
+
+def test_format_related_songs_truncates_comments():
+    song = make_song("lofi", "Dawn", comment="word " * 100, vibe_summary="slow tempo")
+    line = format_related_songs([song], max_length=20)
+    assert line == "Dawn : slow tempo : Theme=unknown theme : word word word word..."
+
+
+def test_query_term_cut_from_every_song_is_ignored():
+    words = [f"zephyr{i:02d}" for i in range(60)]
+    songs = [
+        make_song("lofi", "Wordy", comment="Many words.", lyrics=" ".join(words)),
+        make_song("lofi", "Quiet", comment="Few words.", lyrics="hush"),
+    ]
+    index = RelatedSongIndex(songs, ROOT)
+    target = make_song("lofi", "New", lyrics=words[-1])  # never made the top terms
+    assert [s.title for s in index.related(target, limit=2)] == ["Quiet", "Wordy"]
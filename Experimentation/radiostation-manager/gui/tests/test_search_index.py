@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from gui.core.search_index import SearchIndex, parse_query
+from gui.core.song import Song
+
+ROOT = Path("/music")
+
+
+def _index() -> SearchIndex:
+    index = SearchIndex(ROOT)
+    index.build(
+        [
+            Song(path=ROOT / "lofi" / "rainy-day.mp3", title="Rainy Day"),
+            Song(
+                path=ROOT / "chill" / "night-drive.mp3",
+                title="Night Drive",
+                comment="Rain on the windshield and a slow bassline.",
+            ),
+            Song(
+                path=ROOT / "lofi" / "study.mp3",
+                title="Study Loop",
+                vibe_summary="Warm piano, soft rain.",
+            ),
+            Song(path=ROOT / "vibes" / "sunrise.mp3", title="Sunrise"),
+        ]
+    )
+    return index
+
+
+def test_parse_query_splits_field_filters():
+    assert parse_query("Channel:LoFi rain-drops title:") == (
+        ["rain", "drops"],
+        [("channel", "lofi")],
+    )
+    assert parse_query("nope:thing") == (["nope", "thing"], [])
+
+
+def test_search_ranks_by_field_and_matches_prefixes():
+    index = _index()
+    songs, total = index.search("rain")
+    assert total == 3
+    assert [s.title for s in songs] == ["Rainy Day", "Night Drive", "Study Loop"]
+
+    songs, total = index.search("rai")
+    assert total == 3
+    assert songs[0].title == "Rainy Day"
+
+    songs, _ = index.search("rain pia")
+    assert [s.title for s in songs] == ["Study Loop"]
+    assert index.search("rain thunder") == ([], 0)
+
+
+def test_search_field_filters_and_limit():
+    index = _index()
+    songs, total = index.search("channel:lofi rain")
+    assert total == 2
+    assert {s.title for s in songs} == {"Rainy Day", "Study Loop"}
+    assert index.search("vibe:rain")[0][0].title == "Study Loop"
+
+    songs, total = index.search("channel:lofi", limit=1)
+    assert total == 2
+    assert [s.title for s in songs] == ["Rainy Day"]
+
+
+def test_add_replaces_and_remove_drops_tokens():
+    index = _index()
+    path = ROOT / "vibes" / "sunrise.mp3"
+    index.add(Song(path=path, title="Sunrise", comment="Gentle morning rain."))
+    assert len(index) == 4
+    assert index.search("morning")[1] == 1
+
+    index.remove(path)
+    assert len(index) == 3
+    assert index.search("sunrise") == ([], 0)
+    assert index.search("morning") == ([], 0)
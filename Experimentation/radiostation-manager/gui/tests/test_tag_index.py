@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+from gui.core.metadata import LibraryEntry, library_basenames, walk_library
+from gui.core.song import Song
+from gui.core.tag_index import TagIndex
+
+
+def _make_library(root: Path, count: int) -> list[Path]:
+    channel = root / "lofi"
+    channel.mkdir(parents=True)
+    paths = []
+    for i in range(count):
+        p = channel / f"song-{i}.mp3"
+        p.write_bytes(b"\x00" * (i + 1))
+        paths.append(p)
+    return paths
+
+
+def _entries(paths: list[Path]) -> list[LibraryEntry]:
+    return [LibraryEntry.from_path(p) for p in paths]
+
+
+def test_sync_only_rereads_changed_files(tmp_path):
+    paths = _make_library(tmp_path / "music", 4)
+    probed: list[Path] = []
+
+    def reader(p: Path) -> Song:
+        probed.append(p)
+        return Song(path=p, title=p.stem.upper(), comment=f"about {p.stem}")
+
+    index = TagIndex(tmp_path / "index.sqlite3")
+    first = index.sync(_entries(paths), reader=reader)
+    assert first is not None
+    assert [s.title for s in first] == [p.stem.upper() for p in paths]
+    assert len(probed) == 4
+
+    probed.clear()
+    second = index.sync(_entries(paths), reader=reader)
+    assert second is not None
+    assert probed == []
+    assert [s.comment for s in second] == [s.comment for s in first]
+
+    paths[1].write_bytes(b"changed contents")
+    third = index.sync(_entries(paths), reader=reader)
+    assert third is not None
+    assert probed == [paths[1]]
+
+
+def test_record_updates_row_and_prune_drops_deleted(tmp_path):
+    paths = _make_library(tmp_path / "music", 2)
+    index = TagIndex(tmp_path / "index.sqlite3")
+    index.sync(_entries(paths), reader=lambda p: Song(path=p, title=p.stem))
+
+    song = Song(path=paths[0], title="New Title", vibe_summary="warm tone")
+    paths[0].write_bytes(b"rewritten by ffmpeg")
+    os.utime(paths[0], (1, 1))
+    index.record(song)
+
+    def fail_reader(p: Path) -> Song:
+        raise AssertionError(f"unexpected probe of {p}")
+
+    songs = index.sync(_entries(paths), reader=fail_reader)
+    assert songs is not None
+    assert songs[0].title == "New Title"
+    assert songs[0].vibe_summary == "warm tone"
+
+    paths[1].unlink()
+    index.sync(_entries([paths[0]]), reader=fail_reader)
+    assert index.get(paths[1]) is None
+    assert len(index) == 1
+
+
+def test_change_listeners_see_syncs_and_removals(tmp_path):
+    paths = _make_library(tmp_path / "music", 3)
+    index = TagIndex(tmp_path / "index.sqlite3")
+    changes: list[tuple[list[str], list[Path]]] = []
+    index.add_change_listener(
+        lambda updated, removed: changes.append(
+            ([s.title for s in updated], removed)
+        )
+    )
+    index.sync(_entries(paths), reader=lambda p: Song(path=p, title=p.stem))
+    assert changes == [([p.stem for p in paths], [])]
+    assert index.paths_under(tmp_path / "music") == paths
+    assert index.paths_under(tmp_path / "mus") == []
+
+    changes.clear()
+    paths[1].unlink()
+    index.sync(_entries([paths[0], paths[2]]), reader=lambda p: Song(path=p))
+    index.remove(paths[2])
+    assert changes == [([], [paths[1]]), ([], [paths[2]])]
+
+
+def test_sync_cancellation_keeps_partial_progress(tmp_path):
+    paths = _make_library(tmp_path / "music", 3)
+    index = TagIndex(tmp_path / "index.sqlite3")
+    probed: list[Path] = []
+    gate = threading.Event()
+
+    def reader(p: Path) -> Song:
+        if p == paths[2]:
+            gate.wait(5)
+        probed.append(p)
+        return Song(path=p, title=p.stem)
+
+    try:
+        result = index.sync(
+            _entries(paths), reader=reader, is_cancelled=lambda: len(probed) >= 2
+        )
+    finally:
+        gate.set()
+    assert result is None
+    assert index.get(paths[0]) is not None
+    assert index.get(paths[2]) is None
+
+
+def test_warm_sync_checks_cancellation_per_batch(tmp_path):
+    paths = _make_library(tmp_path / "music", 5)
+    index = TagIndex(tmp_path / "index.sqlite3")
+    assert index.sync(_entries(paths)) is not None
+
+    batches = []
+    result = index.sync(
+        _entries(paths),
+        on_batch=batches.append,
+        batch_size=2,
+        is_cancelled=lambda: len(batches) >= 1,
+    )
+    assert result is None
+    assert [len(b) for b in batches] == [2]
+
+
+def test_parallel_sync_batches_in_path_order(tmp_path):
+    paths = _make_library(tmp_path / "music", 23)
+    index = TagIndex(tmp_path / "index.sqlite3")
+    batches: list[list[Song]] = []
+
+    songs = index.sync(
+        _entries(paths),
+        reader=lambda p: Song(path=p, title=p.stem),
+        workers=4,
+        on_batch=batches.append,
+        batch_size=10,
+    )
+
+    assert songs is not None
+    assert [s.path for s in songs] == paths
+    assert [len(b) for b in batches] == [10, 10, 3]
+    assert [s.path for b in batches for s in b] == paths
+
+
+def test_walk_library_single_pass(tmp_path):
+    root = tmp_path / "music"
+    (root / "lofi").mkdir(parents=True)
+    (root / "chill" / "nested").mkdir(parents=True)
+    (root / "blocked").mkdir()
+    (root / "lofi" / "a.mp3").write_bytes(b"12345")
+    (root / "lofi" / "B.MP3").write_bytes(b"1")
+    (root / "lofi" / "notes.txt").write_text("x")
+    (root / "chill" / "nested" / "c.Mp3").write_bytes(b"")
+    (root / "blocked" / "d.mp3").write_bytes(b"")
+    (root / "blocked" / ".blocked").touch()
+
+    entries = walk_library(root, exclude_blocked=True)
+    assert [e.path.relative_to(root).as_posix() for e in entries] == [
+        "chill/nested/c.Mp3",
+        "lofi/B.MP3",
+        "lofi/a.mp3",
+    ]
+    assert entries[2].size == 5
+    assert entries[2].mtime_ns == (root / "lofi" / "a.mp3").stat().st_mtime_ns
+    assert len(walk_library(root)) == 4
+    assert library_basenames(root) == {"a.mp3", "b.mp3", "c.mp3", "d.mp3"}
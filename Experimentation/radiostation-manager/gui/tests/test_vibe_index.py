@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from gui.core.metadata import LibraryEntry
+from gui.core.song import Song
+from gui.core.tag_index import TagIndex
+from gui.core.vibe_index import VibeIndex, vibe_features
+from gui.core.vibes import VibeAnalysis
+from gui.tests.helpers import ROOT, make_song, make_vibe
+
+
+def test_vibe_features_needs_numeric_values():
+    assert vibe_features(VibeAnalysis(tempo=90)) is None
+    # Fifths apart sit next to each other on the key circle.
+    c, g, f_sharp = (
+        vibe_features(make_vibe(90, 0.1, k))[4:6] for k in "C G F#".split()
+    )
+    assert ((c - g) ** 2).sum() < ((c - f_sharp) ** 2).sum()
+
+
+def test_nearest_tracks_adds_updates_and_removes():
+    index = VibeIndex()
+    index.build(
+        [
+            make_song("lofi", "Slow", make_vibe(70, 0.02)),
+            make_song("lofi", "Slower", make_vibe(65, 0.03)),
+            make_song("edm", "Fast", make_vibe(150, 0.2)),
+            make_song("edm", "No Vibes"),
+        ]
+    )
+    assert len(index) == 3
+
+    slow = make_song("lofi", "Slow", make_vibe(70, 0.02))
+    titles = [s.title for s, _ in index.similar(slow, k=5)]
+    assert titles == ["Slower", "Fast"]
+
+    for i in range(100):
+        index.add(make_song("edm", f"Banger {i}", make_vibe(140 + i % 10, 0.18)))
+    assert len(index) == 103
+    index.add(make_song("lofi", "Slower"))  # vibes cleared: drops out
+    index.remove(ROOT / "edm" / "Fast.mp3")
+    assert len(index) == 101
+    assert ROOT / "lofi" / "Slower.mp3" not in index
+    assert index.similar(slow, k=1)[0][0].title.startswith("Banger")
+
+
+
+def test_follows_tag_index_writes_rescans_and_deletes(tmp_path):
+    tags = TagIndex(tmp_path / "index.sqlite3")
+    kept, gone = tmp_path / "kept.mp3", tmp_path / "gone.mp3"
+    for path in (kept, gone):
+        path.write_bytes(b"\x00")
+    tags.put(Song(path=kept, vibe_analysis=make_vibe(70, 0.02).to_json()), 1, 1)
+    index = VibeIndex()
+    index.follow(tags)
+    assert len(index) == 1
+
+    # A rescan picking up a file moved in reports it like a tag write does.
+    fast = make_vibe(90, 0.1).to_json()
+    tags.sync(
+        [LibraryEntry(gone, 1, 1)],
+        reader=lambda p: Song(path=p, vibe_analysis=fast),
+        prune=False,
+    )
+    assert gone in index
+
+    gone.unlink()
+    tags.record(Song(path=gone, vibe_analysis=fast))
+    assert gone not in index  # a vanished file is not re-inserted
+    tags.remove(kept)
+    assert len(index) == 0
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from gui.core.vibe_journal import ThroughputMeter, VibeJobJournal, format_eta
+
+SONGS = [Path(f"/music/lofi/{name}.mp3") for name in ("a", "b", "c", "d")]
+
+
+def test_journal_resumes_after_reload(tmp_path):
+    path = tmp_path / "vibe_job.jsonl"
+    journal = VibeJobJournal(path, max_retries=2, backoff_seconds=10)
+    journal.start(SONGS, preview=True)
+    journal.mark_done(SONGS[0])
+    assert journal.mark_failed(SONGS[1], "decoder crashed") == 10
+
+    with open(path, "a") as f:
+        f.write('{"op": "done", "pa')  # torn write from a crash
+
+    reloaded = VibeJobJournal(path, max_retries=2, backoff_seconds=10)
+    assert reloaded.preview is True
+    assert reloaded.total == 4
+    assert reloaded.done_count == 1
+    pending = reloaded.pending()
+    assert [p for p, _ in pending] == SONGS[1:]
+    assert pending[0][1] > 0
+    assert pending[1][1] == 0.0
+    assert reloaded.resumable
+
+
+def test_journal_backoff_then_gives_up(tmp_path):
+    journal = VibeJobJournal(tmp_path / "j.jsonl", max_retries=2, backoff_seconds=5)
+    journal.start(SONGS[:2])
+    assert journal.mark_failed(SONGS[0], "boom") == 5
+    assert journal.mark_failed(SONGS[0], "boom") == 10
+    assert journal.mark_failed(SONGS[0], "still boom") is None
+    assert journal.failed() == {SONGS[0]: "still boom"}
+    assert [p for p, _ in journal.pending()] == [SONGS[1]]
+
+    journal.mark_done(SONGS[1])
+    assert not journal.resumable
+    journal.finish()
+    assert not (tmp_path / "j.jsonl").exists()
+    assert VibeJobJournal(tmp_path / "j.jsonl").total == 0
+
+
+def test_scheduled_journal_batches_records_until_flushed(tmp_path):
+    path = tmp_path / "j.jsonl"
+    flushes = []
+    journal = VibeJobJournal(path, schedule=flushes.append)
+    journal.start(SONGS)
+    journal.mark_done(SONGS[0])
+    journal.mark_failed(SONGS[1], "boom")
+    assert journal.done_count == 1
+    assert not path.exists()
+    assert len(flushes) == 1  # one flush covers every buffered record
+
+    flushes.pop()()
+    reloaded = VibeJobJournal(path)
+    assert reloaded.done_count == 1
+    assert [p for p, _ in reloaded.pending()] == SONGS[1:]
+
+    journal.finish()
+    flushes.pop()()
+    assert not path.exists()
+
+
+def test_journal_ignores_songs_outside_the_run(tmp_path):
+    journal = VibeJobJournal(tmp_path / "j.jsonl")
+    journal.start(SONGS[:2])
+    assert SONGS[0] in journal
+    assert SONGS[3] not in journal
+    journal.mark_done(SONGS[3])  # late write from a cancelled run
+    journal.mark_done(SONGS[0])
+    assert journal.done_count == 1
+
+
+def test_throughput_meter_and_eta():
+    meter = ThroughputMeter(window=10, started=0.0)
+    assert meter.eta_seconds(5) is None
+    meter.tick(now=30.0)
+    assert meter.per_minute() == 2.0
+    for t in (60.0, 90.0, 120.0):
+        meter.tick(now=t)
+    assert meter.per_minute() == 2.0
+    assert meter.eta_seconds(10) == 300.0
+    assert format_eta(300.0) == "5m 00s"
+    assert format_eta(3 * 3600 + 120) == "3h 02m"
+    assert format_eta(None) == "--"
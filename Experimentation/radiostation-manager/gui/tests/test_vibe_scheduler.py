@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from gui.core import analysis_cache
+from gui.core.analysis_cache import audio_fingerprint
+from gui.core.id3 import write_id3_tags
+from gui.core.vibe_scheduler import (
+    AdaptiveConcurrency,
+    available_memory,
+    order_by_size,
+    stale_vibe_songs,
+)
+from gui.core.vibes import (
+    STALE_EXPIRED,
+    STALE_FILE_CHANGED,
+    STALE_MISSING,
+    VIBE_CACHE_SCHEMA,
+    VibeAnalysis,
+)
+
+GIB = 1024**3
+MPEG_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+def test_fixed_worker_count_is_honoured():
+    sched = AdaptiveConcurrency(configured=3, cpus=8)
+    assert sched.current == 3
+    assert sched.update(running=3, load=20.0, mem_available=0) == 3
+
+
+def test_auto_follows_load_and_memory():
+    sched = AdaptiveConcurrency(configured=0, cpus=8, worker_bytes=GIB)
+    assert sched.current == 4
+
+    # Idle machine: grow one step at a time toward all cores.
+    limits = [sched.update(running=sched.current, load=float(sched.current))]
+    for _ in range(5):
+        limits.append(sched.update(running=sched.current, load=float(sched.current)))
+    assert limits == [5, 6, 7, 8, 8, 8]
+
+    # Another program takes five cores: back off toward three.
+    assert sched.update(running=8, load=13.0) == 7
+    # Only 1 GiB free beyond our own workers caps the limit hard.
+    sched.current = 4
+    assert sched.update(running=2, load=2.0, mem_available=GIB) == 3
+    assert sched.update(running=0, load=None, mem_available=0) == 2
+    assert sched.update(running=0, load=None, mem_available=0) == 1
+    assert sched.update(running=0, load=None, mem_available=0) == 1
+
+
+def test_available_memory_and_size_order(tmp_path):
+    meminfo = tmp_path / "meminfo"
+    meminfo.write_text("MemTotal: 8000 kB\nMemAvailable: 2048 kB\n")
+    assert available_memory(meminfo) == 2048 * 1024
+    assert available_memory(tmp_path / "missing") is None
+
+    small, big = tmp_path / "small.mp3", tmp_path / "big.mp3"
+    small.write_bytes(b"x" * 10)
+    big.write_bytes(b"x" * 1000)
+    gone = tmp_path / "gone.mp3"
+    assert order_by_size([small, gone, big]) == [big, small, gone]
+    # Sizes the scan already knows win; only unknown paths are stat-ed.
+    known = {small: 5000, gone: 100}
+    assert order_by_size([small, gone, big], size=known.get) == [small, big, gone]
+
+
+def test_stale_reason_orders_before_size(tmp_path):
+    paths = {}
+    for name, size in (("a", 10), ("b", 1000), ("c", 500), ("d", 20)):
+        paths[name] = tmp_path / f"{name}.mp3"
+        paths[name].write_bytes(b"x" * size)
+    reasons = {
+        paths["a"]: STALE_MISSING,
+        paths["b"]: STALE_EXPIRED,
+        paths["c"]: STALE_MISSING,
+        paths["d"]: STALE_FILE_CHANGED,
+    }
+    ordered = order_by_size(list(reasons), group=reasons.get)
+    assert [p.stem for p in ordered] == ["c", "a", "d", "b"]
+
+
+def test_comment_edit_keeps_vibes_fresh_but_new_audio_does_not(tmp_path):
+    song = tmp_path / "song.mp3"
+    song.write_bytes(MPEG_FRAME * 20)
+    record = {
+        "path": song,
+        "vibe_analysis": VibeAnalysis(tempo=90.0).to_json(),
+        "vibe_cached_at_epoch": "1000",
+        "vibe_cache_schema": VIBE_CACHE_SCHEMA,
+        "vibe_audio_hash": audio_fingerprint(song),
+    }
+    write_id3_tags(song, {"comment": "A new comment."})
+    # Newer than the vibes; taken from the scan, not stat.
+    record.update(mtime=5000.0, mtime_ns=song.stat().st_mtime_ns)
+    assert stale_vibe_songs([record], 0, now=6000.0) == []
+
+    song.write_bytes(MPEG_FRAME * 21)
+    assert stale_vibe_songs([record], 0, now=6000.0) == [(song, STALE_FILE_CHANGED)]
+    legacy = {**record, "vibe_audio_hash": ""}
+    song.write_bytes(MPEG_FRAME * 20)
+    assert stale_vibe_songs([legacy], 0, now=6000.0) == [(song, STALE_FILE_CHANGED)]
+
+
+def test_confirmed_tag_edit_is_not_hashed_again(tmp_path, monkeypatch):
+    song = tmp_path / "song.mp3"
+    song.write_bytes(MPEG_FRAME * 20)
+    record = {
+        "path": song,
+        "vibe_analysis": VibeAnalysis(tempo=90.0).to_json(),
+        "vibe_cached_at_epoch": "1000",
+        "vibe_cache_schema": VIBE_CACHE_SCHEMA,
+        "vibe_audio_hash": audio_fingerprint(song),
+    }
+    write_id3_tags(song, {"comment": "A new comment."})
+    mtime_ns = song.stat().st_mtime_ns
+    record.update(mtime=5000.0, mtime_ns=mtime_ns)
+
+    confirmed = []
+
+    def check() -> list:
+        return stale_vibe_songs(
+            [record], 0, now=6000.0, on_confirmed=lambda *c: confirmed.append(c)
+        )
+
+    assert check() == []
+    [(path, fingerprint)] = confirmed
+    assert path == song and fingerprint.endswith(f":{mtime_ns}")
+
+    def no_hashing(*args):
+        raise AssertionError("audio hashed again")
+
+    monkeypatch.setattr(analysis_cache, "audio_content_hash", no_hashing)
+    record["vibe_audio_hash"] = fingerprint
+    confirmed.clear()
+    assert check() == []
+    assert confirmed == []
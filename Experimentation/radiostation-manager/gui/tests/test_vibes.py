@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from gui.core.song import Song
+from gui.core.vibes import (
+    STALE_EXPIRED,
+    STALE_FILE_CHANGED,
+    STALE_MISSING,
+    STALE_PREVIEW,
+    STALE_SCHEMA,
+    VIBE_CACHE_SCHEMA,
+    VibeAnalysis,
+    parse_vibe_analysis,
+    vibe_cache_staleness,
+)
+
+LEGACY = (
+    "tempo=92.31 BPM; key=A minor (strength 0.81); rhythm_confidence=3.214; "
+    "duration=184.20s; onset_rate=2.15/s; rms_mean=0.0512; centroid_mean_hz=1450.77"
+)
+
+
+def test_json_round_trip_is_compact_and_typed():
+    analysis = VibeAnalysis.from_dict(
+        {
+            "tempo": 92.3141,
+            "key": "A",
+            "scale": "minor",
+            "strength": 0.8123,
+            "rms_mean": 0.051234,
+            "onset_rate": None,
+        }
+    )
+    text = analysis.to_json()
+    assert " " not in text
+    assert "onset_rate" not in text
+    decoded = VibeAnalysis.from_json(text)
+    assert decoded.tempo == 92.31
+    assert decoded.key_name == "A minor"
+    assert decoded.onset_rate is None
+    assert decoded.summary() == (
+        "steady tempo, balanced dynamics, key A minor (strength 0.81)"
+    )
+
+
+def test_legacy_v1_text_still_parses():
+    analysis = parse_vibe_analysis(LEGACY, "v1")
+    assert analysis is not None
+    assert analysis.tempo == 92.31
+    assert (analysis.key, analysis.scale, analysis.strength) == ("A", "minor", 0.81)
+    assert analysis.duration == 184.2
+    assert analysis.onset_rate == 2.15
+    assert analysis.centroid_mean_hz == 1450.77
+    assert analysis.describe() == LEGACY
+    assert analysis.summary() == (
+        "steady tempo, balanced dynamics, warm tone, key A minor (strength 0.81)"
+    )
+
+
+def test_song_vibe_property():
+    song = Song(path=Path("/m/a.mp3"))
+    assert song.vibe is None
+    song.vibe_analysis = VibeAnalysis(tempo=150.0).to_json()
+    song.vibe_cache_schema = VIBE_CACHE_SCHEMA
+    assert song.vibe == VibeAnalysis(tempo=150.0)
+    song.vibe_analysis = "{not json"
+    assert song.vibe is None
+
+
+def test_preview_flag_only_stored_when_set():
+    assert "preview" not in VibeAnalysis(tempo=100.0).to_json()
+    preview = VibeAnalysis.from_json(VibeAnalysis(tempo=100.0, preview=True).to_json())
+    assert preview.preview is True
+
+
+def test_vibe_cache_staleness_reasons_and_order():
+    record = VibeAnalysis(tempo=100.0).to_json()
+    preview = VibeAnalysis(tempo=100.0, preview=True).to_json()
+    now, day = 10_000_000.0, 86_400
+
+    def check(analysis, cached_at, schema=VIBE_CACHE_SCHEMA, mtime=0.0, **kw):
+        return vibe_cache_staleness(
+            analysis, str(cached_at), schema, mtime, now, 30 * day, **kw
+        )
+
+    assert check(record, now - day) is None
+    assert check("", "") == (STALE_MISSING, 0.0)
+    assert check(record, now - day, mtime=now)[0] == STALE_FILE_CHANGED
+    assert check(LEGACY, now - day, schema="v1")[0] == STALE_SCHEMA
+    assert check(preview, now - day)[0] == STALE_PREVIEW
+    assert check(preview, now - day, preview_ok=True) is None
+    assert check(record, now - 40 * day) == (STALE_EXPIRED, -40.0 * day)
+
+    keys = [check(record, now - 90 * day), check(record, now - 40 * day), check("", "")]
+    assert sorted(keys) == [keys[2], keys[0], keys[1]]
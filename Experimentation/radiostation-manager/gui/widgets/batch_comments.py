@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QListWidget,
+    QListWidgetItem,
+    QProgressBar,
+)
+
+from gui.core.comment_batch import (
+    FAILED,
+    GENERATING,
+    QUEUED,
+    READY,
+    WRITTEN,
+    BatchDraft,
+    CommentBatch,
+)
+from gui.core.prompts import PromptStore
+from gui.core.song import Song
+from gui.core.tag_writer import get_tag_writer
+from gui.widgets.components import make_header
+
+
+class BatchCommentsFlow(QWidget):
+    """Generates comments for many songs, then writes the accepted ones.
+
+    Drafts appear as they finish; checked rows are accepted. Writing hands
+    every accepted comment to the tag writer at once, in one background pass.
+    """
+
+    song_selected = Signal(Song)
+    back = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._prompts = PromptStore(Path("prompts.toml"), Path("prompts.base.toml"))
+        self._batch: CommentBatch | None = None
+        self._writing: set[str] = set()
+        self._write_failed = 0
+        self._writer = get_tag_writer()
+        self._writer.written.connect(self._on_written)
+        self._setup_ui()
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(16, 16, 16, 16)
+        layout.setSpacing(10)
+
+        header, _ = make_header("Batch Comments", self._on_back)
+        layout.addLayout(header)
+
+        self._status_label = QLabel()
+        self._status_label.setObjectName("dimLabel")
+        self._status_label.setWordWrap(True)
+        layout.addWidget(self._status_label)
+
+        self._progress = QProgressBar()
+        layout.addWidget(self._progress)
+
+        self._list = QListWidget()
+        self._list.setAlternatingRowColors(True)
+        self._list.setWordWrap(True)
+        self._list.itemChanged.connect(self._on_item_changed)
+        self._list.itemDoubleClicked.connect(self._on_double_click)
+        layout.addWidget(self._list)
+
+        hint = QLabel(
+            "Checked drafts are written. Double-click a song to edit it by hand."
+        )
+        hint.setObjectName("dimLabel")
+        layout.addWidget(hint)
+
+        btn_row = QHBoxLayout()
+        self._write_btn = QPushButton("Write Accepted")
+        self._write_btn.setObjectName("accentButton")
+        self._write_btn.clicked.connect(self._write_accepted)
+        btn_row.addWidget(self._write_btn)
+        accept_btn = QPushButton("Accept All Valid")
+        accept_btn.clicked.connect(lambda: self._set_all_accepted(True))
+        btn_row.addWidget(accept_btn)
+        reject_btn = QPushButton("Reject All")
+        reject_btn.clicked.connect(lambda: self._set_all_accepted(False))
+        btn_row.addWidget(reject_btn)
+        self._cancel_btn = QPushButton("Cancel")
+        self._cancel_btn.setObjectName("dangerButton")
+        self._cancel_btn.clicked.connect(self._cancel)
+        btn_row.addWidget(self._cancel_btn)
+        btn_row.addStretch()
+        layout.addLayout(btn_row)
+
+    def start(self, song_paths: list[Path]):
+        """Generate drafts for ``song_paths``, replacing any earlier batch."""
+        old, self._batch = self._batch, None
+        if old is not None:
+            old.cancel()
+            old.deleteLater()
+        self._prompts.load()
+        self._write_failed = 0
+        batch = CommentBatch(song_paths, self._prompts, parent=self)
+        batch.draft_updated.connect(self._on_draft_updated)
+        batch.finished.connect(self._on_batch_finished)
+        self._batch = batch
+
+        self._list.blockSignals(True)
+        self._list.clear()
+        for draft in batch.drafts:
+            item = QListWidgetItem()
+            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsUserCheckable)
+            self._list.addItem(item)
+            self._show_draft(item, draft)
+        self._list.blockSignals(False)
+        self._progress.setRange(0, len(batch.drafts))
+        self._progress.setValue(0)
+        self._progress.setVisible(True)
+        self._cancel_btn.setEnabled(True)
+        self._write_btn.setEnabled(False)
+        batch.start()
+        self._update_status()
+
+    def shutdown(self):
+        """Stop generating; accepted comments still go out with the writer."""
+        self._cancel()
+
+    def _show_draft(self, item: QListWidgetItem, draft: BatchDraft):
+        if draft.status == READY:
+            mark = "\u2713" if draft.check.ok else "\u2717"
+            text = f"{mark} {draft.title} \u2014 {draft.text}"
+            notes = draft.check.problems + draft.check.warnings
+            tip = ", ".join(notes) if notes else "Follows the comment rules"
+        elif draft.status == FAILED:
+            text = f"{draft.title} \u2014 failed: {draft.error[:150]}"
+            tip = draft.error
+        elif draft.status == WRITTEN:
+            text = f"\u2713 {draft.title} \u2014 written: {draft.text}"
+            tip = "Saved to the song's tags"
+        else:
+            text = f"{draft.title} \u2014 {draft.status}..."
+            tip = str(draft.path)
+        item.setText(text)
+        item.setToolTip(tip)
+        if draft.status == READY:
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            state = Qt.CheckState.Checked if draft.accepted else Qt.CheckState.Unchecked
+            item.setCheckState(state)
+        else:
+            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsUserCheckable)
+            item.setData(Qt.ItemDataRole.CheckStateRole, None)
+
+    def _on_draft_updated(self, index: int):
+        if self._batch is None or self.sender() is not self._batch:
+            return
+        item = self._list.item(index)
+        if item is not None:
+            self._list.blockSignals(True)
+            self._show_draft(item, self._batch.drafts[index])
+            self._list.blockSignals(False)
+        self._update_status()
+
+    def _on_item_changed(self, item: QListWidgetItem):
+        if self._batch is None:
+            return
+        draft = self._batch.drafts[self._list.row(item)]
+        if draft.status == READY:
+            draft.accepted = item.checkState() == Qt.CheckState.Checked
+            self._update_status()
+
+    def _set_all_accepted(self, accepted: bool):
+        if self._batch is None:
+            return
+        self._list.blockSignals(True)
+        for i, draft in enumerate(self._batch.drafts):
+            if draft.status == READY:
+                draft.accepted = accepted and draft.check.ok
+                self._show_draft(self._list.item(i), draft)
+        self._list.blockSignals(False)
+        self._update_status()
+
+    def _update_status(self):
+        batch = self._batch
+        if batch is None:
+            return
+        total = len(batch.drafts)
+        ready = batch.count(READY)
+        failed = batch.count(FAILED)
+        written = batch.count(WRITTEN)
+        self._progress.setValue(ready + failed + written)
+        parts = [f"{ready + written} of {total} drafted"]
+        if batch.running:
+            working = batch.count(GENERATING)
+            waiting = batch.count(QUEUED)
+            parts.append(f"{working} generating, {waiting} waiting")
+        parts.append(f"{len(batch.accepted())} accepted")
+        if failed:
+            parts.append(f"{failed} failed")
+        if written:
+            parts.append(f"{written} written")
+        if self._writing:
+            parts.append(f"writing {len(self._writing)}...")
+        self._status_label.setText(", ".join(parts))
+        self._write_btn.setEnabled(bool(batch.accepted()) and not self._writing)
+
+    def _on_batch_finished(self):
+        if self.sender() is not self._batch:
+            return
+        self._cancel_btn.setEnabled(False)
+        self._update_status()
+        parent_window = self.window()
+        if hasattr(parent_window, "show_toast"):
+            ready = self._batch.count(READY)
+            parent_window.show_toast(f"{ready} drafts ready for review", "info")
+
+    def _write_accepted(self):
+        if self._batch is None:
+            return
+        for draft in self._batch.accepted():
+            key = str(draft.path)
+            if key not in self._writing:
+                self._writing.add(key)
+                self._writer.enqueue(draft.path, {"comment": draft.text})
+        self._update_status()
+
+    def _on_written(self, song_key: str, ok: bool, error: str):
+        if song_key not in self._writing:
+            return
+        self._writing.discard(song_key)
+        batch = self._batch
+        for i, draft in enumerate(batch.drafts if batch else []):
+            if str(draft.path) == song_key and draft.status == READY:
+                if ok:
+                    draft.status = WRITTEN
+                else:
+                    draft.error = error
+                    self._write_failed += 1
+                self._list.blockSignals(True)
+                self._show_draft(self._list.item(i), draft)
+                self._list.blockSignals(False)
+        self._update_status()
+        if not self._writing:
+            parent_window = self.window()
+            if hasattr(parent_window, "show_toast"):
+                if self._write_failed:
+                    parent_window.show_toast(
+                        f"{self._write_failed} comments failed to save", "error"
+                    )
+                else:
+                    parent_window.show_toast("Accepted comments saved", "success")
+            self._write_failed = 0
+
+    def _on_double_click(self, item: QListWidgetItem):
+        if self._batch is None:
+            return
+        draft = self._batch.drafts[self._list.row(item)]
+        if draft.song is not None and draft.status != GENERATING:
+            self.song_selected.emit(draft.song)
+
+    def _cancel(self):
+        if self._batch is not None:
+            self._batch.cancel()
+        self._cancel_btn.setEnabled(False)
+
+    def _on_back(self):
+        self._cancel()
+        self.back.emit()
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import time
 from pathlib import Path
 
-from PySide6.QtCore import Signal, QThreadPool
+from PySide6.QtCore import Signal, QThreadPool, QTimer
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -17,12 +18,17 @@ from PySide6.QtWidgets import (
 )
 
 from gui.core.config import get_config
-from gui.core.metadata import (
-    scan_library,
-    read_song,
-    write_vibe_cache,
+from gui.core.library_worker import VibePlanWorker
+from gui.core.essentia_client import EssentiaWorker, get_essentia_pool
+from gui.core.tag_writer import get_tag_writer
+from gui.core.vibe_journal import ThroughputMeter, VibeJobJournal, format_eta
+from gui.core.vibe_scheduler import (
+    MAX_VIBE_WORKERS,
+    AdaptiveConcurrency,
+    available_memory,
+    system_load,
 )
-from gui.core.essentia_client import EssentiaWorker
+from gui.core.vibes import VIBE_CACHE_SCHEMA, VibeAnalysis
 from gui.widgets.components import make_header
 
 
@@ -32,13 +38,36 @@ class CacheVibesFlow(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self._config = get_config()
-        self._pool = QThreadPool.globalInstance()
+        # Own pool: its thread count is the analysis concurrency limit.
+        self._pool = QThreadPool(self)
+        self._concurrency = AdaptiveConcurrency(self._config.vibe_worker_count)
+        self._tune_timer = QTimer(self)
+        self._tune_timer.setInterval(5000)
+        self._tune_timer.timeout.connect(self._retune)
         self._total = 0
         self._completed = 0
         self._success = 0
         self._failed = 0
         self._running = False
+        self._timings: dict[str, dict] = {}
+        self._timing_totals: dict[str, float] = {}
+        self._scan_worker: VibePlanWorker | None = None
+        self._writer = get_tag_writer()
+        self._writer.written.connect(self._on_song_written)
+        # Journal records are flushed in batches on the writer thread.
+        self._journal = VibeJobJournal(
+            Path(self._config.vibe_job_journal_path).expanduser(),
+            max_retries=self._config.vibe_job_max_retries,
+            backoff_seconds=self._config.vibe_job_retry_backoff_seconds,
+            schedule=self._writer.call,
+        )
+        self._meter = ThroughputMeter()
+        self._inflight: set[str] = set()
+        # Bumped per dispatch, so retries scheduled by a cancelled run stay dead.
+        self._run_id = 0
+        self._preview_run = False
         self._setup_ui()
+        self._refresh_resume()
 
     def _setup_ui(self):
         layout = QVBoxLayout(self)
@@ -52,13 +81,23 @@ class CacheVibesFlow(QWidget):
         opt_layout = QVBoxLayout(options)
         self._include_blocked = QCheckBox("Include blocked channels")
         opt_layout.addWidget(self._include_blocked)
+        self._only_stale = QCheckBox("Skip songs whose cached vibes are still fresh")
+        self._only_stale.setChecked(True)
+        opt_layout.addWidget(self._only_stale)
+        self._preview = QCheckBox(
+            "Fast preview (45s excerpt, downsampled frame features)"
+        )
+        self._preview.setChecked(self._config.essentia_preview_mode)
+        opt_layout.addWidget(self._preview)
         worker_row = QHBoxLayout()
         worker_row.addWidget(QLabel("Parallel workers:"))
         self._worker_spin = QSpinBox()
-        self._worker_spin.setRange(1, 16)
-        self._worker_spin.setValue(
-            max(1, QThreadPool.globalInstance().maxThreadCount() // 2)
+        self._worker_spin.setRange(0, MAX_VIBE_WORKERS)
+        self._worker_spin.setSpecialValueText("Auto")
+        self._worker_spin.setToolTip(
+            "Auto sizes the pool from CPU load and free memory."
         )
+        self._worker_spin.setValue(max(0, self._config.vibe_worker_count))
         worker_row.addWidget(self._worker_spin)
         worker_row.addStretch()
         opt_layout.addLayout(worker_row)
@@ -82,6 +121,9 @@ class CacheVibesFlow(QWidget):
         self._start_btn.setObjectName("accentButton")
         self._start_btn.clicked.connect(self._start)
         btn_row.addWidget(self._start_btn)
+        self._resume_btn = QPushButton("Resume")
+        self._resume_btn.clicked.connect(self._resume)
+        btn_row.addWidget(self._resume_btn)
         self._cancel_btn = QPushButton("Cancel")
         self._cancel_btn.setObjectName("dangerButton")
         self._cancel_btn.clicked.connect(self._cancel)
@@ -101,71 +143,235 @@ class CacheVibesFlow(QWidget):
         self._completed = 0
         self._success = 0
         self._failed = 0
+        self._timings = {}
+        self._timing_totals = {}
 
         include = self._include_blocked.isChecked()
-        songs = scan_library(self._config.music_root, exclude_blocked=not include)
-        self._total = len(songs)
+        self._resume_btn.setVisible(False)
+        self._start_btn.setEnabled(False)
+        self._cancel_btn.setEnabled(True)
+        self._summary_label.clear()
+        self._status_label.setText("Checking cached vibes...")
+        self._scan_worker = VibePlanWorker(
+            self._config.music_root,
+            self._config.vibe_cache_max_age_seconds,
+            only_stale=self._only_stale.isChecked(),
+            preview_ok=self._preview.isChecked(),
+            exclude_blocked=not include,
+            workers=self._config.scan_worker_count,
+        )
+        self._scan_worker.planned.connect(self._on_vibes_planned)
+        self._scan_worker.error_occurred.connect(self._on_scan_failed)
+        self._scan_worker.start()
+
+    def _on_scan_failed(self, error: str):
+        self._running = False
+        self._start_btn.setEnabled(True)
+        self._cancel_btn.setEnabled(False)
+        self._status_label.setText(f"Library scan failed: {error}")
+
+    def _on_vibes_planned(
+        self, queue: list[Path], scanned: int, confirmed: list[tuple[Path, str]]
+    ):
+        # Tag edits whose audio was confirmed unchanged: stamp that, so the
+        # next run need not hash them again.
+        for path, fingerprint in confirmed:
+            self._writer.enqueue(path, {"vibe_audio_hash": fingerprint})
+        if not self._running:
+            return
+        fresh = scanned - len(queue)
+        self._total = len(queue)
         if self._total == 0:
-            QMessageBox.information(self, "No Songs", "No MP3 files found.")
+            self._running = False
+            self._start_btn.setEnabled(True)
+            self._cancel_btn.setEnabled(False)
+            if scanned:
+                self._status_label.setText(
+                    f"All {scanned} songs already have fresh vibes."
+                )
+            else:
+                self._status_label.clear()
+                QMessageBox.information(self, "No Songs", "No MP3 files found.")
             return
 
-        self._pool.setMaxThreadCount(self._worker_spin.value())
-        self._progress.setMaximum(self._total)
-        self._progress.setValue(0)
+        status = f"Analyzing {self._total} songs..."
+        if fresh:
+            status = f"Analyzing {self._total} songs ({fresh} already fresh)..."
+        self._status_label.setText(status)
+        self._preview_run = self._preview.isChecked()
+        self._journal.start(queue, preview=self._preview_run)
+        self._dispatch([(p, 0.0) for p in queue])
+
+    def _refresh_resume(self):
+        resumable = not self._running and self._journal.resumable
+        self._resume_btn.setVisible(resumable)
+        if resumable:
+            left = len(self._journal.pending())
+            self._resume_btn.setText(f"Resume ({left} left)")
+            if not self._status_label.text():
+                self._status_label.setText(
+                    f"An unfinished run has {left} of {self._journal.total} songs left."
+                )
+
+    def _resume(self):
+        pending = self._journal.pending()
+        if self._running or not pending:
+            return
+        self._running = True
+        self._total = self._journal.total
+        self._success = self._journal.done_count
+        self._failed = len(self._journal.failed())
+        self._completed = self._success + self._failed
+        self._timings = {}
+        self._timing_totals = {}
+        self._preview_run = self._journal.preview
         self._start_btn.setEnabled(False)
         self._cancel_btn.setEnabled(True)
-        self._status_label.setText(f"Analyzing {self._total} songs...")
-
-        for song_path in songs:
-            if not self._running:
-                break
-            worker = EssentiaWorker(
-                song_path=song_path,
-                uv_workdir=self._config.essentia_uv_workdir,
-                uv_package_spec=self._config.essentia_uv_package_spec,
-            )
-            worker.signals.finished.connect(self._on_song_done)
-            worker.signals.error_occurred.connect(self._on_song_failed)
-            self._pool.start(worker)
+        self._summary_label.clear()
+        self._status_label.setText(f"Resuming: {len(pending)} songs left...")
+        self._refresh_resume()
+        self._dispatch(pending)
 
-    def _on_song_done(self, song_key: str, result: str):
+    def _dispatch(self, jobs: list[tuple[Path, float]]):
+        self._concurrency = AdaptiveConcurrency(self._worker_spin.value())
+        self._apply_concurrency(self._concurrency.current)
+        if self._concurrency.auto:
+            self._tune_timer.start()
+        self._progress.setMaximum(self._total)
+        self._progress.setValue(self._completed)
+        self._meter = ThroughputMeter()
+        self._inflight = set()
+        self._run_id += 1
+        now = time.time()
+        for song_path, not_before in jobs:
+            if not_before > now:
+                self._schedule_retry(song_path, not_before - now)
+            else:
+                self._submit(song_path)
+
+    def _submit(self, song_path: Path):
         if not self._running:
             return
-        self._completed += 1
-        self._success += 1
-        self._progress.setValue(self._completed)
+        self._inflight.add(str(song_path))
+        worker = EssentiaWorker(
+            song_path=song_path,
+            uv_workdir=self._config.essentia_uv_workdir,
+            uv_package_spec=self._config.essentia_uv_package_spec,
+            preview=self._preview_run,
+        )
+        worker.signals.timings.connect(self._on_song_timings)
+        worker.signals.finished.connect(self._on_song_done)
+        worker.signals.error_occurred.connect(self._on_song_failed)
+        self._pool.start(worker)
 
-        parts = result.split("|", 1)
-        analysis = parts[0] if len(parts) > 0 else ""
-        summary = parts[1] if len(parts) > 1 else ""
+    def _schedule_retry(self, song_path: Path, delay: float):
+        key = str(song_path)
+        run_id = self._run_id
+        self._inflight.add(key)
 
-        song_path = Path(song_key)
-        song = read_song(song_path)
-        import time
+        def retry():
+            if self._running and run_id == self._run_id and key in self._inflight:
+                self._submit(song_path)
 
-        song.vibe_analysis = analysis
-        song.vibe_summary = summary
-        song.vibe_cached_at_epoch = str(int(time.time()))
-        song.vibe_cache_schema = "v1"
-        write_vibe_cache(song)
+        QTimer.singleShot(int(delay * 1000), self, retry)
 
-        self._detail_label.setText(f"Cached: {song_path.name}")
+    def _apply_concurrency(self, limit: int):
+        self._pool.setMaxThreadCount(limit)
+        get_essentia_pool(
+            self._config.essentia_uv_workdir, self._config.essentia_uv_package_spec
+        ).resize(limit)
+
+    def _retune(self):
+        if not self._running:
+            self._tune_timer.stop()
+            return
+        before = self._concurrency.current
+        limit = self._concurrency.update(
+            running=self._pool.activeThreadCount(),
+            load=system_load(),
+            mem_available=available_memory(),
+        )
+        if limit != before:
+            self._apply_concurrency(limit)
+
+    def _update_progress(self):
+        self._progress.setValue(self._completed)
+        rate = self._meter.per_minute()
+        eta = format_eta(self._meter.eta_seconds(self._total - self._completed))
         self._status_label.setText(
-            f"Progress: {self._completed}/{self._total} ({self._success} ok, {self._failed} fail)"
+            f"Progress: {self._completed}/{self._total} "
+            f"({self._success} ok, {self._failed} fail) "
+            f"\u2014 {rate:.1f} songs/min, ETA {eta}, "
+            f"{self._concurrency.current} workers"
         )
+
+    def _on_song_timings(self, song_key: str, timings: dict):
+        self._timings[song_key] = timings
+        for stage, seconds in timings.items():
+            self._timing_totals[stage] = self._timing_totals.get(stage, 0.0) + seconds
+
+    @staticmethod
+    def _format_timings(timings: dict) -> str:
+        return ", ".join(
+            f"{stage} {seconds:.2f}s"
+            for stage, seconds in timings.items()
+            if stage != "total"
+        )
+
+    def _on_song_done(self, song_key: str, analysis: VibeAnalysis):
+        if not self._running or song_key not in self._inflight:
+            return
+        # Stays in flight until the writer reports back; the GUI thread
+        # never waits on ffprobe/ffmpeg.
+        self._writer.enqueue(
+            Path(song_key),
+            {
+                "vibe_analysis": analysis.to_json(),
+                "vibe_summary": analysis.summary(),
+                "vibe_cached_at_epoch": str(int(time.time())),
+                "vibe_cache_schema": VIBE_CACHE_SCHEMA,
+            },
+        )
+        detail = f"Analyzed: {Path(song_key).name}"
+        timings = self._timings.pop(song_key, None)
+        if timings:
+            detail += f" ({self._format_timings(timings)})"
+        self._detail_label.setText(detail)
+
+    def _on_song_written(self, song_key: str, ok: bool, error: str):
+        song_path = Path(song_key)
+        if ok and song_path in self._journal:
+            self._journal.mark_done(song_path)
+        if not self._running or song_key not in self._inflight:
+            return
+        if not ok:
+            self._on_song_failed(song_key, f"tag write failed: {error}")
+            return
+        self._inflight.discard(song_key)
+        self._completed += 1
+        self._success += 1
+        self._meter.tick()
+        self._update_progress()
         if self._completed >= self._total:
             self._finish()
 
     def _on_song_failed(self, song_key: str, error: str):
-        if not self._running:
+        if not self._running or song_key not in self._inflight:
             return
+        name = Path(song_key).name
+        delay = self._journal.mark_failed(Path(song_key), error)
+        if delay is not None:
+            self._detail_label.setText(
+                f"Retrying {name} in {format_eta(delay)} \u2014 {error[:100]}"
+            )
+            self._schedule_retry(Path(song_key), delay)
+            return
+        self._inflight.discard(song_key)
         self._completed += 1
         self._failed += 1
-        self._progress.setValue(self._completed)
-        self._detail_label.setText(f"Failed: {Path(song_key).name} — {error[:100]}")
-        self._status_label.setText(
-            f"Progress: {self._completed}/{self._total} ({self._success} ok, {self._failed} fail)"
-        )
+        self._meter.tick()
+        self._detail_label.setText(f"Failed: {name} \u2014 {error[:100]}")
+        self._update_progress()
         if self._completed >= self._total:
             self._finish()
 
@@ -173,10 +379,16 @@ class CacheVibesFlow(QWidget):
         self._running = False
         self._start_btn.setEnabled(True)
         self._cancel_btn.setEnabled(False)
-        self._summary_label.setText(
+        summary = (
             f"Done! {self._success} cached, {self._failed} failed out of {self._total} total."
         )
-        self._pool.setMaxThreadCount(QThreadPool.globalInstance().maxThreadCount())
+        if self._success and self._timing_totals:
+            average = {k: v / self._success for k, v in self._timing_totals.items()}
+            summary += f"\nAverage per song: {self._format_timings(average)}."
+        self._summary_label.setText(summary)
+        self._journal.finish()
+        self._refresh_resume()
+        self._tune_timer.stop()
         parent_window = self.window()
         if hasattr(parent_window, "show_toast"):
             parent_window.show_toast(
@@ -185,7 +397,16 @@ class CacheVibesFlow(QWidget):
 
     def _cancel(self):
         self._running = False
+        if self._scan_worker is not None and self._scan_worker.isRunning():
+            self._scan_worker.cancel()
         self._pool.clear()
+        self._tune_timer.stop()
+        self._inflight = set()
         self._start_btn.setEnabled(True)
         self._cancel_btn.setEnabled(False)
-        self._detail_label.setText("Cancelled.")
+        self._detail_label.setText("Cancelled. Progress is saved; resume any time.")
+        self._refresh_resume()
+
+    def shutdown(self):
+        """Cancel analysis; already-analyzed songs still go out with the writer."""
+        self._cancel()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from pathlib import Path
 
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, QThreadPool
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -12,15 +12,26 @@ from PySide6.QtWidgets import (
     QTextEdit,
     QLineEdit,
     QGroupBox,
+    QListWidget,
+    QListWidgetItem,
     QProgressBar,
+    QSpinBox,
     QSplitter,
 )
 
+from gui.core.comment_prompt import comment_prompt, library_research, song_statement
+from gui.core.comment_rules import DraftCheck, check_draft
 from gui.core.song import Song
-from gui.core.metadata import write_song_metadata
-from gui.core.opencode_client import OpenCodeWorker
+from gui.core.opencode_client import OpenCodeTask, get_opencode_runner
+from gui.core.opencode_events import GenerationStats
 from gui.core.config import get_config
+from gui.core.essentia_client import EssentiaWorker
+from gui.core.generation_cache import get_generation_cache
+from gui.core.library_worker import RelatedIndexWorker
 from gui.core.prompts import PromptStore, FeedbackEntry
+from gui.core.related_songs import RelatedSongIndex
+from gui.core.tag_writer import METADATA_FIELDS, get_tag_writer
+from gui.core.vibes import VibeAnalysis
 from gui.widgets.components import make_header, StarRating
 
 
@@ -34,9 +45,23 @@ class CommentEditor(QWidget):
         self._config = get_config()
         self._prompts = PromptStore(Path("prompts.toml"), Path("prompts.base.toml"))
         self._prompts.load()
-        self._worker: OpenCodeWorker | None = None
+        self._task: OpenCodeTask | None = None
+        self._session_id = ""
+        # Speculative candidates: tasks still running, and finished drafts
+        # as (check, model, session id).
+        self._candidate_tasks: set[OpenCodeTask] = set()
+        self._candidates: list[tuple[DraftCheck, str, str]] = []
         self._draft_history: list[str] = []
         self._current_draft = ""
+        self._related_index: RelatedSongIndex | None = None
+        self._related_stale = True
+        self._related_worker: RelatedIndexWorker | None = None
+        self._target_vibe: VibeAnalysis | None = None
+        self._vibe_attempts = 0
+        # Accepted songs waiting on the tag writer, by path.
+        self._saving: dict[str, Song] = {}
+        self._writer = get_tag_writer()
+        self._writer.written.connect(self._on_written)
         self._setup_ui()
 
     def _setup_ui(self):
@@ -103,6 +128,22 @@ class CommentEditor(QWidget):
         self._generate_btn.setCursor(Qt.CursorShape.PointingHandCursor)
         self._generate_btn.clicked.connect(self._start_generation)
         gen_row.addWidget(self._generate_btn)
+        gen_row.addWidget(QLabel("Candidates:"))
+        # Identical requests would only return near-duplicate drafts, so
+        # there are at most as many candidates as distinct models.
+        distinct = len(self._candidate_models())
+        self._candidate_spin = QSpinBox()
+        self._candidate_spin.setRange(1, distinct)
+        self._candidate_spin.setValue(
+            min(max(1, self._config.speculative_drafts), distinct)
+        )
+        self._candidate_spin.setEnabled(distinct > 1)
+        self._candidate_spin.setToolTip(
+            "Drafts generated in parallel with the primary and fallback models; "
+            "the best ones by the comment rules are shown first. Needs a "
+            "fallback model."
+        )
+        gen_row.addWidget(self._candidate_spin)
         gen_row.addStretch()
         left_layout.addLayout(gen_row)
 
@@ -112,6 +153,11 @@ class CommentEditor(QWidget):
         self._progress_bar.setFixedHeight(20)
         left_layout.addWidget(self._progress_bar)
 
+        self._stats_label = QLabel()
+        self._stats_label.setObjectName("dimLabel")
+        self._stats_label.setVisible(False)
+        left_layout.addWidget(self._stats_label)
+
         self._reasoning_label = QLabel()
         self._reasoning_label.setObjectName("dimLabel")
         self._reasoning_label.setWordWrap(True)
@@ -136,6 +182,16 @@ class CommentEditor(QWidget):
         draft_layout.addWidget(self._draft_text)
         right_layout.addWidget(draft_group)
 
+        self._candidate_group = QGroupBox("Candidates")
+        candidate_layout = QVBoxLayout(self._candidate_group)
+        self._candidate_list = QListWidget()
+        self._candidate_list.setWordWrap(True)
+        self._candidate_list.setMaximumHeight(160)
+        self._candidate_list.itemClicked.connect(self._use_candidate)
+        candidate_layout.addWidget(self._candidate_list)
+        self._candidate_group.setVisible(False)
+        right_layout.addWidget(self._candidate_group)
+
         rating_group = QGroupBox("Rate This Output")
         rating_layout = QVBoxLayout(rating_group)
         rating_layout.setSpacing(6)
@@ -175,9 +231,20 @@ class CommentEditor(QWidget):
         layout.addWidget(splitter)
 
     def load_song(self, song: Song):
+        # Drop the previous song's generation before its results can land here.
+        self._cancel_worker()
         self._song = song
-        self._draft_history = []
+        self._target_vibe = None
+        self._vibe_attempts = 0
+        self.refresh_related_index()
+        if song.vibe is None:
+            self._analyze_target_vibe()
+        self._draft_history = self._cached_drafts(song)
         self._current_draft = ""
+        self._session_id = ""
+        self._candidates = []
+        self._candidate_list.clear()
+        self._candidate_group.setVisible(False)
         self._draft_text.clear()
         self._draft_text.setPlaceholderText(
             "Click Generate Comment to create a draft..."
@@ -186,9 +253,10 @@ class CommentEditor(QWidget):
         self._rating_note.clear()
         self._accept_btn.setEnabled(False)
         self._refine_btn.setEnabled(False)
-        self._undo_btn.setEnabled(False)
+        self._undo_btn.setEnabled(bool(self._draft_history))
         self._progress_bar.setVisible(False)
         self._reasoning_label.setVisible(False)
+        self._stats_label.setVisible(False)
 
         self._file_label.setText(
             f"{song.relative_path}\nChannel: {song.channel}"
@@ -216,6 +284,15 @@ class CommentEditor(QWidget):
         self._qna_inputs["music_theme"].setText(song.music_theme)
         self._qna_inputs["listener_takeaway"].setText(song.listener_takeaway)
 
+    @staticmethod
+    def _cached_drafts(song: Song) -> list[str]:
+        """Drafts from earlier sessions, oldest first, so Undo can bring them back."""
+        cache = get_generation_cache()
+        if cache is None:
+            return []
+        drafts = [d.draft for d in reversed(cache.for_song(str(song.path)))]
+        return [d for d in dict.fromkeys(drafts) if d != song.comment]
+
     def _start_generation(self):
         if self._song is None:
             return
@@ -227,55 +304,221 @@ class CommentEditor(QWidget):
         self._progress_bar.setVisible(True)
         self._progress_bar.setValue(0)
         self._reasoning_label.setVisible(True)
+        self._stats_label.setVisible(True)
         self._reasoning_label.clear()
+        self._stats_label.clear()
         self._draft_text.setPlaceholderText("Generating...")
 
-        title = self._song.title
-        channel = self._song.channel
+        prompt = comment_prompt(
+            self._prompts, self._song, self._library_research(), self._answers()
+        )
 
-        def _get(field: str) -> str:
-            return self._qna_inputs[field].text().strip() or getattr(
-                self._song, field, ""
+        template = self._prompts.get_prompt("song_statement")
+        count = self._candidate_spin.value()
+        if count > 1:
+            self._start_candidates(prompt, template, count)
+        else:
+            # Only the first Generate may reuse a cached draft; pressing it
+            # again asks for a new one.
+            self._submit(
+                prompt,
+                template,
+                continue_session=bool(self._draft_history),
+                reuse=not self._current_draft,
             )
 
-        qna_parts = [
-            f"Why I made this song: {_get('why_made')}",
-            f"Backstory: {_get('backstory')}",
-            f"Why on Midori AI Radio: {_get('radio_reason')}",
-            f"Music theme: {_get('music_theme')}",
-            f"Listener takeaway: {_get('listener_takeaway')}",
-        ]
-        statement = "\n".join(qna_parts)
-        if not statement.strip():
-            statement = f"Song: {title} in channel: {channel}"
+    def _answers(self) -> dict[str, str]:
+        return {name: edit.text().strip() for name, edit in self._qna_inputs.items()}
+
+    def _submit(
+        self, prompt: str, template: str, continue_session: bool, reuse: bool = False
+    ):
+        """Queue a generation on the shared runner (retries and fallback included)."""
+        task = get_opencode_runner().submit(
+            prompt,
+            self._song.path.parent,
+            session_id=self._session_id if continue_session else "",
+            template=template,
+            song=str(self._song.path),
+            reuse=reuse,
+        )
+        signals = task.signals
+        signals.progress_update.connect(self._on_progress)
+        signals.reasoning_update.connect(self._on_reasoning)
+        signals.stats_update.connect(self._on_stats)
+        signals.session_started.connect(self._on_session_started)
+        signals.attempt_failed.connect(self._on_attempt_failed)
+        signals.finished.connect(lambda draft: self._on_task_done(task, draft))
+        signals.error_occurred.connect(lambda msg: self._on_task_failed(task, msg))
+        self._task = task
+
+    def refresh_related_index(self):
+        """Rebuild the related-song index in the background if needed."""
+        if not self._related_stale:
+            return
+        if self._related_worker is not None and self._related_worker.isRunning():
+            return
+        self._related_stale = False
+        worker = RelatedIndexWorker(
+            self._config.music_root, self._config.scan_worker_count, self
+        )
+        worker.index_ready.connect(self._on_related_index_ready)
+        self._related_worker = worker
+        worker.start()
+
+    def invalidate_related_index(self):
+        self._related_stale = True
+        if self.isVisible():
+            self.refresh_related_index()
+
+    def _on_related_index_ready(self, index: RelatedSongIndex):
+        self._related_index = index
+        if self._related_stale and self.isVisible():
+            self.refresh_related_index()
+
+    def _analyze_target_vibe(self):
+        """Analyze an uncached song so related songs can match on vibes."""
+        song = self._song
+        if song is None:
+            return
+        self._vibe_attempts += 1
+        worker = EssentiaWorker(
+            song_path=song.path,
+            uv_workdir=self._config.essentia_uv_workdir,
+            uv_package_spec=self._config.essentia_uv_package_spec,
+        )
+        worker.signals.finished.connect(self._on_target_vibe)
+        worker.signals.error_occurred.connect(self._on_target_vibe_failed)
+        QThreadPool.globalInstance().start(worker)
 
-        research = self._prompts.get_prompt("library_research")
-        research = research.replace("$song_file", str(self._song.path))
+    def _on_target_vibe(self, song_key: str, analysis: VibeAnalysis):
+        if self._song is not None and str(self._song.path) == song_key:
+            self._target_vibe = analysis
 
-        template = self._prompts.get_prompt("song_statement")
-        prompt = template.format(
-            library_research=research,
-            title=title,
-            statement=statement,
-        )
+    def _on_target_vibe_failed(self, song_key: str, error: str):
+        if self._song is None or str(self._song.path) != song_key:
+            return
+        if self._vibe_attempts <= self._config.related_vibe_retries:
+            self._analyze_target_vibe()
 
-        self._worker = OpenCodeWorker(
-            prompt=prompt,
-            working_dir=self._song.path.parent,
-            model=self._config.opencode_model,
-            variant=self._config.opencode_variant,
-            continue_session=bool(self._draft_history),
+    def _library_research(self) -> str:
+        return library_research(
+            self._prompts, self._song, self._related_index, self._target_vibe
         )
-        self._worker.progress_update.connect(self._on_progress)
-        self._worker.reasoning_update.connect(self._on_reasoning)
-        self._worker.finished.connect(self._on_draft_ready)
-        self._worker.error_occurred.connect(self._on_error)
-        self._worker.start()
+
+    def _candidate_models(self) -> list[tuple[str, str]]:
+        """Distinct (model, variant) pairs to draw candidates from."""
+        config = self._config
+        models = [(config.opencode_model, config.opencode_variant)]
+        fallback = (config.opencode_fallback_model, config.opencode_fallback_variant)
+        if fallback[0] and fallback not in models:
+            models.append(fallback)
+        return models
+
+    def _start_candidates(self, prompt: str, template: str, count: int):
+        """Generate ``count`` drafts at once, each in a fresh session."""
+        runner = get_opencode_runner()
+        self._candidates = []
+        self._candidate_list.clear()
+        self._candidate_group.setVisible(True)
+        self._progress_bar.setRange(0, 0)
+        self._reasoning_label.setText(f"Generating {count} candidates...")
+        for model, variant in self._candidate_models()[:count]:
+            task = runner.submit(
+                prompt,
+                self._song.path.parent,
+                attempts=[(model, variant)],
+                template=template,
+                song=str(self._song.path),
+            )
+            signals = task.signals
+            signals.stats_update.connect(self._on_stats)
+            signals.finished.connect(
+                lambda draft, t=task, m=model: self._on_candidate(t, m, draft)
+            )
+            signals.error_occurred.connect(
+                lambda msg, t=task: self._on_candidate_failed(t, msg)
+            )
+            self._candidate_tasks.add(task)
+
+    def _on_candidate(self, task: OpenCodeTask, model: str, draft: str):
+        if task not in self._candidate_tasks:
+            return
+        self._candidate_tasks.discard(task)
+        check = check_draft(draft)
+        if all(check.text != c.text for c, _, _ in self._candidates):
+            self._candidates.append((check, model, task.session_id))
+        self._candidates.sort(key=lambda c: c[0].rank)
+        self._show_candidates()
+        good = sum(1 for check, _, _ in self._candidates if check.ok)
+        if good >= max(1, self._config.speculative_keep):
+            self._cancel_candidates()
+        if not self._candidate_tasks:
+            self._finish_candidates()
+
+    def _on_candidate_failed(self, task: OpenCodeTask, msg: str):
+        if task not in self._candidate_tasks:
+            return
+        self._candidate_tasks.discard(task)
+        self._reasoning_label.setText(f"A candidate failed: {msg[:150]}")
+        if not self._candidate_tasks:
+            self._finish_candidates()
+
+    def _show_candidates(self):
+        self._candidate_list.clear()
+        for check, model, _ in self._candidates:
+            mark = "\u2713" if check.ok else "\u2717"
+            item = QListWidgetItem(f"{mark} {check.score:.0%}  [{model}]  {check.text}")
+            notes = check.problems + check.warnings
+            item.setToolTip(", ".join(notes) if notes else "Follows the comment rules")
+            self._candidate_list.addItem(item)
+
+    def _finish_candidates(self):
+        self._progress_bar.setRange(0, 100)
+        if not self._candidates:
+            self._on_error("Every candidate failed")
+            return
+        check, _, session = self._candidates[0]
+        self._session_id = session
+        self._on_draft_ready(check.text)
+
+    def _use_candidate(self, item: QListWidgetItem):
+        row = self._candidate_list.row(item)
+        if 0 <= row < len(self._candidates) and not self._candidate_tasks:
+            check, _, session = self._candidates[row]
+            if check.text != self._current_draft:
+                self._session_id = session
+                self._on_draft_ready(check.text)
+
+    def _cancel_candidates(self):
+        runner = get_opencode_runner()
+        for task in self._candidate_tasks:
+            runner.cancel(task)
+        self._candidate_tasks.clear()
 
     def _cancel_worker(self):
-        if self._worker and self._worker.isRunning():
-            self._worker.cancel()
-            self._worker.wait(3000)
+        if self._task is not None:
+            get_opencode_runner().cancel(self._task)
+            self._task = None
+        self._cancel_candidates()
+
+    def _on_session_started(self, session_id: str):
+        self._session_id = self._session_id or session_id
+
+    def _on_attempt_failed(self, attempt: int, model: str, error: str):
+        self._reasoning_label.setText(
+            f"Attempt {attempt} with {model} failed, retrying: {error[:120]}"
+        )
+
+    def _on_task_done(self, task: OpenCodeTask, draft: str):
+        if task is self._task:
+            self._task = None
+            self._on_draft_ready(draft)
+
+    def _on_task_failed(self, task: OpenCodeTask, msg: str):
+        if task is self._task:
+            self._task = None
+            self._on_error(msg)
 
     def _on_progress(self, current: int, total: int, status: str):
         self._progress_bar.setMaximum(total)
@@ -284,9 +527,13 @@ class CommentEditor(QWidget):
     def _on_reasoning(self, text: str):
         self._reasoning_label.setText(text[:200])
 
+    def _on_stats(self, stats: GenerationStats):
+        self._stats_label.setText(stats.describe())
+
     def _on_draft_ready(self, draft: str):
         self._progress_bar.setVisible(False)
         self._reasoning_label.setVisible(False)
+        self._stats_label.setVisible(False)
         self._generate_btn.setEnabled(True)
 
         draft = draft.strip()
@@ -302,6 +549,7 @@ class CommentEditor(QWidget):
     def _on_error(self, msg: str):
         self._progress_bar.setVisible(False)
         self._reasoning_label.setVisible(False)
+        self._stats_label.setVisible(False)
         self._generate_btn.setEnabled(True)
         self._draft_text.setPlaceholderText(f"Error: {msg[:300]}")
 
@@ -315,52 +563,27 @@ class CommentEditor(QWidget):
         self._progress_bar.setVisible(True)
         self._progress_bar.setValue(0)
         self._reasoning_label.setVisible(True)
+        self._stats_label.setVisible(True)
         self._reasoning_label.clear()
-
-        def _get(field: str) -> str:
-            return self._qna_inputs[field].text().strip() or getattr(
-                self._song, field, ""
-            )
-
-        source = "\n".join(
-            [
-                f"Why I made this song: {_get('why_made')}",
-                f"Backstory: {_get('backstory')}",
-                f"Radio Reason: {_get('radio_reason')}",
-                f"Music theme: {_get('music_theme')}",
-                f"Listener takeaway: {_get('listener_takeaway')}",
-            ]
-        )
-
-        research = self._prompts.get_prompt("library_research")
-        research = research.replace("$song_file", str(self._song.path))
+        self._stats_label.clear()
 
         template = self._prompts.get_prompt("refinement")
         prompt = template.format(
-            library_research=research,
+            library_research=self._library_research(),
             title=self._song.title,
-            source_statement=source,
+            source_statement=song_statement(self._song, self._answers()),
             current_draft=self._current_draft,
             feedback="Preserve details but improve readability",
         )
 
-        self._worker = OpenCodeWorker(
-            prompt=prompt,
-            working_dir=self._song.path.parent,
-            model=self._config.opencode_model,
-            variant=self._config.opencode_variant,
-            continue_session=True,
-        )
-        self._worker.progress_update.connect(self._on_progress)
-        self._worker.reasoning_update.connect(self._on_reasoning)
-        self._worker.finished.connect(self._on_draft_ready)
-        self._worker.error_occurred.connect(self._on_error)
-        self._worker.start()
+        self._submit(prompt, template, continue_session=True)
 
     def _on_undo(self):
         if self._draft_history:
             self._current_draft = self._draft_history.pop()
             self._draft_text.setPlainText(self._current_draft)
+            self._accept_btn.setEnabled(True)
+            self._refine_btn.setEnabled(True)
             self._undo_btn.setEnabled(len(self._draft_history) > 0)
 
     def _on_accept(self):
@@ -388,16 +611,29 @@ class CommentEditor(QWidget):
         if rating > 0:
             self._save_feedback(rating)
 
-        success, err = write_song_metadata(self._song)
-        if success:
-            parent_window = self.window()
+        # The shared writer, so this never races a vibe write to the same file.
+        key = str(self._song.path)
+        self._saving[key] = self._song
+        self._accept_btn.setEnabled(False)
+        self._writer.enqueue(
+            self._song.path,
+            {name: getattr(self._song, name) for name in METADATA_FIELDS},
+        )
+
+    def _on_written(self, song_key: str, ok: bool, error: str):
+        song = self._saving.pop(song_key, None)
+        if song is None:
+            return
+        parent_window = self.window()
+        if ok:
             if hasattr(parent_window, "show_toast"):
                 parent_window.show_toast("Metadata saved", "success")
-            self.finished.emit(self._song)
-        else:
-            parent_window = self.window()
-            if hasattr(parent_window, "show_toast"):
-                parent_window.show_toast(f"Failed to save: {err[:200]}", "error")
+            self.finished.emit(song)
+            return
+        if hasattr(parent_window, "show_toast"):
+            parent_window.show_toast(f"Failed to save: {error[:200]}", "error")
+        if song is self._song:
+            self._accept_btn.setEnabled(bool(self._current_draft))
 
     def _save_feedback(self, rating: int):
         from gui.core.prompts import FeedbackQueue
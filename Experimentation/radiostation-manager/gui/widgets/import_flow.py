@@ -20,10 +20,11 @@ from PySide6.QtWidgets import (
 from gui.widgets.components import make_header, EmptyState
 
 from gui.core.config import get_config
+from gui.core.library_worker import ChannelRankWorker
 from gui.core.song import Song
 from gui.core.metadata import (
+    library_basenames,
     scan_downloads,
-    scan_library,
     get_channel_dirs,
     recommend_channel,
     read_song,
@@ -38,6 +39,9 @@ class ImportFlow(QWidget):
         super().__init__(parent)
         self._config = get_config()
         self._downloads: list[Path] = []
+        self._channels: list[str] = []
+        self._rankings: dict[Path, list[tuple[str, float]]] = {}
+        self._rank_worker: ChannelRankWorker | None = None
         self._setup_ui()
 
     def _setup_ui(self):
@@ -56,6 +60,7 @@ class ImportFlow(QWidget):
         self._content_stack = QStackedWidget()
         self._list = QListWidget()
         self._list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        self._list.itemSelectionChanged.connect(self._on_selection_changed)
         self._empty = EmptyState(
             QStyle.StandardPixmap.SP_ArrowDown,
             "No Songs to Import",
@@ -90,27 +95,10 @@ class ImportFlow(QWidget):
             if self._config.downloads_dir.exists()
             else []
         )
-        library = {p.name.lower() for p in scan_library(self._config.music_root)}
-        self._downloads = [d for d in all_downloads if d.name.lower() not in library]
-
-        self._list.clear()
-        for d in self._downloads:
-            self._list.addItem(d.name)
-
-        channels = get_channel_dirs(self._config.music_root)
-        self._channel_combo.clear()
-        self._channel_combo.addItems(channels)
-
-        self._count_label.setText(
-            f"{len(all_downloads)} MP3s in Downloads -> "
-            f"{len(self._downloads)} not yet imported (newest first)"
+        library = library_basenames(self._config.music_root)
+        self._set_data(
+            all_downloads, [d for d in all_downloads if d.name.lower() not in library]
         )
-        self._import_btn.setEnabled(len(self._downloads) > 0)
-        self._list.itemSelectionChanged.connect(self._on_selection_changed)
-        if self._downloads:
-            self._content_stack.setCurrentWidget(self._list)
-        else:
-            self._content_stack.setCurrentWidget(self._empty)
 
     def _set_data(self, all_downloads: list[Path], non_imported: list[Path]):
         """Called from main thread with pre-loaded data from worker thread."""
@@ -120,9 +108,10 @@ class ImportFlow(QWidget):
         for d in self._downloads:
             self._list.addItem(d.name)
 
-        channels = get_channel_dirs(self._config.music_root)
+        self._channels = get_channel_dirs(self._config.music_root)
         self._channel_combo.clear()
-        self._channel_combo.addItems(channels)
+        self._channel_combo.addItems(self._channels)
+        self._rank_downloads()
 
         self._count_label.setText(
             f"{len(all_downloads)} MP3s in Downloads -> "
@@ -134,17 +123,53 @@ class ImportFlow(QWidget):
         else:
             self._content_stack.setCurrentWidget(self._empty)
 
+    def _rank_downloads(self):
+        """Rank channels for every pending download in one background pass."""
+        if self._rank_worker is not None:
+            self._rank_worker.requestInterruption()
+        self._rankings = {}
+        if not self._downloads:
+            return
+        worker = ChannelRankWorker(
+            self._config.music_root,
+            self._downloads,
+            self._config.scan_worker_count,
+            self,
+        )
+        downloads = list(self._downloads)
+        worker.ranked.connect(
+            lambda ranked: self._on_ranked(worker, downloads, ranked)
+        )
+        worker.error_occurred.connect(
+            lambda e: self._status_label.setText(f"Channel suggestions failed: {e}")
+        )
+        self._rank_worker = worker
+        worker.start()
+
+    def _on_ranked(
+        self, worker: ChannelRankWorker, downloads: list[Path], ranked: list
+    ):
+        if worker is not self._rank_worker:
+            return
+        self._rankings = dict(zip(downloads, ranked))
+        self._on_selection_changed()
+
     def _on_selection_changed(self):
         selected = self._list.selectedItems()
         if not selected or not self._downloads:
             return
         first = self._downloads[self._list.row(selected[0])]
-        channels = get_channel_dirs(self._config.music_root)
-        recommended = recommend_channel(first.name, channels)
+        ranked = self._rankings.get(first)
+        recommended = recommend_channel(first.name, self._channels, ranked)
         if recommended:
             idx = self._channel_combo.findText(recommended)
             if idx >= 0:
                 self._channel_combo.setCurrentIndex(idx)
+        if ranked:
+            self._status_label.setText(
+                "Suggested: "
+                + ", ".join(f"{c} {confidence:.0%}" for c, confidence in ranked[:3])
+            )
 
     def _import_selected(self):
         selected = self._list.selectedItems()
@@ -21,6 +21,8 @@ from gui.widgets.components import make_header, EmptyState
 
 class LibraryBrowser(QWidget):
     song_selected = Signal(Path)
+    similar_requested = Signal(Path)
+    batch_requested = Signal(list)
     back = Signal()
 
     def __init__(self, parent=None):
@@ -28,6 +30,9 @@ class LibraryBrowser(QWidget):
         self._music_root = Path(".")
         self._tree: QTreeWidget = None  # type: ignore[assignment]
         self._status_label: QLabel = None  # type: ignore[assignment]
+        self._channel_items: dict[str, QTreeWidgetItem] = {}
+        self._channel_counts: dict[str, int] = {}
+        self._song_count = 0
         self._setup_ui()
 
     def _setup_ui(self):
@@ -73,33 +78,45 @@ class LibraryBrowser(QWidget):
         edit_btn.setObjectName("accentButton")
         edit_btn.clicked.connect(self._edit_selected)
         btn_row.addWidget(edit_btn)
+        similar_btn = QPushButton("Find Similar")
+        similar_btn.clicked.connect(self._find_similar)
+        btn_row.addWidget(similar_btn)
+        batch_btn = QPushButton("Batch Generate")
+        batch_btn.setToolTip("Draft new comments for every selected song at once")
+        batch_btn.clicked.connect(self._batch_selected)
+        btn_row.addWidget(batch_btn)
         btn_row.addStretch()
         layout.addLayout(btn_row)
 
     def load(self, music_root: Path, songs: list[dict]):
+        self.begin(music_root)
+        self.append(songs)
+        self.finish()
+
+    def begin(self, music_root: Path):
         self._music_root = music_root
-        self._tree.setUpdatesEnabled(False)
         self._tree.clear()
+        self._channel_items = {}
+        self._channel_counts = {}
+        self._song_count = 0
+        self._status_label.setText("Loading...")
+        self._content_stack.setCurrentWidget(self._tree)
 
-        channels: dict[str, QTreeWidgetItem] = {}
-        channel_counts: dict[str, int] = {}
-        for s in songs:
-            ch = s.get("channel", "Unknown")
-            channel_counts[ch] = channel_counts.get(ch, 0) + 1
-
+    def append(self, songs: list[dict]):
+        self._tree.setUpdatesEnabled(False)
         for s in songs:
             channel = s.get("channel", "Unknown")
-            if channel not in channels:
-                ch_item = QTreeWidgetItem(
-                    [f"{channel}  ({channel_counts[channel]})", "", ""]
-                )
+            if channel not in self._channel_items:
+                ch_item = QTreeWidgetItem(["", "", ""])
                 ch_item.setFlags(ch_item.flags() & ~Qt.ItemFlag.ItemIsSelectable)
                 font = ch_item.font(0)
                 font.setBold(True)
                 ch_item.setFont(0, font)
                 ch_item.setForeground(0, Qt.GlobalColor.cyan)
                 self._tree.addTopLevelItem(ch_item)
-                channels[channel] = ch_item
+                self._channel_items[channel] = ch_item
+                self._channel_counts[channel] = 0
+            self._channel_counts[channel] += 1
 
             item = QTreeWidgetItem(
                 [
@@ -109,13 +126,19 @@ class LibraryBrowser(QWidget):
                 ]
             )
             item.setData(0, Qt.ItemDataRole.UserRole, str(s["path"]))
-            channels[channel].addChild(item)
+            self._channel_items[channel].addChild(item)
 
+        for channel, ch_item in self._channel_items.items():
+            ch_item.setText(0, f"{channel}  ({self._channel_counts[channel]})")
+        self._song_count += len(songs)
         self._tree.expandAll()
         self._tree.setUpdatesEnabled(True)
-        total = len(songs)
+        self._status_label.setText(f"{self._song_count} songs, loading...")
+
+    def finish(self):
+        total = self._song_count
         self._status_label.setText(f"{total} song{'s' if total != 1 else ''}")
-        if songs:
+        if total:
             self._content_stack.setCurrentWidget(self._tree)
         else:
             self._content_stack.setCurrentWidget(self._empty)
@@ -132,3 +155,19 @@ class LibraryBrowser(QWidget):
             if path_str:
                 self.song_selected.emit(Path(path_str))
                 return
+
+    def _find_similar(self):
+        for item in self._tree.selectedItems():
+            path_str = item.data(0, Qt.ItemDataRole.UserRole)
+            if path_str:
+                self.similar_requested.emit(Path(path_str))
+                return
+
+    def _batch_selected(self):
+        paths = [
+            Path(path_str)
+            for item in self._tree.selectedItems()
+            if (path_str := item.data(0, Qt.ItemDataRole.UserRole))
+        ]
+        if paths:
+            self.batch_requested.emit(paths)
@@ -21,6 +21,7 @@ from PySide6.QtWidgets import (
 )
 
 from gui.core.config import get_config
+from gui.core.generation_cache import generation_key, get_generation_cache
 from gui.core.prompts import PromptStore, FeedbackQueue
 from gui.core.opencode_client import OpenCodeWorker
 from gui.widgets.components import make_header, confirm
@@ -40,6 +41,7 @@ class PromptManager(QWidget):
         self._processing = False
         self._sandbox_dir = Path("/tmp/midoriai/radiostation-manager/prompt_refinement")
         self._original_prompts_snapshot: dict[str, str] = {}
+        self._cache_key = ""  # generation cache key of the item in progress
         self._retry_count = 0
         self._max_retries = 15
         self._setup_ui()
@@ -264,8 +266,8 @@ class PromptManager(QWidget):
     def _process_queue(self):
         if self._processing:
             return
-        entries = self._queue.load_all()
-        if not entries:
+        total = self._queue.count
+        if not total:
             QMessageBox.information(
                 self, "Empty Queue", "No feedback items to process."
             )
@@ -275,25 +277,26 @@ class PromptManager(QWidget):
         self._retry_count = 0
         self._process_index = 0
         self._proc_progress.setVisible(True)
-        self._proc_progress.setMaximum(len(entries))
+        self._proc_progress.setMaximum(total)
         self._proc_progress.setValue(0)
         self._process_btn.setVisible(False)
         self._stop_btn.setVisible(True)
         self._proc_status.setText(
-            f"Processing {len(entries)} feedback item(s)..."
+            f"Processing {total} feedback item(s)..."
         )
         self._process_next()
 
     def _process_next(self):
         if not self._processing:
             return
-        entries = self._queue.load_all()
-        if self._process_index >= len(entries):
+        total = self._queue.count
+        entry = self._queue.get(self._process_index)
+        if entry is None:
             self._processing = False
             self._proc_progress.setVisible(False)
             self._process_btn.setVisible(True)
             self._stop_btn.setVisible(False)
-            remaining = len(entries)
+            remaining = total
             if remaining:
                 QMessageBox.information(
                     self,
@@ -308,7 +311,6 @@ class PromptManager(QWidget):
             self._refresh_queue()
             return
 
-        entry = entries[self._process_index]
         template_name = entry.prompt_template
         current_prompt = self._prompts.get_prompt(template_name)
         if not current_prompt:
@@ -318,18 +320,29 @@ class PromptManager(QWidget):
             return
 
         self._proc_progress.setValue(self._process_index)
-        self._proc_progress.setMaximum(len(entries))
+        self._proc_progress.setMaximum(total)
         self._proc_status.setText(
-            f"Processing item {self._process_index + 1}/{len(entries)}: "
+            f"Processing item {self._process_index + 1}/{total}: "
             f'"{entry.song_title[:40]}" rated {entry.rating}/5...'
         )
 
         query = self._build_sandbox_prompt(entry, template_name)
+        model = self._model_combo.currentText()
+        variant = self._variant_combo.currentText()
+        self._cache_key = generation_key(current_prompt, model, variant, query)
+        cache = get_generation_cache()
+        if cache is not None and self._retry_count == 0:
+            hits = cache.get(self._cache_key)
+            if hits:
+                self._proc_status.setText("Reusing a cached refinement")
+                self._review_refinement(entry, hits[0].draft)
+                return
+
         self._worker = OpenCodeWorker(
             prompt=query,
             working_dir=self._sandbox_dir,
-            model=self._model_combo.currentText(),
-            variant=self._variant_combo.currentText(),
+            model=model,
+            variant=variant,
             continue_session=False,
         )
         self._worker.finished.connect(self._on_sandbox_done)
@@ -337,12 +350,11 @@ class PromptManager(QWidget):
         self._worker.start()
 
     def _on_sandbox_done(self, result_text: str):
-        entries = self._queue.load_all()
-        if self._process_index >= len(entries):
+        entry = self._queue.get(self._process_index)
+        if entry is None:
             self._process_next()
             return
 
-        entry = entries[self._process_index]
         template_name = entry.prompt_template
         old_prompt = self._original_prompts_snapshot.get(template_name, "")
 
@@ -394,7 +406,11 @@ class PromptManager(QWidget):
             return self._handle_auto_fail(
                 "No refinement found — file unchanged and output was empty/DONE"
             )
+        self._review_refinement(entry, new_prompt)
 
+    def _review_refinement(self, entry, new_prompt: str):
+        template_name = entry.prompt_template
+        old_prompt = self._original_prompts_snapshot.get(template_name, "")
         new_len = len(new_prompt)
         if new_len < 100:
             return self._handle_auto_fail(
@@ -411,6 +427,9 @@ class PromptManager(QWidget):
                 f"Too different: {ratio:.0%} similar (need >= 50%)"
             )
 
+        cache = get_generation_cache()
+        if cache is not None:
+            cache.put(self._cache_key, new_prompt)
         dialog = DiffDialog(old_prompt, new_prompt, template_name, self)
         if dialog.result():
             self._prompts.set_prompt(template_name, new_prompt)
@@ -424,6 +443,9 @@ class PromptManager(QWidget):
             if hasattr(pwin, "show_toast"):
                 pwin.show_toast("Prompt refined", "success")
         else:
+            # Ask OpenCode for a different refinement next time.
+            if cache is not None:
+                cache.discard(self._cache_key, new_prompt)
             self._proc_status.setText("Rejected, retrying...")
             return self._process_next()
 
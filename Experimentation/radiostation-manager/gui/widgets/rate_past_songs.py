@@ -117,6 +117,7 @@ class RatePastSongs(QWidget):
                     vibe_summary=sd.get("vibe_summary", ""),
                     vibe_cached_at_epoch=sd.get("vibe_cached_at_epoch", ""),
                     vibe_cache_schema=sd.get("vibe_cache_schema", ""),
+                    vibe_audio_hash=sd.get("vibe_audio_hash", ""),
                 )
             )
         self._song_list.clear()
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+from pathlib import Path
 
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, QTimer, Signal
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -20,9 +21,16 @@ from PySide6.QtWidgets import (
 
 from gui.core.config import get_config
 from gui.core.song import Song
-from gui.core.metadata import scan_library, read_song, trash_file
+from gui.core.library_worker import SearchIndexWorker, VibeIndexWorker
+from gui.core.metadata import read_song, trash_file
+from gui.core.search_index import SearchIndex
+from gui.core.tag_index import get_tag_index
+from gui.core.vibe_index import loaded_vibe_index
 from gui.widgets.components import make_header, EmptyState, confirm
 
+MAX_RESULTS = 500
+SIMILAR_RESULTS = 25
+
 
 class SearchManageFlow(QWidget):
     song_selected = Signal(Song)
@@ -33,6 +41,15 @@ class SearchManageFlow(QWidget):
         self._config = get_config()
         self._results: list[Song] = []
         self._has_searched = False
+        self._index: SearchIndex | None = None
+        self._index_stale = True
+        self._index_worker: SearchIndexWorker | None = None
+        self._vibe_worker: VibeIndexWorker | None = None
+        self._similar_to: Song | None = None
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(120)
+        self._search_timer.timeout.connect(self._do_search)
         self._setup_ui()
 
     def _setup_ui(self):
@@ -47,8 +64,9 @@ class SearchManageFlow(QWidget):
         search_row.setSpacing(8)
         self._search_input = QLineEdit()
         self._search_input.setPlaceholderText(
-            "Enter keyword (case-insensitive, searches all fields)..."
+            "Search all fields as you type, e.g. rain piano or channel:lofi..."
         )
+        self._search_input.textChanged.connect(lambda _: self._search_timer.start())
         self._search_input.returnPressed.connect(self._do_search)
         search_row.addWidget(self._search_input)
         search_btn = QPushButton("Search")
@@ -96,6 +114,10 @@ class SearchManageFlow(QWidget):
         edit_btn = QPushButton("Update Comment")
         edit_btn.clicked.connect(self._edit_current)
         action_row.addWidget(edit_btn)
+        similar_btn = QPushButton("Find Similar")
+        similar_btn.setToolTip("Songs with the closest cached vibes")
+        similar_btn.clicked.connect(self._find_similar)
+        action_row.addWidget(similar_btn)
         trash_btn = QPushButton("Trash")
         trash_btn.setObjectName("dangerButton")
         trash_btn.clicked.connect(self._trash_current)
@@ -108,33 +130,70 @@ class SearchManageFlow(QWidget):
         splitter.setSizes([380, 360])
         layout.addWidget(splitter)
 
+    def refresh_index(self):
+        """Rebuild the search index in the background if the library changed."""
+        if not self._index_stale:
+            return
+        if self._index_worker is not None and self._index_worker.isRunning():
+            return
+        self._index_stale = False
+        worker = SearchIndexWorker(
+            self._config.music_root, self._config.scan_worker_count, self
+        )
+        worker.index_ready.connect(self._on_index_ready)
+        worker.error_occurred.connect(
+            lambda e: self._status_label.setText(f"Indexing failed: {e}")
+        )
+        self._index_worker = worker
+        worker.start()
+        if self._index is None:
+            self._status_label.setText("Indexing library...")
+
+    def invalidate_index(self):
+        self._index_stale = True
+        if self.isVisible():
+            self.refresh_index()
+
+    def _on_index_ready(self, index: SearchIndex):
+        self._index = index
+        if self._index_stale:
+            self.refresh_index()
+        if self._search_input.text().strip():
+            self._do_search()
+        elif not self._has_searched:
+            self._status_label.setText(
+                f"{len(index)} songs indexed. Enter a keyword to search the library."
+            )
+
     def _do_search(self):
-        keyword = self._search_input.text().strip().lower()
+        self._search_timer.stop()
+        keyword = self._search_input.text().strip()
         if not keyword:
             return
+        if self._index is None:
+            self.refresh_index()
+            return
 
-        all_songs = scan_library(self._config.music_root, exclude_blocked=True)
-        self._results = []
-        tokens = keyword.split()
-        for p in all_songs:
-            song = read_song(p)
-            searchable = (
-                f"{song.title} {song.comment} {song.filename} "
-                f"{song.music_theme} {song.why_made} {song.backstory} "
-                f"{song.radio_reason} {song.listener_takeaway} {song.vibe_summary}"
-            ).lower()
-            if all(t in searchable for t in tokens):
-                self._results.append(song)
+        self._results, total = self._index.search(keyword, limit=MAX_RESULTS)
 
+        status = f'Found {total} match{"es" if total != 1 else ""} for "{keyword}"'
+        if total > len(self._results):
+            status += f" (showing the top {len(self._results)})"
+        self._show_results(status)
+
+    def _show_results(self, status: str):
+        root = self._config.music_root
         self._list.clear()
         for s in self._results:
             stars = ""
             if s.comment:
                 stars = "  "
-            self._list.addItem(f"{stars}{s.relative_path}  \u2014  {s.title}")
-        self._status_label.setText(
-            f'Found {len(self._results)} match{"es" if len(self._results) != 1 else ""} for "{keyword}"'
-        )
+            try:
+                rel = s.path.relative_to(root)
+            except ValueError:
+                rel = s.path
+            self._list.addItem(f"{stars}{rel}  \u2014  {s.title}")
+        self._status_label.setText(status)
         self._detail_text.clear()
         self._has_searched = True
         if self._results:
@@ -142,6 +201,44 @@ class SearchManageFlow(QWidget):
         else:
             self._content_stack.setCurrentWidget(self._empty)
 
+    def show_similar(self, path: Path):
+        """List the songs whose vibes are closest to the song at ``path``."""
+        self._list_similar(get_tag_index().get(path) or read_song(path))
+
+    def _find_similar(self):
+        song = self._current_song()
+        if song is not None:
+            self._list_similar(song)
+
+    def _list_similar(self, song: Song):
+        index = loaded_vibe_index(self._config.music_root)
+        if index is None:
+            # Built once per session from the tag index, off the GUI thread.
+            self._similar_to = song
+            if self._vibe_worker is None or not self._vibe_worker.isRunning():
+                worker = VibeIndexWorker(self._config.music_root, self)
+                worker.index_ready.connect(self._on_vibe_index_ready)
+                worker.error_occurred.connect(
+                    lambda e: self._status_label.setText(f"Vibe index failed: {e}")
+                )
+                self._vibe_worker = worker
+                worker.start()
+            self._status_label.setText("Loading vibes...")
+            return
+        if song.vibe is None and song.path not in index:
+            self._status_label.setText(
+                f'"{song.title}" has no cached vibes yet; cache them first.'
+            )
+            return
+        self._search_timer.stop()
+        self._results = [s for s, _ in index.similar(song, SIMILAR_RESULTS)]
+        self._show_results(f'{len(self._results)} songs similar to "{song.title}"')
+
+    def _on_vibe_index_ready(self, _index):
+        song, self._similar_to = self._similar_to, None
+        if song is not None:
+            self._list_similar(song)
+
     def _current_song(self) -> Song | None:
         item = self._list.currentItem()
         if item is None:
@@ -181,5 +278,8 @@ class SearchManageFlow(QWidget):
             f"Move this song to trash?\n\n{song.relative_path}",
         ):
             return
-        trash_file(song.path)
+        if trash_file(song.path):
+            get_tag_index().remove(song.path)  # the vibe index follows it
+            if self._index is not None:
+                self._index.remove(song.path)
         self._do_search()
@@ -23,6 +23,7 @@ from gui.widgets.components import make_header, EmptyState
 
 class StaleCommentsFlow(QWidget):
     song_selected = Signal(Song)
+    batch_requested = Signal(list)
     back = Signal()
 
     def __init__(self, parent=None):
@@ -48,6 +49,7 @@ class StaleCommentsFlow(QWidget):
         self._content_stack = QStackedWidget()
         self._list = QListWidget()
         self._list.setAlternatingRowColors(True)
+        self._list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
         self._list.itemDoubleClicked.connect(self._on_double_click)
         self._empty = EmptyState(
             QStyle.StandardPixmap.SP_DialogApplyButton,
@@ -63,6 +65,13 @@ class StaleCommentsFlow(QWidget):
         fix_btn.setObjectName("accentButton")
         fix_btn.clicked.connect(self._fix_selected)
         btn_row.addWidget(fix_btn)
+        batch_btn = QPushButton("Generate Selected")
+        batch_btn.setToolTip("Draft new comments for every selected song at once")
+        batch_btn.clicked.connect(self._batch_selected)
+        btn_row.addWidget(batch_btn)
+        all_btn = QPushButton("Generate All")
+        all_btn.clicked.connect(self._batch_all)
+        btn_row.addWidget(all_btn)
         btn_row.addStretch()
         layout.addLayout(btn_row)
 
@@ -102,6 +111,16 @@ class StaleCommentsFlow(QWidget):
         if item:
             self._on_double_click(item)
 
+    def _batch_selected(self):
+        rows = sorted(self._list.row(item) for item in self._list.selectedItems())
+        paths = [Path(self._stale_songs[row]["path"]) for row in rows]
+        if paths:
+            self.batch_requested.emit(paths)
+
+    def _batch_all(self):
+        if self._stale_songs:
+            self.batch_requested.emit([Path(s["path"]) for s in self._stale_songs])
+
     def _on_double_click(self, item: QListWidgetItem):
         idx = self._list.row(item)
         if 0 <= idx < len(self._stale_songs):
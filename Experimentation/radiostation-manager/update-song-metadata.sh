@@ -2,8 +2,11 @@
 # This script has been replaced by the Luna Music Metadata Studio GUI.
 # Run the GUI instead:
 #   ./run.sh
+# or, headless (cron, servers), the JSON-lines CLI:
+#   uv run python -m gui.cli cache-vibes
 echo "Luna Music Metadata Studio is now a GUI application."
 echo "Run: ./run.sh"
+echo "Headless: uv run python -m gui.cli --help"
 exit 0
 
 set -euo pipefail